@@ -7,6 +7,11 @@ import json
 import os
 from flask import Flask, jsonify
 import threading
+from run_index import resolve_model_path
+from camera_source import open_source
+from imgsz_profile import imgsz_kwargs, select_imgsz
+from tracing import register_trace_routes, span
+from model_manager import ModelManager, register_admin_routes
 
 # ===== Flask 설정 =====
 app = Flask(__name__)
@@ -22,12 +27,17 @@ ONDEMAND_CLASSES = ['impossibility', 'sale']
 
 class YOLODetectorWithApp:
     def __init__(self, model_path, webhook_url):
-        self.model = YOLO(model_path)
+        # 모델 (hot-swap 가능, /admin/model)
+        self.models = ModelManager(model_path)
+        # 입력 크기 (imgsz_profile.py 프로필 기준) - 실시간은 목표 fps 안에서, 온디맨드는 정확도 우선
+        self.realtime_opts = imgsz_kwargs(select_imgsz(model_path, REALTIME_CLASSES, 'REALTIME', target_fps=15))
+        self.ondemand_opts = imgsz_kwargs(select_imgsz(model_path, ONDEMAND_CLASSES, 'ONDEMAND'))
         self.webhook_url = webhook_url
 
         # 현재 카메라 프레임 저장
         self.current_frame = None
         self.camera_running = True
+        self.source = None
 
     def send_discord_alert(self, class_name, confidence):
         """디스코드로 알림 전송"""
@@ -49,21 +59,22 @@ class YOLODetectorWithApp:
         }
 
         try:
-            requests.post(self.webhook_url, json=message)
+            with span('sink.discord', 'sink'):
+                requests.post(self.webhook_url, json=message)
             print(f"✅ 디스코드 알림 전송: {class_name}")
         except Exception as e:
             print(f"❌ 디스코드 전송 실패: {e}")
 
     def detect_realtime(self, frame, confidence_threshold=0.5):
         """실시간 탐지 (mounting만)"""
-        results = self.model(frame)
+        results = self.models.predict(frame, **self.realtime_opts)
 
         for r in results:
             boxes = r.boxes
             for box in boxes:
                 conf = box.conf[0].item()
                 cls = int(box.cls[0].item())
-                class_name = self.model.names[cls]
+                class_name = self.models.names[cls]
 
                 # mounting만 실시간 탐지
                 if class_name in REALTIME_CLASSES and conf > confidence_threshold:
@@ -84,7 +95,7 @@ class YOLODetectorWithApp:
             return {"success": False, "message": "카메라 프레임이 없습니다"}
 
         frame = self.current_frame.copy()
-        results = self.model(frame)
+        results = self.models.predict(frame, **self.ondemand_opts)
 
         detected = False
 
@@ -93,7 +104,7 @@ class YOLODetectorWithApp:
             for box in boxes:
                 conf = box.conf[0].item()
                 cls = int(box.cls[0].item())
-                detected_class = self.model.names[cls]
+                detected_class = self.models.names[cls]
 
                 # 앱에서 요청한 클래스만 탐지
                 if detected_class == class_name and conf > confidence_threshold:
@@ -123,10 +134,8 @@ class YOLODetectorWithApp:
 
     def run_camera(self):
         """카메라 스트림 실행 (백그라운드)"""
-        cap = cv2.VideoCapture(0)
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        cap.set(cv2.CAP_PROP_FPS, 30)
+        # 웹캠 / RTSP / 영상 파일 / replay (CAMERA_SOURCE) - grabber 스레드가 항상 최신 프레임 유지
+        self.source = open_source()
 
         print("=" * 60)
         print("🎥 카메라 백그라운드 실행")
@@ -136,10 +145,13 @@ class YOLODetectorWithApp:
 
         try:
             while self.camera_running:
-                ret, frame = cap.read()
-                if not ret:
-                    print("❌ 카메라 읽기 실패")
-                    break
+                frame = self.source.read(timeout=1.0)
+                if frame is None:
+                    # 재연결 중이면 계속 기다리고, 파일이 끝났으면 종료
+                    if self.source.ended:
+                        print("🛑 영상 소스 종료")
+                        break
+                    continue
 
                 frame_count += 1
 
@@ -165,7 +177,7 @@ class YOLODetectorWithApp:
                     break
 
         finally:
-            cap.release()
+            self.source.close()
             cv2.destroyAllWindows()
             print("\n🛑 카메라 종료")
 
@@ -201,10 +213,16 @@ def status():
     return jsonify({
         "camera_running": detector.camera_running,
         "frame_available": detector.current_frame is not None,
+        "camera": detector.source.status() if detector.source is not None else None,
         "timestamp": datetime.now().isoformat()
     })
 
 
+# ===== 모델 관리 엔드포인트 (/admin/model) =====
+register_admin_routes(app, lambda: detector.models)
+register_trace_routes(app)
+
+
 # ===== 전역 detector 객체 =====
 detector = None
 
@@ -230,6 +248,10 @@ def start_server(model_path, webhook_url, port=5000):
     # Detector 초기화
     detector = YOLODetectorWithApp(model_path, webhook_url)
 
+    # 가중치 파일이 바뀌면 자동 교체 (MODEL_WATCH=1)
+    if os.environ.get('MODEL_WATCH') == '1':
+        detector.models.watch()
+
     # 카메라를 백그라운드 스레드에서 실행
     camera_thread = threading.Thread(target=detector.run_camera, daemon=True)
     camera_thread.start()
@@ -240,8 +262,8 @@ def start_server(model_path, webhook_url, port=5000):
 
 # ===== 실행 =====
 if __name__ == "__main__":
-    # 모델 경로 설정
-    model_path = r'C:\Users\dnjsr\Desktop\YOLO_Project\runs\detect\mounting_detection3\weights\best.pt'
+    # 모델 경로 설정 (MODEL_PATH 환경변수 > run 인덱스 최고 mAP50-95 모델)
+    model_path = resolve_model_path()
 
     # Discord 웹훅 URL 확인
     if DISCORD_WEBHOOK_URL == "YOUR_DISCORD_WEBHOOK_URL":
@@ -7,6 +7,11 @@ import os
 from flask import Flask, jsonify, request
 import threading
 from collections import deque
+from run_index import resolve_model_path
+from camera_source import open_source
+from imgsz_profile import imgsz_kwargs, select_imgsz
+from tracing import register_trace_routes
+from model_manager import ModelManager, register_admin_routes
 
 # ===== Flask 설정 =====
 app = Flask(__name__)
@@ -22,11 +27,16 @@ messages = deque(maxlen=100)
 
 class YOLODetectorWithMessenger:
     def __init__(self, model_path):
-        self.model = YOLO(model_path)
+        # 모델 (hot-swap 가능, /admin/model)
+        self.models = ModelManager(model_path)
+        # 입력 크기 (imgsz_profile.py 프로필 기준) - 실시간은 목표 fps 안에서, 온디맨드는 정확도 우선
+        self.realtime_opts = imgsz_kwargs(select_imgsz(model_path, REALTIME_CLASSES, 'REALTIME', target_fps=15))
+        self.ondemand_opts = imgsz_kwargs(select_imgsz(model_path, ONDEMAND_CLASSES, 'ONDEMAND'))
 
         # 현재 카메라 프레임 저장
         self.current_frame = None
         self.camera_running = True
+        self.source = None
 
     def add_message(self, class_name, confidence, detection_type):
         """메시지 추가 (Figma 앱으로 전송할)"""
@@ -44,14 +54,14 @@ class YOLODetectorWithMessenger:
 
     def detect_realtime(self, frame, confidence_threshold=0.5):
         """실시간 탐지 (mounting만)"""
-        results = self.model(frame)
+        results = self.models.predict(frame, **self.realtime_opts)
 
         for r in results:
             boxes = r.boxes
             for box in boxes:
                 conf = box.conf[0].item()
                 cls = int(box.cls[0].item())
-                class_name = self.model.names[cls]
+                class_name = self.models.names[cls]
 
                 # mounting만 실시간 탐지
                 if class_name in REALTIME_CLASSES and conf > confidence_threshold:
@@ -76,7 +86,7 @@ class YOLODetectorWithMessenger:
             }
 
         frame = self.current_frame.copy()
-        results = self.model(frame)
+        results = self.models.predict(frame, **self.ondemand_opts)
 
         detected = False
         confidence = 0
@@ -86,7 +96,7 @@ class YOLODetectorWithMessenger:
             for box in boxes:
                 conf = box.conf[0].item()
                 cls = int(box.cls[0].item())
-                detected_class = self.model.names[cls]
+                detected_class = self.models.names[cls]
 
                 # 앱에서 요청한 클래스만 탐지
                 if detected_class == class_name and conf > confidence_threshold:
@@ -119,10 +129,8 @@ class YOLODetectorWithMessenger:
 
     def run_camera(self):
         """카메라 스트림 실행 (백그라운드)"""
-        cap = cv2.VideoCapture(0)
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        cap.set(cv2.CAP_PROP_FPS, 30)
+        # 웹캠 / RTSP / 영상 파일 / replay (CAMERA_SOURCE) - grabber 스레드가 항상 최신 프레임 유지
+        self.source = open_source()
 
         print("=" * 60)
         print("🎥 카메라 백그라운드 실행")
@@ -132,10 +140,13 @@ class YOLODetectorWithMessenger:
 
         try:
             while self.camera_running:
-                ret, frame = cap.read()
-                if not ret:
-                    print("❌ 카메라 읽기 실패")
-                    break
+                frame = self.source.read(timeout=1.0)
+                if frame is None:
+                    # 재연결 중이면 계속 기다리고, 파일이 끝났으면 종료
+                    if self.source.ended:
+                        print("🛑 영상 소스 종료")
+                        break
+                    continue
 
                 frame_count += 1
 
@@ -163,7 +174,7 @@ class YOLODetectorWithMessenger:
                     break
 
         finally:
-            cap.release()
+            self.source.close()
             cv2.destroyAllWindows()
             print("\n🛑 카메라 종료")
 
@@ -241,11 +252,17 @@ def status():
     return jsonify({
         "camera_running": detector.camera_running,
         "frame_available": detector.current_frame is not None,
+        "camera": detector.source.status() if detector.source is not None else None,
         "messages_count": len(messages),
         "timestamp": datetime.now().isoformat()
     }), 200
 
 
+# ===== 모델 관리 엔드포인트 (/admin/model) =====
+register_admin_routes(app, lambda: detector.models)
+register_trace_routes(app)
+
+
 # ===== 전역 detector 객체 =====
 detector = None
 
@@ -277,6 +294,10 @@ def start_server(model_path, port=5000):
     # Detector 초기화
     detector = YOLODetectorWithMessenger(model_path)
 
+    # 가중치 파일이 바뀌면 자동 교체 (MODEL_WATCH=1)
+    if os.environ.get('MODEL_WATCH') == '1':
+        detector.models.watch()
+
     # 카메라를 백그라운드 스레드에서 실행
     camera_thread = threading.Thread(target=detector.run_camera, daemon=True)
     camera_thread.start()
@@ -291,8 +312,8 @@ def start_server(model_path, port=5000):
 
 # ===== 실행 =====
 if __name__ == "__main__":
-    # 모델 경로 설정
-    model_path = r'C:\Users\dnjsr\Desktop\YOLO_Project\runs\detect\mounting_detection3\weights\best.pt'
+    # 모델 경로 설정 (MODEL_PATH 환경변수 > run 인덱스 최고 mAP50-95 모델)
+    model_path = resolve_model_path()
 
     # 서버 시작
     start_server(
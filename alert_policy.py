@@ -0,0 +1,199 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+DAY = 24 * 3600
+
+
+class ClassPolicy:
+    """클래스 하나의 알림 규칙
+
+    cooldown_s: 알림 후 다시 알릴 수 있을 때까지 (카메라별)
+    min_hits:   연속 몇 번의 추론에서 보여야 알림 (debounce, 흔들린 한 프레임 무시)
+    max_alerts / window_s: window_s 동안 최대 알림 수 (rate limit, 0이면 제한 없음)
+    """
+
+    __slots__ = ('cooldown_s', 'min_hits', 'max_alerts', 'window_s')
+
+    def __init__(self, cooldown_s=0.0, min_hits=1, max_alerts=0, window_s=3600.0):
+        self.cooldown_s = cooldown_s
+        self.min_hits = min_hits
+        self.max_alerts = max_alerts
+        self.window_s = window_s
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class _State:
+    __slots__ = ('last_alert', 'streak', 'recent')
+
+    def __init__(self, last_alert=None, recent=()):
+        self.last_alert = last_alert
+        self.streak = 0
+        self.recent = deque(recent)
+
+
+class AlertPolicy:
+    """카메라 x 클래스별 쿨다운 / debounce / rate limit
+
+    - 상태는 메모리에만 두고 조회는 dict 접근뿐 (프레임마다 불러도 됨)
+    - 알림이 생기면 dirty 표시만 하고, 백그라운드 스레드가 flush_interval마다
+      한 번에 원자적으로 저장 (tmp + os.replace) - 알림마다 파일을 다시 쓰지 않음
+    - 예전 alert_log.json ({클래스: ISO 시각}) 도 읽음 (camera='default')
+    """
+
+    def __init__(self, policies, path=None, flush_interval=2.0, default_camera='default'):
+        self.policies = policies
+        self.path = path
+        self.default_camera = default_camera
+        self._states = {}
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._closed = False
+        self.flushes = 0
+        if path is not None:
+            self._load()
+            self._thread = threading.Thread(target=self._flush_loop, args=(flush_interval,),
+                                            name='alert-policy', daemon=True)
+            self._thread.start()
+
+    def _state(self, camera, class_name):
+        key = (camera, class_name)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _State()
+        return state
+
+    # ===== 조회 =====
+
+    def next_allowed(self, camera, class_name, now=None):
+        """다시 알릴 수 있는 시각 (epoch, 지금 가능하면 None)"""
+        now = time.time() if now is None else now
+        policy = self.policies.get(class_name)
+        state = self._states.get((camera, class_name))
+        if policy is None or state is None:
+            return None
+        waits = []
+        if state.last_alert is not None and now - state.last_alert < policy.cooldown_s:
+            waits.append(state.last_alert + policy.cooldown_s)
+        if policy.max_alerts:
+            recent = [t for t in state.recent if now - t < policy.window_s]
+            if len(recent) >= policy.max_alerts:
+                waits.append(recent[-policy.max_alerts] + policy.window_s)
+        return max(waits) if waits else None
+
+    def active_classes(self, camera, classes=None, now=None):
+        """지금 알림이 가능한 클래스 (쿨다운 / rate limit 중인 클래스 제외)
+
+        여기 없는 클래스는 추론 클래스 필터에서 빼도 된다 (어차피 알릴 수 없음)
+        """
+        now = time.time() if now is None else now
+        classes = self.policies if classes is None else classes
+        return {c for c in classes if self.next_allowed(camera, c, now) is None}
+
+    # ===== 갱신 =====
+
+    def observe(self, camera, class_name, now=None):
+        """임계값을 넘은 탐지 한 건 -> 지금 알려야 하면 True (알림으로 기록됨)"""
+        now = time.time() if now is None else now
+        policy = self.policies.get(class_name)
+        if policy is None:
+            return True
+        with self._lock:
+            state = self._state(camera, class_name)
+            state.streak += 1
+            if state.streak < policy.min_hits or self.next_allowed(camera, class_name, now) is not None:
+                return False
+            state.last_alert = now
+            state.streak = 0
+            state.recent.append(now)
+            while state.recent and now - state.recent[0] >= policy.window_s:
+                state.recent.popleft()
+        self._dirty.set()
+        return True
+
+    def end_frame(self, camera, seen):
+        """추론 한 번이 끝남 - 이번에 안 보인 클래스는 연속 횟수 초기화
+
+        observe()는 추론 한 번에 클래스당 한 번만 (박스마다 부르면 debounce가 무의미)
+        """
+        with self._lock:
+            for (cam, class_name), state in self._states.items():
+                if cam == camera and class_name not in seen:
+                    state.streak = 0
+
+    # ===== 저장 =====
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if 'cameras' not in data:
+            # 예전 형식 {클래스: ISO 시각}
+            data = {'cameras': {self.default_camera: {c: {'last_alert': t} for c, t in data.items()}}}
+        for camera, classes in data['cameras'].items():
+            for class_name, saved in classes.items():
+                last = saved.get('last_alert')
+                self._states[(camera, class_name)] = _State(
+                    datetime.fromisoformat(last).timestamp() if last else None,
+                    [datetime.fromisoformat(t).timestamp() for t in saved.get('recent', [])])
+
+    def snapshot(self):
+        cameras = {}
+        with self._lock:
+            for (camera, class_name), state in self._states.items():
+                if state.last_alert is None:
+                    continue
+                cameras.setdefault(camera, {})[class_name] = {
+                    'last_alert': datetime.fromtimestamp(state.last_alert).isoformat(),
+                    'recent': [datetime.fromtimestamp(t).isoformat() for t in state.recent],
+                }
+        return {'version': 2, 'cameras': cameras}
+
+    def flush(self):
+        """지금 바로 저장 (변경이 없으면 아무것도 안 함)"""
+        if self.path is None or not self._dirty.is_set():
+            return
+        self._dirty.clear()
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+        self.flushes += 1
+
+    def _flush_loop(self, interval):
+        while not self._closed:
+            self._dirty.wait()
+            time.sleep(interval)  # 그동안 생긴 알림은 한 번에 저장
+            try:
+                self.flush()
+            except OSError as e:
+                self._dirty.set()
+                print(f"❌ 알림 기록 저장 실패: {e}")
+
+    def close(self):
+        self._closed = True
+        self.flush()
+
+    def status(self, camera=None, now=None):
+        now = time.time() if now is None else now
+        camera = camera or self.default_camera
+        rows = {}
+        for class_name, policy in self.policies.items():
+            state = self._states.get((camera, class_name))
+            until = self.next_allowed(camera, class_name, now)
+            rows[class_name] = {
+                "active": until is None,
+                "next_allowed": datetime.fromtimestamp(until).isoformat() if until else None,
+                "last_alert": datetime.fromtimestamp(state.last_alert).isoformat()
+                if state and state.last_alert else None,
+                "streak": state.streak if state else 0,
+                **policy.to_dict(),
+            }
+        return rows
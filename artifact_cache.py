@@ -0,0 +1,283 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from importlib import metadata
+from pathlib import Path
+
+from run_index import PROJECT_DIR
+
+# 가중치에서 만든 파생 파일 (fused 모델 / ONNX / OpenVINO / TorchScript) 캐시
+CACHE_DIR = Path(os.environ.get('ARTIFACT_CACHE_DIR', PROJECT_DIR / 'runs' / 'artifacts'))
+MAX_BYTES = int(float(os.environ.get('ARTIFACT_CACHE_MB', 2048)) * 1024 * 1024)
+INDEX_FILE = 'index.json'
+
+# 캐시 포맷 버전 (빌드 방식이 바뀌면 올려서 기존 항목 무효화)
+CACHE_VERSION = 1
+
+# backend -> (ultralytics export format, 버전을 키에 넣을 패키지)
+BACKENDS = {
+    'fused': (None, ()),
+    'onnx': ('onnx', ('onnx',)),
+    'openvino': ('openvino', ('openvino',)),
+    'torchscript': ('torchscript', ()),
+}
+
+
+def package_versions(names):
+    versions = {}
+    for name in ('ultralytics', 'torch', *names):
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def dir_bytes(path):
+    path = Path(path)
+    if path.is_file():
+        return path.stat().st_size
+    return sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
+
+
+class ArtifactCache:
+    """가중치 해시 + imgsz + backend + 라이브러리 버전으로 찾는 파생 모델 캐시
+
+    - 항목 하나 = 폴더 하나 (root/<weights 이름>-<backend>-<imgsz>-<key>/)
+    - index.json에 항목별 크기 / 마지막 사용 시각, 가중치 해시 메모 (크기+mtime이 같으면 다시 해시 안 함)
+    - 넣을 때 max_bytes를 넘으면 오래 안 쓴 항목부터 삭제 (LRU)
+    - 빌드는 임시 폴더에서 하고 rename으로 공개 (서버 여러 개가 동시에 빌드해도 반쪽 파일이 안 보임)
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    # ===== 인덱스 =====
+
+    def _load_index(self):
+        try:
+            with open(self.root / INDEX_FILE) as f:
+                index = json.load(f)
+            if index.get('version') == CACHE_VERSION:
+                return index
+        except (OSError, ValueError):
+            pass
+        return {'version': CACHE_VERSION, 'entries': {}, 'hashes': {}}
+
+    def _save_index(self, index):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f'{INDEX_FILE}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp, self.root / INDEX_FILE)
+
+    def weights_hash(self, weights, index=None):
+        """가중치 내용 해시 (크기 + mtime이 그대로면 인덱스의 값 재사용)"""
+        from dataset_cache import file_hash
+
+        weights = str(Path(weights).resolve())
+        st = os.stat(weights)
+        stat = [st.st_size, st.st_mtime_ns]
+        index = index if index is not None else self._load_index()
+        memo = index['hashes'].get(weights)
+        if memo and memo['stat'] == stat:
+            return memo['hash']
+        digest = file_hash(weights)
+        index['hashes'][weights] = {'stat': stat, 'hash': digest}
+        return digest
+
+    def key(self, weights, backend, imgsz, index=None):
+        """-> (항목 키, 키를 만든 값들)"""
+        if backend not in BACKENDS:
+            raise ValueError(f"알 수 없는 backend: {backend} ({', '.join(BACKENDS)})")
+        spec = {
+            'weights_hash': self.weights_hash(weights, index),
+            'backend': backend,
+            'imgsz': int(imgsz),
+            'versions': package_versions(BACKENDS[backend][1]),
+            'cache_version': CACHE_VERSION,
+        }
+        digest = hashlib.blake2b(json.dumps(spec, sort_keys=True).encode(), digest_size=8).hexdigest()
+        return f"{Path(weights).stem}-{backend}-{int(imgsz)}-{digest}", spec
+
+    # ===== 조회 / 빌드 =====
+
+    def get(self, weights, backend, imgsz):
+        """캐시된 파일 경로 (없으면 None) - 사용 시각 갱신"""
+        index = self._load_index()
+        key, _ = self.key(weights, backend, imgsz, index)
+        entry = index['entries'].get(key)
+        if entry is None or not (self.root / entry['path']).exists():
+            self._save_index(index)  # 해시 메모는 남김
+            return None
+        entry['last_used'] = time.time()
+        entry['hits'] = entry.get('hits', 0) + 1
+        self._save_index(index)
+        return self.root / entry['path']
+
+    def build(self, weights, backend, imgsz, force=False):
+        """파생 파일을 만들어 캐시에 넣고 경로 반환 (force: 같은 키가 있어도 다시)"""
+        index = self._load_index()
+        key, spec = self.key(weights, backend, imgsz, index)
+        final = self.root / key
+        tmp = self.root / f'.tmp-{key}-{os.getpid()}'
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+
+        start = time.perf_counter()
+        try:
+            artifact = _build(weights, backend, int(imgsz), tmp)
+            if force:
+                shutil.rmtree(final, ignore_errors=True)
+            try:
+                os.replace(tmp, final)
+            except OSError:
+                # 다른 프로세스가 먼저 만들었으면 그것을 씀
+                shutil.rmtree(tmp, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        build_s = time.perf_counter() - start
+
+        # 처음 읽은 인덱스를 그대로 (key()가 넣은 해시 메모 유지) + 빌드하는 동안 다른 프로세스가 넣은 항목만 합침
+        for other_key, entry in self._load_index()['entries'].items():
+            index['entries'].setdefault(other_key, entry)
+        index['entries'][key] = {
+            **spec,
+            'weights': str(Path(weights).resolve()),
+            'path': f'{key}/{artifact.name}',
+            'bytes': dir_bytes(final),
+            'build_s': round(build_s, 1),
+            'created': time.time(),
+            'last_used': time.time(),
+            'hits': 0,
+        }
+        self.evict(index, keep={key})
+        self._save_index(index)
+        print(f"📦 캐시 생성: {key} ({index['entries'][key]['bytes'] / 1e6:.1f}MB, {build_s:.1f}초)")
+        return self.root / index['entries'][key]['path']
+
+    def path_for(self, weights, backend, imgsz=640):
+        """캐시에 있으면 바로, 없으면 빌드"""
+        return self.get(weights, backend, imgsz) or self.build(weights, backend, imgsz)
+
+    # ===== 정리 =====
+
+    def evict(self, index=None, keep=(), max_bytes=None):
+        """전체 크기가 max_bytes 이하가 될 때까지 오래 안 쓴 항목 삭제 -> 삭제한 키 목록"""
+        save = index is None
+        index = index if index is not None else self._load_index()
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = index['entries']
+
+        # 폴더가 사라진 항목 정리
+        for key in [k for k, e in entries.items() if not (self.root / e['path']).exists()]:
+            del entries[key]
+
+        removed = []
+        total = sum(e['bytes'] for e in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]['last_used']):
+            if total <= max_bytes:
+                break
+            if key in keep:
+                continue
+            total -= entries[key]['bytes']
+            shutil.rmtree(self.root / key, ignore_errors=True)
+            del entries[key]
+            removed.append(key)
+        if save:
+            self._save_index(index)
+        return removed
+
+    def entries(self):
+        return self._load_index()['entries']
+
+
+def _build(weights, backend, imgsz, out_dir):
+    """out_dir 안에 파생 파일 생성 -> 파일/폴더 경로"""
+    from ultralytics import YOLO
+
+    fmt = BACKENDS[backend][0]
+    if fmt is None:
+        # Conv+BN을 합친 모델을 ultralytics 체크포인트 형식으로 저장 (YOLO()로 바로 로드)
+        import torch
+
+        yolo = YOLO(weights)
+        ckpt = {'model': yolo.model.fuse(verbose=False).eval(),
+                'train_args': (yolo.ckpt or {}).get('train_args', {}),
+                'date': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        path = out_dir / 'fused.pt'
+        torch.save(ckpt, path)
+        return path
+
+    # export 결과는 가중치 옆에 생기므로 사본에서 export (원래 폴더를 건드리지 않음)
+    local = out_dir / Path(weights).name
+    shutil.copy2(weights, local)
+    # ONNX / OpenVINO는 동적 입력 -> 다른 imgsz로 추론해도 다시 export 안 함
+    exported = Path(YOLO(str(local)).export(format=fmt, imgsz=imgsz, dynamic=fmt in ('onnx', 'openvino'),
+                                            verbose=False))
+    local.unlink()
+    return out_dir / exported.name
+
+
+def load_cached(weights, backend, imgsz=640, cache=None):
+    """캐시된 파생 모델로 YOLO 생성 (없으면 먼저 빌드)"""
+    from ultralytics import YOLO
+
+    path = (cache or ArtifactCache()).path_for(weights, backend, imgsz)
+    return YOLO(str(path), task='detect')
+
+
+def print_entries(entries):
+    if not entries:
+        print("(캐시 비어 있음)")
+        return
+    total = 0
+    print(f"{'key':<52}{'MB':>8}{'hits':>6}  last used")
+    for key, e in sorted(entries.items(), key=lambda kv: -kv[1]['last_used']):
+        total += e['bytes']
+        used = time.strftime('%Y-%m-%d %H:%M', time.localtime(e['last_used']))
+        print(f"{key:<52}{e['bytes'] / 1e6:>8.1f}{e.get('hits', 0):>6}  {used}")
+    print(f"합계 {total / 1e6:.1f}MB / 상한 {MAX_BYTES / 1e6:.0f}MB")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='파생 모델 캐시 (fused / ONNX / OpenVINO / TorchScript)')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p_warm = sub.add_parser('prewarm', help='학습 후 미리 빌드')
+    p_warm.add_argument('--weights', default=None, help='가중치 (기본: run 인덱스 선택)')
+    p_warm.add_argument('--backend', nargs='+', default=['fused'], choices=list(BACKENDS))
+    p_warm.add_argument('--imgsz', type=int, nargs='+', default=[640])
+    p_warm.add_argument('--force', action='store_true', help='있어도 다시 빌드')
+    sub.add_parser('list', help='캐시 항목')
+    p_evict = sub.add_parser('evict', help='LRU로 크기 줄이기')
+    p_evict.add_argument('--max-mb', type=float, default=None)
+    sub.add_parser('clear', help='전부 삭제')
+    opt = parser.parse_args()
+
+    cache = ArtifactCache()
+    if opt.cmd == 'prewarm':
+        from run_index import resolve_model_path
+
+        weights = opt.weights or resolve_model_path()
+        for backend in opt.backend:
+            for imgsz in opt.imgsz:
+                path = None if opt.force else cache.get(weights, backend, imgsz)
+                if path is not None:
+                    print(f"✅ 이미 있음: {path}")
+                else:
+                    cache.build(weights, backend, imgsz, force=opt.force)
+    elif opt.cmd == 'list':
+        print_entries(cache.entries())
+    elif opt.cmd == 'evict':
+        max_bytes = None if opt.max_mb is None else int(opt.max_mb * 1024 * 1024)
+        removed = cache.evict(max_bytes=max_bytes)
+        print(f"🗑️  {len(removed)}개 삭제" + (f": {', '.join(removed)}" if removed else ""))
+    elif opt.cmd == 'clear':
+        shutil.rmtree(cache.root, ignore_errors=True)
+        print(f"🗑️  {cache.root} 삭제")
@@ -0,0 +1,330 @@
+import asyncio
+import contextlib
+import functools
+import itertools
+import time
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from cpu_plan import pin_thread
+from h264_stream import STREAM_METERS, H264Stream, shared_stream
+import infer_api
+from model_manager import ADMIN_DENIED, admin_authorized, check_reload_path, select_manager
+from stream_pacing import CLIENTS, PROFILES, encode_jpeg, mjpeg_part
+from tracing import TRACER, span, trace_filename
+
+
+class JpegHub:
+    """새 프레임을 profile별로 한 번만 JPEG로 인코딩해서 viewer들이 같은 bytes를 공유
+
+    viewer마다 스레드/인코딩/복사가 없고, 연결 하나는 코루틴 하나뿐이라
+    수백 개의 /video_feed 연결을 적은 메모리로 유지할 수 있다.
+    viewer마다 ClientPacer가 send 대기 시간을 보고 fps / 품질 단계를 정하며,
+    지금 쓰이는 단계만 인코딩한다 (느린 viewer가 있어야 낮은 품질을 만듦).
+    """
+
+    def __init__(self, lease_frame, fps=30):
+        self.lease_frame = lease_frame
+        self.interval = 1 / fps
+        self.viewers = 0
+        self.seq = -1
+        self.chunks = {}
+        self.leased_at = None
+        self._event = asyncio.Event()
+        self._viewer_ids = itertools.count()
+
+    def _encode(self, frame, levels):
+        pin_thread('encode')
+        with span('encode', 'stream', levels=len(levels)):
+            return {level: mjpeg_part(encode_jpeg(frame, PROFILES[level])) for level in levels}
+
+    async def run(self):
+        """새 프레임이 있고 viewer가 있을 때만 인코딩 (인코딩은 스레드에서)"""
+        while True:
+            await asyncio.sleep(self.interval)
+            levels = CLIENTS.levels('mjpeg-asgi')
+            if not levels:
+                continue
+            lease = self.lease_frame(self.seq, 0)
+            if lease is None:
+                continue
+            with lease:
+                leased_at = time.perf_counter()
+                self.chunks = await asyncio.to_thread(self._encode, lease.frame, levels)
+                self.seq = lease.seq
+                self.leased_at = leased_at
+            event, self._event = self._event, asyncio.Event()
+            event.set()
+
+    async def stream(self):
+        """viewer 하나의 MJPEG 스트림 (client 속도에 맞춰 건너뛰고 쉼)"""
+        self.viewers += 1
+        viewer = next(self._viewer_ids)
+        meter = STREAM_METERS['mjpeg']
+        metered = meter.connect()
+        pacer = CLIENTS.connect('mjpeg-asgi')
+        last = -1
+        try:
+            while True:
+                chunk = self.chunks.get(pacer.level)
+                if chunk is None or self.seq <= last:
+                    # 새 프레임 (또는 이 단계의 인코딩) 대기
+                    await self._event.wait()
+                    continue
+                seq, leased_at = self.seq, self.leased_at
+                # yield가 돌아올 때까지 = 이 viewer에게 쓰는 시간 (uvicorn이 transport drain을 기다림)
+                start = time.perf_counter()
+                yield chunk
+                done = time.perf_counter()
+                meter.add(metered, len(chunk))
+                pacer.record(leased_at, start, done, len(chunk), seq - last - 1 if last >= 0 else 0)
+                last = seq
+                if TRACER.enabled:
+                    TRACER.complete_async('send', 'stream', int(start * 1e9), int(done * 1e9), viewer)
+                delay = pacer.delay(done)
+                if delay:
+                    await asyncio.sleep(delay)
+        finally:
+            self.viewers -= 1
+            meter.disconnect(metered)
+            CLIENTS.disconnect(pacer)
+
+
+class TraceMiddleware:
+    """추적 중일 때만 HTTP 요청 span 기록 (asyncio라 요청끼리 겹치므로 async span)"""
+
+    def __init__(self, app):
+        self.app = app
+        self._ids = itertools.count()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not TRACER.enabled:
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter_ns()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            TRACER.complete_async(f"{scope['method']} {scope['path']}", 'http', start,
+                                  time.perf_counter_ns(), f"http-{next(self._ids)}")
+
+
+def create_app(get_detector, messages, lease_frame, health_payload, status_payload):
+    """Flask 서버와 같은 라우트를 가진 Starlette 앱
+
+    get_detector(): 현재 detector (시작 중이면 None)
+    lease_frame(after_seq, timeout): 프레임 링에서 새 프레임 임대 (없으면 None)
+    """
+    hub = JpegHub(lease_frame)
+
+    def not_ready():
+        return JSONResponse(health_payload(), status_code=503)
+
+    async def health(request):
+        """서버 상태 확인 (준비 전에는 503)"""
+        payload = health_payload()
+        return JSONResponse(payload, status_code=200 if payload['ready'] else 503)
+
+    async def status(request):
+        """현재 카메라 상태"""
+        if get_detector() is None:
+            return not_ready()
+        return JSONResponse({**status_payload(), "stream_viewers": hub.viewers})
+
+    async def video_feed(request):
+        """실시간 비디오 스트림 (MJPEG)"""
+        return StreamingResponse(hub.stream(), media_type='multipart/x-mixed-replace; boundary=frame')
+
+    async def video_h264(request):
+        """저대역 비디오 스트림 (H.264 fragmented MP4)
+
+        async 제너레이터 - viewer가 많아도 anyio 스레드 풀(기본 40개)을 잡지 않음
+        """
+        if not H264Stream.available():
+            return JSONResponse({"success": False, "message": "ffmpeg가 없습니다 (H.264 스트림 사용 불가)"},
+                                status_code=503)
+        return StreamingResponse(shared_stream(lease_frame).astream(), media_type='video/mp4',
+                                 headers={'Cache-Control': 'no-store'})
+
+    async def detect(class_name):
+        # 추론/후처리 Future를 await - 이벤트 루프는 막히지 않음
+        detector = get_detector()
+        if detector is None:
+            return not_ready()
+        result = await asyncio.wrap_future(detector.detect_ondemand_async(class_name, 0.6))
+        return JSONResponse(result, status_code=200 if result['success'] else 400)
+
+    async def detect_sale(request):
+        """앱에서 '판매' 버튼을 눌렀을 때"""
+        return await detect('sale')
+
+    async def detect_impossibility(request):
+        """앱에서 '불가능' 버튼을 눌렀을 때"""
+        return await detect('impossibility')
+
+    async def infer(request):
+        """외부 이미지 탐지 (multipart 파일 여러 장 또는 raw JPEG/PNG body)"""
+        detector = get_detector()
+        if detector is None:
+            return not_ready()
+        if not hasattr(detector, 'submit_images'):
+            return JSONResponse({"success": False, "message": "브로커 모드에서는 지원하지 않습니다"}, status_code=501)
+        try:
+            model, min_conf = infer_api.parse_options(request.query_params, detector.managers,
+                                                      int(request.headers.get('content-length') or 0))
+            labels, blobs = await infer_api.starlette_images(request)
+            infer_api.check_images(blobs)
+        except infer_api.InferRequestError as e:
+            return JSONResponse({"success": False, "message": str(e)}, status_code=e.status)
+
+        # 디코딩은 스레드에서, 추론 결과는 Future를 await (이벤트 루프는 막히지 않음)
+        submitted = await asyncio.to_thread(detector.submit_images, blobs, model)
+        results = [None if s is None else (s[0], await asyncio.wrap_future(s[1])) for s in submitted]
+        return JSONResponse(infer_api.images_payload(labels, results, detector.managers[model].names, min_conf))
+
+    async def get_messages(request):
+        """모든 메시지 조회"""
+        try:
+            limit = int(request.query_params.get('limit', 50))
+        except ValueError:
+            limit = 50
+        return JSONResponse({
+            "success": True,
+            "total": len(messages),
+            "messages": list(messages)[-limit:]
+        })
+
+    async def get_latest_message(request):
+        """최신 메시지만 조회 (Figma 앱이 자주 호출)"""
+        if len(messages) == 0:
+            return Response(status_code=204)
+        return JSONResponse({"success": True, "message": messages[-1]})
+
+    async def clear_messages(request):
+        """메시지 초기화"""
+        messages.clear()
+        return JSONResponse({"success": True, "message": "모든 메시지 삭제됨"})
+
+    def model_manager(request):
+        """?model=ondemand 처럼 고름 (캐스케이드가 아니면 모델 하나)"""
+        detector = get_detector()
+        if detector is None:
+            return None
+        return select_manager(getattr(detector, 'managers', detector.models), request.query_params.get('model'))
+
+    def requires_admin(view):
+        """ADMIN_TOKEN 헤더가 없으면 401"""
+        @functools.wraps(view)
+        async def wrapper(request):
+            if not admin_authorized(request.headers):
+                return JSONResponse({"success": False, "message": ADMIN_DENIED}, status_code=401)
+            return await view(request)
+        return wrapper
+
+    def no_model():
+        return JSONResponse({"success": False, "message": "모델을 사용할 수 없습니다 (시작 중이거나 브로커 모드)"}, status_code=404)
+
+    @requires_admin
+    async def admin_model(request):
+        """모델 / reload / 섀도 상태"""
+        models = model_manager(request)
+        if models is None:
+            return no_model()
+        return JSONResponse(models.status())
+
+    @requires_admin
+    async def admin_model_reload(request):
+        """새 가중치 로드"""
+        models = model_manager(request)
+        if models is None:
+            return no_model()
+        try:
+            body = await request.json()
+        except ValueError:
+            body = {}
+        try:
+            state = models.reload(check_reload_path(body.get('path')), shadow=bool(body.get('shadow')),
+                                           sample_rate=float(body.get('sample_rate', 0.1)),
+                                           force=bool(body.get('force')))
+        except PermissionError as e:
+            return JSONResponse({"success": False, "message": str(e)}, status_code=403)
+        except FileNotFoundError as e:
+            return JSONResponse({"success": False, "message": f"파일 없음: {e}"}, status_code=404)
+        except RuntimeError as e:
+            return JSONResponse({"success": False, "message": str(e)}, status_code=409)
+        return JSONResponse({"success": True, "reload": state}, status_code=202)
+
+    @requires_admin
+    async def admin_model_promote(request):
+        """섀도 모델을 라이브로 승격"""
+        models = model_manager(request)
+        if models is None:
+            return no_model()
+        if not models.promote():
+            return JSONResponse({"success": False, "message": "섀도 모델 없음"}, status_code=400)
+        return JSONResponse({"success": True, **models.status()})
+
+    @requires_admin
+    async def admin_trace(request):
+        """N초 동안 추적 -> Chrome trace / Perfetto JSON 다운로드"""
+        try:
+            seconds = float(request.query_params.get('seconds', 5))
+            sample_hz = int(request.query_params.get('sample_hz', 0))
+        except ValueError:
+            return JSONResponse({"success": False, "message": "seconds / sample_hz는 숫자여야 합니다"}, status_code=400)
+        try:
+            trace = await asyncio.to_thread(TRACER.capture, seconds, sample_hz)
+        except RuntimeError as e:
+            return JSONResponse({"success": False, "message": str(e)}, status_code=409)
+        return JSONResponse(trace, headers={'Content-Disposition': f'attachment; filename={trace_filename()}'})
+
+    @requires_admin
+    async def admin_model_stop_shadow(request):
+        """섀도 모드 종료"""
+        models = model_manager(request)
+        if models is None:
+            return no_model()
+        models.stop_shadow()
+        return JSONResponse({"success": True})
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        task = asyncio.create_task(hub.run())
+        yield
+        task.cancel()
+
+    routes = [
+        Route('/health', health, methods=['GET']),
+        Route('/status', status, methods=['GET']),
+        Route('/video_feed', video_feed, methods=['GET']),
+        Route('/video_h264', video_h264, methods=['GET']),
+        Route('/detect_sale', detect_sale, methods=['POST']),
+        Route('/detect_impossibility', detect_impossibility, methods=['POST']),
+        Route('/infer', infer, methods=['POST']),
+        Route('/get_messages', get_messages, methods=['GET']),
+        Route('/get_latest_message', get_latest_message, methods=['GET']),
+        Route('/clear_messages', clear_messages, methods=['POST']),
+        Route('/admin/model', admin_model, methods=['GET']),
+        Route('/admin/model/reload', admin_model_reload, methods=['POST']),
+        Route('/admin/model/promote', admin_model_promote, methods=['POST']),
+        Route('/admin/model/shadow', admin_model_stop_shadow, methods=['DELETE']),
+        Route('/admin/trace', admin_trace, methods=['GET', 'POST']),
+    ]
+    middleware = [Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*']),
+                  Middleware(TraceMiddleware)]
+    app = Starlette(routes=routes, middleware=middleware, lifespan=lifespan)
+    app.state.hub = hub
+    return app
+
+
+def serve(get_detector, messages, lease_frame, health_payload, status_payload, host='0.0.0.0', port=5000):
+    """uvicorn으로 실행 (uvloop/httptools가 있으면 자동 사용)"""
+    import uvicorn
+
+    app = create_app(get_detector, messages, lease_frame, health_payload, status_payload)
+    print(f"⚡ ASGI 모드로 실행: http://{host}:{port}")
+    uvicorn.run(app, host=host, port=port, log_level='warning', backlog=2048, timeout_keep_alive=30)
@@ -0,0 +1,416 @@
+import glob
+import os
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from cpu_plan import pin_thread
+
+# 기본 소스 (CAMERA_SOURCE 환경변수: 0 / rtsp://... / http://... / 영상 경로 / replay:경로)
+DEFAULT_SOURCE = os.environ.get('CAMERA_SOURCE', '0')
+
+STREAM_SCHEMES = ('rtsp://', 'rtsps://', 'rtmp://', 'http://', 'https://', 'udp://', 'tcp://')
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class SourceStats:
+    """소스별 fps / 지연 통계
+
+    - capture_fps: 소스에서 받아온 프레임 속도
+    - delivered_fps: 소비자가 가져간 프레임 속도
+    - dropped: 소비자가 가져가기 전에 더 새 프레임으로 덮인 수
+    - latency_ms: 캡처 시각부터 소비자가 받을 때까지 걸린 시간 (프레임 나이)
+    """
+
+    def __init__(self, window=120):
+        self.captured = deque(maxlen=window)
+        self.delivered = deque(maxlen=window)
+        self.latency = deque(maxlen=window)
+        self.frames = 0
+        self.dropped = 0
+        self.reconnects = 0
+
+    @staticmethod
+    def _fps(stamps):
+        if len(stamps) < 2 or stamps[-1] == stamps[0]:
+            return 0.0
+        return round((len(stamps) - 1) / (stamps[-1] - stamps[0]), 1)
+
+    def on_capture(self, t):
+        self.frames += 1
+        self.captured.append(t)
+
+    def on_deliver(self, captured_at, skipped=0):
+        now = time.perf_counter()
+        self.delivered.append(now)
+        self.latency.append((now - captured_at) * 1000)
+        self.dropped += skipped
+
+    def to_dict(self):
+        latency = sorted(self.latency)
+        return {
+            "frames": self.frames,
+            "capture_fps": self._fps(self.captured),
+            "delivered_fps": self._fps(self.delivered),
+            "dropped": self.dropped,
+            "reconnects": self.reconnects,
+            "latency_ms": {
+                "avg": round(sum(latency) / len(latency), 2) if latency else None,
+                "p95": round(latency[min(len(latency) - 1, int(len(latency) * 0.95))], 2) if latency else None,
+            },
+        }
+
+
+def copy_into(out, frame):
+    """frame을 out 버퍼에 복사 (크기가 다르면 리사이즈)"""
+    if out.shape == frame.shape:
+        np.copyto(out, frame)
+    else:
+        cv2.resize(frame, (out.shape[1], out.shape[0]), dst=out)
+    return out
+
+
+# ===== 카메라 / 스트림 / 파일 =====
+
+class CaptureSource:
+    """OpenCV 캡처 + 전용 grabber 스레드
+
+    grabber가 쉬지 않고 읽어서 OpenCV 내부 버퍼를 비우므로 read()는 항상
+    가장 최근 프레임을 돌려준다 (오래된 프레임이 쌓여 지연되지 않음).
+    읽기에 실패하면 끊긴 것으로 보고 backoff(0.5초 -> 최대 10초)로 다시 연결한다.
+    파일은 원본 fps로 재생하고 끝나면 처음부터 반복 (loop=False면 종료).
+    """
+
+    def __init__(self, target, kind, width=1280, height=720, fps=30, loop=True,
+                 backoff=0.5, max_backoff=10.0):
+        self.target = target
+        self.kind = kind
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.loop = loop
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.state = 'connecting'
+        self.last_error = None
+        self.stats = SourceStats()
+
+        # grabber는 back 버퍼에 쓰고, lock 안에서 front와 교체
+        self._front = None
+        self._back = None
+        self._seq = 0
+        self._captured_at = 0.0
+        self._delivered_seq = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __repr__(self):
+        return f"CaptureSource({self.kind}: {self.target})"
+
+    # ----- grabber -----
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._grab_loop, name=f'grab-{self.kind}', daemon=True)
+            self._thread.start()
+        return self
+
+    def _open(self):
+        cap = cv2.VideoCapture(self.target)
+        if self.kind == 'webcam':
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+            cap.set(cv2.CAP_PROP_FPS, self.fps)
+        # 백엔드가 지원하면 내부 버퍼를 1장으로 (지원 안 하면 무시됨)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        return cap
+
+    def _set_state(self, state, error=None):
+        with self._cond:
+            self.state = state
+            if error is not None:
+                self.last_error = error
+            self._cond.notify_all()
+
+    def _grab_loop(self):
+        pin_thread('capture')
+        cap = None
+        failures = 0
+        interval = 0.0
+        next_at = 0.0
+
+        try:
+            while not self._stop.is_set():
+                if cap is None:
+                    cap = self._open()
+                    if cap is None:
+                        if self.kind == 'file':
+                            self._set_state('ended', f"파일을 열 수 없습니다: {self.target}")
+                            return
+                        failures += 1
+                        delay = min(self.max_backoff, self.backoff * 2 ** (failures - 1))
+                        self._set_state('reconnecting', f"연결 실패 (재시도 {delay:.1f}초 후)")
+                        self._stop.wait(delay)
+                        continue
+                    if self.kind == 'file':
+                        # 파일은 카메라처럼 원본 속도로 흘려보냄
+                        interval = 1 / (cap.get(cv2.CAP_PROP_FPS) or self.fps)
+                        next_at = time.perf_counter()
+                    if self.stats.frames:
+                        self.stats.reconnects += 1
+                    self._set_state('streaming')
+
+                ok, image = cap.read(self._back)
+                if not ok:
+                    if self.kind == 'file':
+                        if self.loop:
+                            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                            continue
+                        self._set_state('ended')
+                        return
+                    # USB 분리 / 네트워크 끊김 -> 다시 연결
+                    cap.release()
+                    cap = None
+                    failures = 1
+                    self._set_state('reconnecting', "프레임 읽기 실패")
+                    self._stop.wait(self.backoff)
+                    continue
+                failures = 0
+
+                now = time.perf_counter()
+                with self._cond:
+                    self._back, self._front = self._front, image
+                    self._seq += 1
+                    self._captured_at = now
+                    self._cond.notify_all()
+                self.stats.on_capture(now)
+
+                if interval:
+                    next_at += interval
+                    delay = next_at - time.perf_counter()
+                    if delay > 0:
+                        self._stop.wait(delay)
+                    else:
+                        next_at = time.perf_counter()
+        finally:
+            if cap is not None:
+                cap.release()
+
+    # ----- 소비자 -----
+
+    @property
+    def ended(self):
+        return self.state in ('ended', 'closed')
+
+    def read(self, out=None, timeout=1.0):
+        """아직 받지 않은 최신 프레임 (out이 있으면 거기에 복사) - timeout 안에 없으면 None"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > self._delivered_seq or self.ended, timeout):
+                return None
+            if self._seq <= self._delivered_seq:
+                return None
+            skipped = self._seq - self._delivered_seq - 1 if self._delivered_seq else 0
+            self._delivered_seq = self._seq
+            frame = copy_into(out, self._front) if out is not None else self._front.copy()
+            captured_at = self._captured_at
+        self.stats.on_deliver(captured_at, skipped)
+        return frame
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self._set_state('closed')
+
+    def status(self):
+        return {
+            "source": str(self.target),
+            "kind": self.kind,
+            "state": self.state,
+            "last_error": self.last_error,
+            **self.stats.to_dict(),
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ===== 결정적 재생 (테스트 / 부하 테스트) =====
+
+def load_frames(path, max_frames=600):
+    """영상 파일 또는 이미지 폴더 -> 프레임 리스트 (순서 고정)"""
+    if os.path.isdir(path):
+        files = sorted(f for f in glob.glob(os.path.join(path, '*')) if f.lower().endswith(IMAGE_EXTS))
+        frames = [cv2.imread(f) for f in files[:max_frames]]
+        return [f for f in frames if f is not None]
+
+    cap = cv2.VideoCapture(path)
+    frames = []
+    try:
+        while len(frames) < max_frames:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            frames.append(frame)
+    finally:
+        cap.release()
+    return frames
+
+
+def synthetic_frames(count=60, shape=(720, 1280, 3), seed=0):
+    """카메라 / 데이터 없이 쓰는 고정 프레임 (같은 seed면 항상 같은 내용)"""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 255, shape, dtype=np.uint8)
+    frames = []
+    for i in range(count):
+        frame = base.copy()
+        cv2.putText(frame, f"replay {i}", (20, 60), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 3)
+        frames.append(frame)
+    return frames
+
+
+class ReplaySource:
+    """미리 읽어 둔 프레임을 순서대로 재생
+
+    프레임을 건너뛰지 않으므로 소비자가 느려도 같은 순서의 같은 프레임을 받는다.
+    fps를 주면 그 속도에 맞춰 내보내고, 0/None이면 소비자가 읽는 대로 바로 준다.
+    """
+
+    kind = 'replay'
+
+    def __init__(self, frames, fps=30, loop=True, name='replay'):
+        if not frames:
+            raise ValueError(f"재생할 프레임이 없습니다: {name}")
+        self.frames = frames
+        self.fps = fps
+        self.loop = loop
+        self.name = name
+        self.index = 0
+        self.state = 'streaming'
+        self.last_error = None
+        self.stats = SourceStats()
+        self._next_at = None
+
+    def __repr__(self):
+        return f"ReplaySource({self.name}, {len(self.frames)} frames)"
+
+    @classmethod
+    def from_path(cls, path, fps=30, loop=True, max_frames=600):
+        return cls(load_frames(path, max_frames), fps=fps, loop=loop, name=path)
+
+    def start(self):
+        return self
+
+    @property
+    def ended(self):
+        return self.state in ('ended', 'closed')
+
+    def read(self, out=None, timeout=1.0):
+        if self.ended:
+            return None
+        if self.index >= len(self.frames):
+            if not self.loop:
+                self.state = 'ended'
+                return None
+            self.index = 0
+
+        if self.fps:
+            # 소비자가 늦으면 기다리지 않고 바로 다음 프레임 (밀린 만큼 몰아서 주지 않음)
+            now = time.perf_counter()
+            self._next_at = now if self._next_at is None else max(now, self._next_at + 1 / self.fps)
+            time.sleep(self._next_at - now)
+
+        captured_at = time.perf_counter()
+        frame = self.frames[self.index]
+        self.index += 1
+        self.stats.on_capture(captured_at)
+        result = copy_into(out, frame) if out is not None else frame.copy()
+        self.stats.on_deliver(captured_at)
+        return result
+
+    def close(self):
+        self.state = 'closed'
+
+    def status(self):
+        return {
+            "source": self.name,
+            "kind": self.kind,
+            "state": self.state,
+            "last_error": self.last_error,
+            "position": self.index,
+            "length": len(self.frames),
+            **self.stats.to_dict(),
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ===== 소스 선택 =====
+
+def parse_source(spec):
+    """소스 문자열 -> (종류, 대상)
+
+    0, 1 ...          -> ('webcam', 카메라 번호)
+    rtsp:// http:// -> ('stream', URL)
+    replay:경로       -> ('replay', 영상/이미지 폴더, 'synthetic'이면 생성 프레임)
+    그 외             -> ('file', 영상 경로)
+    """
+    spec = str(DEFAULT_SOURCE if spec is None or spec == '' else spec).strip()
+    if spec.isdigit():
+        return 'webcam', int(spec)
+    if spec.lower().startswith(STREAM_SCHEMES):
+        return 'stream', spec
+    if spec.startswith('replay:'):
+        return 'replay', spec[len('replay:'):]
+    return 'file', spec
+
+
+def open_source(spec=None, width=1280, height=720, fps=30, loop=True):
+    """소스를 열고 (grabber 시작) 돌려줌 - spec이 없으면 CAMERA_SOURCE"""
+    kind, target = parse_source(spec)
+    if kind == 'replay':
+        if target in ('', 'synthetic'):
+            source = ReplaySource(synthetic_frames(shape=(height, width, 3)), fps=fps, loop=loop, name='synthetic')
+        else:
+            if not os.path.exists(target):
+                raise FileNotFoundError(target)
+            source = ReplaySource.from_path(target, fps=fps, loop=loop)
+    else:
+        if kind == 'file' and not os.path.exists(target):
+            raise FileNotFoundError(target)
+        source = CaptureSource(target, kind, width=width, height=height, fps=fps, loop=loop)
+    print(f"🎥 영상 소스: {source!r}")
+    return source.start()
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='영상 소스 확인 (fps / 지연 / 재연결)')
+    parser.add_argument('source', nargs='?', default=None, help='0 / rtsp://... / 영상 경로 / replay:경로')
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--work-ms', type=float, default=0.0, help='프레임마다 흉내 낼 처리 시간')
+    opt = parser.parse_args()
+
+    with open_source(opt.source) as src:
+        end = time.perf_counter() + opt.seconds
+        while time.perf_counter() < end and not src.ended:
+            if src.read(timeout=1.0) is not None and opt.work_ms:
+                time.sleep(opt.work_ms / 1000)
+        print(json.dumps(src.status(), indent=2, ensure_ascii=False))
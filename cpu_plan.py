@@ -0,0 +1,193 @@
+import os
+import threading
+from collections import Counter
+
+# 단계 이름
+STAGES = ('inference', 'capture', 'encode', 'io')
+PROFILES = ('latency', 'fps', 'off')
+
+
+def cpu_topology():
+    """이 프로세스가 쓸 수 있는 논리 CPU를 물리 코어별로 묶음 -> [[0, 4], [1, 5], ...]
+
+    /sys 토폴로지가 없으면 (리눅스가 아니거나 컨테이너) 논리 CPU 하나를 코어 하나로 본다.
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+
+    cores = {}
+    for cpu in cpus:
+        base = f'/sys/devices/system/cpu/cpu{cpu}/topology'
+        try:
+            with open(f'{base}/physical_package_id') as f:
+                package = int(f.read())
+            with open(f'{base}/core_id') as f:
+                key = (package, int(f.read()))
+        except (OSError, ValueError):
+            key = (0, cpu)
+        cores.setdefault(key, []).append(cpu)
+    return [cores[key] for key in sorted(cores, key=lambda k: cores[k][0])]
+
+
+def _flat(cores):
+    return sorted(cpu for core in cores for cpu in core)
+
+
+class CpuPlan:
+    """추론 / 캡처 / 인코딩 / I/O 스레드의 CPU 배분
+
+    profile
+      - latency: 추론은 물리 코어당 스레드 하나 (SMT 형제는 GEMM 지연을 흔듦),
+                 OpenCV 스레드 풀은 1로 줄여서 추론 코어를 건드리지 않음
+      - fps:     추론에 SMT까지 모두 쓰고 인코딩 코어를 더 줌 (코어 6개 이상이면 2개)
+      - off:     아무것도 바꾸지 않고 현재 값만 보고
+    pin=True면 각 단계 스레드가 시작할 때 자기 코어 묶음으로 affinity를 건다 (리눅스).
+    """
+
+    def __init__(self, profile='latency', pin=False, topology=None):
+        if profile not in PROFILES:
+            raise ValueError(f"알 수 없는 프로필: {profile} ({', '.join(PROFILES)})")
+        self.profile = profile
+        self.pin = pin and profile != 'off' and hasattr(os, 'sched_setaffinity')
+        self.topology = topology or cpu_topology()
+        self.stages = {}
+        self.torch_threads = None
+        self.interop_threads = None
+        self.cv2_threads = None
+        self.applied = {}
+        self.pinned = Counter()
+        self.errors = []
+        if profile != 'off':
+            self._plan()
+
+    def _plan(self):
+        cores = self.topology
+        n = len(cores)
+        if n >= 3:
+            encode = 2 if self.profile == 'fps' and n >= 6 else 1
+            io, enc, infer = cores[:1], cores[1:1 + encode], cores[1 + encode:]
+        elif n == 2:
+            io = enc = cores[:1]
+            infer = cores[1:]
+        else:
+            io = enc = infer = cores
+
+        self.stages = {
+            # latency: SMT 형제는 비워 둠
+            'inference': _flat(infer) if self.profile == 'fps' else [core[0] for core in infer],
+            'capture': _flat(io),
+            'encode': _flat(enc),
+            'io': _flat(io),
+        }
+        if self.profile == 'latency':
+            self.torch_threads = len(infer)
+            self.interop_threads = 1
+            self.cv2_threads = 1
+        else:
+            self.torch_threads = len(self.stages['inference'])
+            self.interop_threads = 2
+            self.cv2_threads = len(self.stages['encode'])
+
+    # ===== 적용 =====
+
+    def apply_env(self):
+        """torch import 전에 OpenMP / MKL 스레드 수 (이미 지정돼 있으면 그대로)"""
+        if self.torch_threads:
+            for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS'):
+                os.environ.setdefault(name, str(self.torch_threads))
+
+    def apply_cv2(self):
+        import cv2
+
+        if self.cv2_threads:
+            cv2.setNumThreads(self.cv2_threads)
+        self.applied['cv2_threads'] = cv2.getNumThreads()
+
+    def apply_torch(self):
+        """torch 스레드 수 (모델 로드 직전에 - torch import가 여기서 일어남)"""
+        import torch
+
+        if self.torch_threads:
+            torch.set_num_threads(self.torch_threads)
+        if self.interop_threads:
+            try:
+                torch.set_num_interop_threads(self.interop_threads)
+            except RuntimeError as e:
+                # inter-op 풀이 이미 시작됐으면 바꿀 수 없음
+                self.errors.append(f"interop: {e}")
+        self.applied['torch_threads'] = torch.get_num_threads()
+        self.applied['interop_threads'] = torch.get_num_interop_threads()
+
+    def to_dict(self):
+        return {
+            "profile": self.profile,
+            "pin": self.pin,
+            "physical_cores": len(self.topology),
+            "logical_cpus": len(_flat(self.topology)),
+            "planned": {"torch_threads": self.torch_threads, "interop_threads": self.interop_threads,
+                        "cv2_threads": self.cv2_threads},
+            "applied": dict(self.applied),
+            "stages": self.stages,
+            "pinned_threads": dict(self.pinned),
+            "errors": self.errors[-5:],
+        }
+
+
+# ===== 프로세스 공용 계획 =====
+
+PLAN = None
+_local = threading.local()
+
+
+def plan_from_env():
+    """CPU_PROFILE=latency|fps|off (기본 latency), CPU_PIN=1 이면 코어 고정 -> 전역 PLAN"""
+    global PLAN
+    PLAN = CpuPlan(os.environ.get('CPU_PROFILE', 'latency'), os.environ.get('CPU_PIN') == '1')
+    PLAN.apply_env()
+    PLAN.apply_cv2()
+    return PLAN
+
+
+def pin_thread(stage):
+    """현재 스레드를 stage 코어 묶음에 고정 (계획이 없거나 pin=False면 아무것도 안 함)
+
+    스레드마다 한 번만 syscall - 프레임 루프 안에서 불러도 됨.
+    새로 만든 스레드는 만든 스레드의 affinity를 물려받으므로 단계마다 다시 불러야 한다.
+    """
+    plan = PLAN
+    if plan is None or not plan.pin or getattr(_local, 'stage', None) == stage:
+        return
+    cpus = plan.stages.get(stage)
+    if not cpus:
+        return
+    try:
+        os.sched_setaffinity(0, cpus)
+    except OSError as e:
+        plan.errors.append(f"{stage}: {e}")
+        return
+    _local.stage = stage
+    plan.pinned[stage] += 1
+
+
+def apply_torch():
+    """전역 계획의 torch 스레드 수 적용 (계획이 없으면 아무것도 안 함)"""
+    if PLAN is not None:
+        PLAN.apply_torch()
+
+
+def plan_stats():
+    return PLAN.to_dict() if PLAN is not None else None
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='CPU 토폴로지와 단계별 코어 배분 미리보기')
+    parser.add_argument('--profile', default='latency', choices=PROFILES)
+    parser.add_argument('--pin', action='store_true')
+    opt = parser.parse_args()
+
+    print(json.dumps(CpuPlan(opt.profile, opt.pin).to_dict(), indent=2))
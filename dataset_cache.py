@@ -0,0 +1,370 @@
+import hashlib
+import json
+import math
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 이미지 확장자
+IMG_EXTS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+# 캐시 포맷 버전 (포맷이 바뀌면 올려서 기존 캐시 무효화)
+CACHE_VERSION = 1
+
+# 패딩 색 (ultralytics letterbox와 동일)
+PAD_VALUE = 114
+
+
+# ===== 파일 유틸 =====
+
+def iter_files(folder, exts=None):
+    """폴더 안의 파일 경로를 정렬된 순서로 반환 (list(glob) 없이 scandir 사용)"""
+    folder = Path(folder)
+    if not folder.is_dir():
+        return []
+    with os.scandir(folder) as it:
+        names = [e.name for e in it
+                 if e.is_file() and (exts is None or os.path.splitext(e.name)[1].lower() in exts)]
+    return [folder / n for n in sorted(names)]
+
+
+def count_files(folder):
+    """폴더 안의 파일 개수 (리스트를 만들지 않고 셈)"""
+    if not os.path.isdir(folder):
+        return 0
+    with os.scandir(folder) as it:
+        return sum(1 for e in it if e.is_file())
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """파일 내용 해시 (blake2b 128bit)"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_dir_for(images_dir, imgsz):
+    """train/images -> train/.cache_640"""
+    return Path(images_dir).parent / f".cache_{imgsz}"
+
+
+# ===== 전처리 =====
+
+def letterbox_into(im, imgsz, out):
+    """긴 변을 imgsz로 리사이즈해서 out(imgsz x imgsz) 좌상단에 쓰고 나머지는 패딩
+
+    리사이즈 규칙은 ultralytics BaseDataset.load_image(rect_mode)와 동일하게 맞춤
+    """
+    h0, w0 = im.shape[:2]
+    r = imgsz / max(h0, w0)
+    if r != 1:
+        w, h = min(math.ceil(w0 * r), imgsz), min(math.ceil(h0 * r), imgsz)
+        im = cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR)
+    h, w = im.shape[:2]
+    out[:h, :w] = im
+    out[h:, :] = PAD_VALUE
+    out[:h, w:] = PAD_VALUE
+    return (h0, w0), (h, w)
+
+
+def read_labels(label_path):
+    """YOLO 라벨 파일 읽기 -> [[cls, x, y, w, h], ...]"""
+    if not os.path.exists(label_path):
+        return []
+    rows = []
+    with open(label_path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 5:
+                rows.append([int(float(parts[0]))] + [round(float(v), 6) for v in parts[1:5]])
+    return rows
+
+
+# ===== 캐시 생성 =====
+
+def _label_stats(files, labels_dir):
+    """이미지별 라벨 파일 [크기, mtime_ns] (없으면 None)"""
+    stats = {}
+    for path in files:
+        try:
+            st = (labels_dir / (path.stem + '.txt')).stat()
+            stats[path.name] = [st.st_size, st.st_mtime_ns]
+        except OSError:
+            stats[path.name] = None
+    return stats
+
+
+def write_label_index(files, labels_dir, cache_dir):
+    """labels.json (이미지별 라벨 + 클래스별 개수) - 라벨 파일이 그대로면 건너뜀 -> 새로 썼으면 True"""
+    labels_path = cache_dir / 'labels.json'
+    stats = _label_stats(files, labels_dir)
+    try:
+        with open(labels_path) as f:
+            if json.load(f).get('label_stats') == stats:
+                return False
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    label_index = {'classes': {}, 'images': {}, 'label_stats': stats}
+    for path in files:
+        rows = read_labels(labels_dir / (path.stem + '.txt'))
+        label_index['images'][path.name] = rows
+        for row in rows:
+            key = str(row[0])
+            label_index['classes'][key] = label_index['classes'].get(key, 0) + 1
+    tmp_path = cache_dir / 'labels.json.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(label_index, f)
+    os.replace(tmp_path, labels_path)
+    return True
+
+
+def prepare_split_cache(split_dir, imgsz=640, workers=None):
+    """한 split(train/valid/test)의 이미지 캐시 + 라벨 인덱스 생성
+
+    - 이미지: (N, imgsz, imgsz, 3) uint8 memmap (images.u8)
+    - index.json: 파일명, 해시, 원본/리사이즈 크기
+    - labels.json: 이미지별 라벨 + 클래스별 개수
+    해시가 같은 이미지는 기존 캐시에서 복사하고 바뀐 이미지만 다시 디코딩
+    (이미지가 그대로여도 라벨 파일의 크기 / mtime이 바뀌면 labels.json은 다시 만듦)
+    """
+    split_dir = Path(split_dir)
+    images_dir = split_dir / 'images'
+    labels_dir = split_dir / 'labels'
+    cache_dir = cache_dir_for(images_dir, imgsz)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    files = iter_files(images_dir, IMG_EXTS)
+    with ThreadPoolExecutor(workers) as pool:
+        hashes = list(pool.map(file_hash, files))
+
+    # 기존 캐시 로드
+    old_index, old_mm = {}, None
+    index_path = cache_dir / 'index.json'
+    data_path = cache_dir / 'images.u8'
+    if index_path.exists() and data_path.exists():
+        try:
+            with open(index_path) as f:
+                old = json.load(f)
+            if old.get('version') == CACHE_VERSION and old.get('imgsz') == imgsz and old['files']:
+                old_index = {e['name']: (i, e) for i, e in enumerate(old['files'])}
+                old_mm = np.memmap(data_path, dtype=np.uint8, mode='r',
+                                   shape=(len(old['files']), imgsz, imgsz, 3))
+        except (OSError, ValueError, KeyError):
+            old_index, old_mm = {}, None
+
+    entries = [None] * len(files)
+    todo = []
+    for i, (path, digest) in enumerate(zip(files, hashes)):
+        hit = old_index.get(path.name)
+        if hit is not None and hit[1]['hash'] == digest:
+            entries[i] = dict(hit[1])
+        else:
+            todo.append(i)
+
+    if old_mm is not None and not todo and len(old_index) == len(files):
+        # 이미지 변경 없음 - 라벨만 확인
+        del old_mm
+        if write_label_index(files, labels_dir, cache_dir):
+            print(f"   ✅ {split_dir.name}/: 이미지 캐시 유효 ({len(files)}장), 라벨 인덱스 갱신")
+        else:
+            print(f"   ✅ {split_dir.name}/: 캐시 유효 ({len(files)}장)")
+        return cache_dir
+
+    tmp_path = cache_dir / 'images.u8.tmp'
+    mm = np.memmap(tmp_path, dtype=np.uint8, mode='w+', shape=(max(len(files), 1), imgsz, imgsz, 3))
+
+    # 해시가 같은 이미지는 기존 캐시에서 복사
+    for i, entry in enumerate(entries):
+        if entry is not None:
+            mm[i] = old_mm[old_index[files[i].name][0]]
+
+    def decode(i):
+        im = cv2.imread(str(files[i]))
+        if im is None:
+            return i, None
+        hw0, hw = letterbox_into(im, imgsz, mm[i])
+        return i, (hw0, hw)
+
+    skipped = 0
+    with ThreadPoolExecutor(workers) as pool:
+        for i, shapes in pool.map(decode, todo):
+            if shapes is None:
+                skipped += 1
+                continue
+            entries[i] = {'name': files[i].name, 'hash': hashes[i], 'hw0': shapes[0], 'hw': shapes[1]}
+
+    mm.flush()
+    del mm
+    if old_mm is not None:
+        del old_mm
+    os.replace(tmp_path, data_path)
+
+    # 디코딩 실패한 이미지는 인덱스에 None으로 남겨서 원래 경로로 로드하게 함
+    index = {'version': CACHE_VERSION, 'imgsz': imgsz, 'files': [
+        e if e is not None else {'name': files[i].name, 'hash': hashes[i], 'hw0': None, 'hw': None}
+        for i, e in enumerate(entries)]}
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
+
+    write_label_index(files, labels_dir, cache_dir)
+
+    print(f"   ✅ {split_dir.name}/: 캐시 생성 {len(todo) - skipped}장, 재사용 {len(files) - len(todo)}장"
+          + (f", 실패 {skipped}장" if skipped else ""))
+    return cache_dir
+
+
+def prepare_dataset_cache(dataset_folder, imgsz=640, splits=('train', 'valid')):
+    """데이터셋 전체 캐시 준비"""
+    print(f"\n🗃️  데이터셋 캐시 준비 (imgsz={imgsz})...")
+    for split in splits:
+        if (Path(dataset_folder) / split / 'images').is_dir():
+            prepare_split_cache(Path(dataset_folder) / split, imgsz)
+
+
+def clear_dataset_cache(dataset_folder):
+    """캐시 폴더 삭제"""
+    for split in ('train', 'valid', 'test'):
+        for d in (Path(dataset_folder) / split).glob('.cache_*'):
+            shutil.rmtree(d, ignore_errors=True)
+
+
+def load_label_index(images_dir, imgsz=640):
+    """labels.json 로드 (없으면 None)"""
+    path = cache_dir_for(images_dir, imgsz) / 'labels.json'
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+# ===== 학습 시 캐시 읽기 =====
+
+class MemmapImageCache:
+    """memmap 이미지 캐시 읽기 전용 뷰
+
+    DataLoader 워커로 넘어갈 때 memmap은 피클하지 않고 워커에서 다시 연다
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        with open(self.cache_dir / 'index.json') as f:
+            index = json.load(f)
+        self.imgsz = index['imgsz']
+        self.files = index['files']
+        self.rows = {e['name']: i for i, e in enumerate(self.files) if e['hw'] is not None}
+        self._mm = None
+
+    @classmethod
+    def open_for(cls, images_dir, imgsz):
+        """이미지 폴더에 맞는 캐시가 있으면 열고, 없으면 None"""
+        cache_dir = cache_dir_for(images_dir, imgsz)
+        if not (cache_dir / 'index.json').exists():
+            return None
+        cache = cls(cache_dir)
+        return cache if cache.imgsz == imgsz else None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_mm'] = None
+        return state
+
+    def _array(self):
+        if self._mm is None:
+            self._mm = np.memmap(self.cache_dir / 'images.u8', dtype=np.uint8, mode='r',
+                                 shape=(len(self.files), self.imgsz, self.imgsz, 3))
+        return self._mm
+
+    def load(self, im_file):
+        """(이미지, 원본 크기, 리사이즈 크기) 또는 None
+
+        증강이 이미지를 제자리 수정하므로 읽기 전용 memmap에서 복사본을 반환
+        """
+        row = self.rows.get(os.path.basename(im_file))
+        if row is None:
+            return None
+        entry = self.files[row]
+        h, w = entry['hw']
+        return np.ascontiguousarray(self._array()[row, :h, :w]), tuple(entry['hw0']), (h, w)
+
+
+def make_cached_trainer():
+    """memmap 캐시를 읽는 DetectionTrainer 클래스 생성 (ultralytics는 필요할 때 import)"""
+    from ultralytics.data.dataset import YOLODataset
+    from ultralytics.models.yolo.detect import DetectionTrainer
+
+    class CachedYOLODataset(YOLODataset):
+        image_cache = None
+
+        def load_image(self, i, rect_mode=True):
+            hit = self.image_cache.load(self.im_files[i]) if self.image_cache and rect_mode else None
+            if hit is None:
+                return super().load_image(i) if rect_mode else super().load_image(i, rect_mode=False)
+            if self.augment:
+                # Mosaic이 buffer에서 인덱스를 고르므로 인덱스만 유지 (이미지는 memmap에 있음)
+                self.buffer.append(i)
+                if len(self.buffer) >= self.max_buffer_length:
+                    self.buffer.pop(0)
+            return hit
+
+    class CachedDetectionTrainer(DetectionTrainer):
+        def build_dataset(self, img_path, mode='train', batch=None):
+            dataset = super().build_dataset(img_path, mode, batch)
+            cache = MemmapImageCache.open_for(img_path, self.args.imgsz) if isinstance(img_path, str) else None
+            if cache is not None:
+                dataset.__class__ = CachedYOLODataset
+                dataset.image_cache = cache
+                print(f"🗃️  {mode}: memmap 캐시 사용 ({len(cache.rows)}장)")
+            return dataset
+
+    return CachedDetectionTrainer
+
+
+def default_workers():
+    """플랫폼에 맞는 DataLoader 워커 수 (Windows는 spawn 문제로 0)"""
+    if os.name == 'nt':
+        return 0
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return max(0, min(8, cpus - 1))
+
+
+def mean_epoch_time(results_csv):
+    """results.csv의 누적 time 컬럼으로 epoch당 평균 시간(초) 계산"""
+    if not os.path.exists(results_csv):
+        return None
+    with open(results_csv) as f:
+        header = [h.strip() for h in f.readline().split(',')]
+        rows = [line.split(',') for line in f if line.strip()]
+    if 'time' not in header or not rows:
+        return None
+    col = header.index('time')
+    times = [float(r[col]) for r in rows]
+    return times[-1] / len(times)
+
+
+# ===== 실행 =====
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='데이터셋 memmap 캐시 생성')
+    parser.add_argument('--dataset', default=str(Path.home() / 'Desktop' / '-2.v12i.yolov8'))
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--clear', action='store_true', help='캐시 삭제')
+    opt = parser.parse_args()
+
+    if opt.clear:
+        clear_dataset_cache(opt.dataset)
+        print("🗑️  캐시 삭제 완료")
+    else:
+        prepare_dataset_cache(opt.dataset, opt.imgsz)
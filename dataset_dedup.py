@@ -0,0 +1,231 @@
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import yaml
+
+from dataset_cache import IMG_EXTS, iter_files, read_labels
+from image_hash import HashIndex, phash
+
+SPLITS = ('train', 'valid', 'test')
+# pHash 해밍 거리가 이 이하면 같은 장면 (연속 영상 프레임)
+MAX_DIST = 6
+HASH_CACHE = '.phash.json'
+# dedup 출력 폴더 표식 (이게 있는 폴더만 다시 덮어씀)
+REPORT_NAME = 'dedup_report.json'
+
+
+# ===== 해시 =====
+
+def _hash_image(path):
+    # JPEG는 디코딩 단계에서 1/4로 줄여 회색으로 읽음 (pHash는 32x32만 필요)
+    im = cv2.imread(str(path), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if im is None:
+        im = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+    return None if im is None else phash(im)
+
+
+def hash_split(split_dir, workers=None):
+    """split의 이미지별 pHash -> {파일명: hash} (병렬, 크기+mtime이 같으면 캐시 재사용)
+
+    캐시는 split/.phash.json (디코딩 실패한 이미지는 빠짐)
+    """
+    split_dir = Path(split_dir)
+    files = iter_files(split_dir / 'images', IMG_EXTS)
+    cache_path = split_dir / HASH_CACHE
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+
+    stats = {}
+    todo = []
+    for path in files:
+        st = path.stat()
+        stats[path.name] = [st.st_size, st.st_mtime_ns]
+        hit = cache.get(path.name)
+        if hit is None or hit[:2] != stats[path.name]:
+            todo.append(path)
+
+    # cv2 디코딩은 GIL을 놓으므로 스레드로 충분
+    with ThreadPoolExecutor(workers or os.cpu_count() or 1) as pool:
+        for path, h in zip(todo, pool.map(_hash_image, todo)):
+            cache[path.name] = stats[path.name] + [None if h is None else f'{h:016x}']
+
+    cache = {name: cache[name] for name in stats}
+    if todo:
+        tmp = cache_path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp, cache_path)
+    return {name: int(entry[2], 16) for name, entry in cache.items() if entry[2] is not None}
+
+
+# ===== 분석 =====
+
+def analyze(dataset_folder, max_dist=MAX_DIST, workers=None):
+    """중복 클러스터 + split 간 누수
+
+    - 클러스터: split마다 라벨 많은 이미지부터 대표로 뽑고, 기존 대표와 max_dist 이내면 그 클러스터에 넣음
+      (대표만 남기면 빠진 이미지는 모두 남은 이미지와 max_dist 이내)
+    - 누수: valid/test 이미지 중 train (test는 train+valid) 의 어느 이미지와든 max_dist 이내인 것
+    """
+    dataset_folder = Path(dataset_folder)
+    splits = [s for s in SPLITS if (dataset_folder / s / 'images').is_dir()]
+    everything = HashIndex(max_dist)
+    hashes, labels = {}, {}
+    for split in splits:
+        hashes[split] = hash_split(dataset_folder / split, workers)
+        labels[split] = {name: len(read_labels(dataset_folder / split / 'labels' / f'{Path(name).stem}.txt'))
+                         for name in hashes[split]}
+        for name, h in hashes[split].items():
+            everything.add((split, name), h)
+
+    report = {"dataset": str(dataset_folder), "max_dist": max_dist, "splits": {}}
+    keep = {}
+    for i, split in enumerate(splits):
+        earlier = set(splits[:i])
+        leaders = HashIndex(max_dist)
+        clusters = {}
+        leaks = {}
+        order = sorted(hashes[split], key=lambda name: (-labels[split][name], name))
+        for name in order:
+            h = hashes[split][name]
+            if earlier:
+                leaked = [(dist, key) for dist, key in everything.query(h) if key[0] in earlier]
+                if leaked:
+                    dist, (other_split, other) = leaked[0]
+                    leaks[name] = {"split": other_split, "image": other, "dist": dist}
+            near = leaders.nearest(h)
+            if near is None:
+                leaders.add(name, h)
+                clusters[name] = [name]
+            else:
+                clusters[near[1]].append(name)
+
+        duplicates = [members for members in clusters.values() if len(members) > 1]
+        # 대표가 다른 split으로 새면 그 클러스터 전체가 빠짐 -> 남는 대표만
+        keep[split] = [leader for leader in clusters if leader not in leaks]
+        report["splits"][split] = {
+            "images": len(hashes[split]),
+            "clusters": len(clusters),
+            "duplicate_clusters": len(duplicates),
+            "redundant_images": len(hashes[split]) - len(clusters),
+            "largest_clusters": sorted(duplicates, key=len, reverse=True)[:10],
+            "leaked_images": len(leaks),
+            "leaked_ratio": round(len(leaks) / len(hashes[split]), 3) if hashes[split] else 0.0,
+            "leaks": dict(list(leaks.items())[:20]),
+            "kept_after_dedup": len(keep[split]),
+        }
+    return report, keep
+
+
+# ===== 중복 제거 데이터셋 =====
+
+def _link(src, dst):
+    """하드링크 (다른 파일시스템이면 복사)"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _check_out_folder(dataset_folder, out_folder):
+    """out_folder를 지워도 되는지 - 원본이거나 원본을 품고 있거나, 이전 dedup 결과가 아닌 폴더면 ValueError"""
+    src, out = dataset_folder.resolve(), out_folder.resolve()
+    if out == src or out in src.parents:
+        raise ValueError(f"출력 폴더가 원본({src})이거나 원본을 포함합니다: {out}")
+    if src in out.parents:
+        raise ValueError(f"출력 폴더가 원본 안에 있습니다: {out}")
+    if out.exists():
+        if not out.is_dir():
+            raise ValueError(f"출력 경로가 폴더가 아닙니다: {out}")
+        # 비어 있지 않으면 이전 dedup 결과(리포트가 있는 폴더)만 덮어씀
+        if any(out.iterdir()) and not (out / REPORT_NAME).is_file():
+            raise ValueError(f"출력 폴더가 비어 있지 않고 {REPORT_NAME}도 없습니다 (다른 경로를 지정하세요): {out}")
+
+
+def write_dedup(dataset_folder, out_folder, keep):
+    """keep {split: [파일명]} 만 out_folder에 (images + labels 하드링크) + data.yaml
+
+    out_folder는 지우고 새로 만듦 - 원본과 겹치거나, 비어 있지 않은데 이전 dedup 결과가 아니면 ValueError
+    """
+    dataset_folder, out_folder = Path(dataset_folder), Path(out_folder)
+    _check_out_folder(dataset_folder, out_folder)
+    shutil.rmtree(out_folder, ignore_errors=True)
+    # 표식부터 - 중간에 실패해도 다음 실행이 이 폴더를 다시 덮어쓸 수 있게 (리포트는 dedup_dataset이 채움)
+    out_folder.mkdir(parents=True)
+    (out_folder / REPORT_NAME).write_text('{}')
+    for split, names in keep.items():
+        (out_folder / split / 'images').mkdir(parents=True)
+        (out_folder / split / 'labels').mkdir(parents=True)
+        for name in names:
+            _link(dataset_folder / split / 'images' / name, out_folder / split / 'images' / name)
+            label = dataset_folder / split / 'labels' / f'{Path(name).stem}.txt'
+            if label.exists():
+                _link(label, out_folder / split / 'labels' / label.name)
+
+    data = {}
+    if (dataset_folder / 'data.yaml').exists():
+        with open(dataset_folder / 'data.yaml') as f:
+            data = yaml.safe_load(f) or {}
+    data.update({'path': str(out_folder.resolve()), 'train': 'train/images', 'val': 'valid/images'})
+    if 'test' in keep:
+        data['test'] = 'test/images'
+    else:
+        data.pop('test', None)
+    with open(out_folder / 'data.yaml', 'w') as f:
+        yaml.dump(data, f, default_flow_style=False, allow_unicode=True)
+    return out_folder / 'data.yaml'
+
+
+def dedup_dataset(dataset_folder, out_folder=None, max_dist=MAX_DIST, workers=None):
+    """분석 후 중복 제거 복사본 생성 -> (출력 폴더, data.yaml, 리포트)"""
+    dataset_folder = Path(dataset_folder)
+    out_folder = Path(out_folder or dataset_folder.with_name(dataset_folder.name + '-dedup'))
+    report, keep = analyze(dataset_folder, max_dist, workers)
+    print_report(report)
+    data_yaml = write_dedup(dataset_folder, out_folder, keep)
+    with open(out_folder / REPORT_NAME, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✅ 중복 제거 데이터셋: {out_folder}")
+    return out_folder, data_yaml, report
+
+
+def print_report(report):
+    print(f"\n🔍 중복 / 누수 분석 (pHash 거리 <= {report['max_dist']})")
+    for split, s in report["splits"].items():
+        print(f"   {split}/: {s['images']}장 -> 장면 {s['clusters']}개 "
+              f"(중복 {s['redundant_images']}장, 클러스터 {s['duplicate_clusters']}개)"
+              + (f", 누수 {s['leaked_images']}장 ({s['leaked_ratio']:.1%})" if s['leaked_images'] else "")
+              + f" -> 남김 {s['kept_after_dedup']}장")
+        for members in s["largest_clusters"][:3]:
+            print(f"      {len(members)}장: {', '.join(members[:3])}{' ...' if len(members) > 3 else ''}")
+    if any(s['leaked_images'] for s in report["splits"].values()):
+        print("   ⚠️  valid/test가 train과 같은 장면을 포함 -> results.csv의 mAP가 실제보다 높게 나옵니다")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='데이터셋 중복 이미지 / split 누수 분석')
+    parser.add_argument('--dataset', default=str(Path.home() / 'Desktop' / '-2.v12i.yolov8'))
+    parser.add_argument('--max-dist', type=int, default=MAX_DIST, help='같은 장면으로 볼 pHash 해밍 거리')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--write', nargs='?', const='', default=None,
+                        help='중복 제거 복사본 생성 (경로 생략 시 <dataset>-dedup)')
+    parser.add_argument('--json', default=None, help='리포트 저장 경로')
+    opt = parser.parse_args()
+
+    if opt.write is not None:
+        _, _, report = dedup_dataset(opt.dataset, opt.write or None, opt.max_dist, opt.workers)
+    else:
+        report, _ = analyze(opt.dataset, opt.max_dist, opt.workers)
+        print_report(report)
+    if opt.json:
+        with open(opt.json, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
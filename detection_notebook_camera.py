@@ -1,11 +1,15 @@
 import cv2
 import torch
 from ultralytics import YOLO
-from datetime import datetime, timedelta
+from datetime import datetime
 import requests
 import time
-import json
 import os
+from alert_policy import DAY, AlertPolicy, ClassPolicy
+from camera_source import open_source
+from hard_examples import harvester_from_env
+from inference_worker import Detections
+from run_index import resolve_model_path
 
 # Discord 설정
 DISCORD_WEBHOOK_URL = "YOUR_DISCORD_WEBHOOK_URL"
@@ -15,45 +19,29 @@ MONTHLY_CLASSES = ['impossibility', 'sale']
 # 실시간 탐지 클래스
 REALTIME_CLASSES = ['mounting']
 
+# 클래스별 알림 규칙 (카메라마다 따로 적용)
+POLICIES = {
+    # 연속 2번 보이면 알림, 같은 카메라는 10초에 한 번, 시간당 최대 30번
+    'mounting': ClassPolicy(cooldown_s=10, min_hits=2, max_alerts=30, window_s=3600),
+    # 월 1회 클래스는 30일 쿨다운 (그동안은 추론 대상에서도 빠짐)
+    'impossibility': ClassPolicy(cooldown_s=30 * DAY, min_hits=2),
+    'sale': ClassPolicy(cooldown_s=30 * DAY, min_hits=2),
+}
+# 여러 카메라를 돌릴 때 쿨다운을 나누는 이름
+CAMERA_NAME = os.environ.get('CAMERA_NAME', 'default')
+
 
 class YOLODetectorNotebook:
     def __init__(self, model_path, webhook_url):
         self.model = YOLO(model_path)
         self.webhook_url = webhook_url
 
-        # 마지막 알림 시간 저장 파일
+        # 카메라 x 클래스별 쿨다운 / debounce / rate limit (alert_log.json에 모아서 저장)
         self.alert_log_file = 'alert_log.json'
-        self.last_alert_time = self.load_alert_log()
-
-    def load_alert_log(self):
-        """저장된 마지막 알림 시간 로드"""
-        if os.path.exists(self.alert_log_file):
-            try:
-                with open(self.alert_log_file, 'r') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
-
-    def save_alert_log(self):
-        """마지막 알림 시간 저장"""
-        with open(self.alert_log_file, 'w') as f:
-            json.dump(self.last_alert_time, f, indent=4)
-
-    def can_alert_monthly_class(self, class_name):
-        """월 1회 클래스 알림 가능 여부 확인"""
-        if class_name not in self.last_alert_time:
-            return True
-
-        last_time_str = self.last_alert_time[class_name]
-        last_time = datetime.fromisoformat(last_time_str)
-        current_time = datetime.now()
-
-        # 마지막 알림으로부터 30일이 지났는지 확인
-        if (current_time - last_time).days >= 30:
-            return True
-
-        return False
+        self.camera = CAMERA_NAME
+        self.policy = AlertPolicy(POLICIES, self.alert_log_file)
+        # 임계값 근처의 애매한 프레임 수집 (HARVEST=1)
+        self.harvester = harvester_from_env(self.model.names)
 
     def send_discord_alert(self, class_name, confidence, days_until_next=None):
         """디스코드로 알림 전송"""
@@ -93,11 +81,14 @@ class YOLODetectorNotebook:
             print(f"❌ 디스코드 전송 실패: {e}")
 
     def handle_detection(self, class_name, confidence, confidence_threshold):
-        """감지된 클래스 처리"""
+        """감지된 클래스 처리 (알림 여부는 정책 엔진이 결정)"""
 
         if confidence < confidence_threshold:
             return False
 
+        if not self.policy.observe(self.camera, class_name):
+            return False
+
         # ====== REALTIME 클래스 ======
         if class_name in REALTIME_CLASSES:
             print(f"⚡ 실시간 감지: {class_name} ({confidence:.2%})")
@@ -105,43 +96,24 @@ class YOLODetectorNotebook:
             return True
 
         # ====== MONTHLY 클래스 ======
-        elif class_name in MONTHLY_CLASSES:
-            if self.can_alert_monthly_class(class_name):
-                # 다음 측정 가능 날짜 계산
-                last_time_str = self.last_alert_time.get(class_name)
-                if last_time_str:
-                    last_time = datetime.fromisoformat(last_time_str)
-                    next_alert_time = last_time + timedelta(days=30)
-                    days_until_next = (next_alert_time - datetime.now()).days
-                else:
-                    days_until_next = 30
-
-                print(f"📊 월 1회 감지: {class_name} ({confidence:.2%})")
-                self.send_discord_alert(class_name, confidence, days_until_next=30)
-
-                # 현재 시간으로 업데이트
-                self.last_alert_time[class_name] = datetime.now().isoformat()
-                self.save_alert_log()
-                return True
-            else:
-                # 다음 측정까지 남은 시간 계산
-                last_time = datetime.fromisoformat(self.last_alert_time[class_name])
-                next_alert_time = last_time + timedelta(days=30)
-                days_until_next = (next_alert_time - datetime.now()).days
-
-                print(f"⏳ {class_name}: 아직 측정 불가 (다음 측정까지 {days_until_next}일 남음)")
-                return False
+        days_until_next = round(POLICIES[class_name].cooldown_s / DAY)
+        print(f"📊 월 1회 감지: {class_name} ({confidence:.2%})")
+        self.send_discord_alert(class_name, confidence, days_until_next=days_until_next)
+        return True
+
+    def inference_classes(self):
+        """지금 알릴 수 있는 클래스의 id (쿨다운 중인 클래스는 추론하지 않음)"""
+        active = self.policy.active_classes(self.camera)
+        return [cls for cls, name in self.model.names.items() if name in active]
 
     def run_notebook_camera(self, confidence_threshold_realtime=0.5, confidence_threshold_monthly=0.6):
         """노트북 내장 카메라로 실시간 감지"""
 
-        # 노트북 카메라 연결
-        cap = cv2.VideoCapture(0)
-
-        # 카메라 설정
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        cap.set(cv2.CAP_PROP_FPS, 30)
+        # 노트북 카메라 연결 (CAMERA_SOURCE로 RTSP / 영상 파일 / replay도 가능)
+        source = open_source()
+        # 클래스별 임계값 (hard example 수집 기준)
+        thresholds = {**{c: confidence_threshold_realtime for c in REALTIME_CLASSES},
+                      **{c: confidence_threshold_monthly for c in MONTHLY_CLASSES}}
 
         print("=" * 60)
         print("🎥 노트북 카메라 시작")
@@ -150,17 +122,22 @@ class YOLODetectorNotebook:
         print(f"📊 월 1회 감지 임계값: {confidence_threshold_monthly:.0%}")
         print(f"\n🛑 종료: 'q' 키 누르기\n")
 
-        if not cap.isOpened():
-            print("❌ 카메라를 찾을 수 없습니다!")
+        if source.read(timeout=10.0) is None:
+            print(f"❌ 카메라를 찾을 수 없습니다! {source.last_error or ''}")
+            source.close()
             return
 
         try:
             frame_count = 0
+            skipped = 0
             while True:
-                ret, frame = cap.read()
-                if not ret:
-                    print("❌ 카메라 읽기 실패")
-                    break
+                frame = source.read(timeout=1.0)
+                if frame is None:
+                    # 재연결 중이면 계속 기다리고, 파일이 끝났으면 종료
+                    if source.ended:
+                        print("🛑 영상 소스 종료")
+                        break
+                    continue
 
                 frame_count += 1
 
@@ -168,10 +145,29 @@ class YOLODetectorNotebook:
                 if frame_count % 3 != 0:
                     continue
 
+                # 쿨다운 중인 클래스는 추론에서 빼고, 알릴 수 있는 클래스가 없으면 추론 자체를 건너뜀
+                classes = self.inference_classes()
+                if not classes:
+                    skipped += 1
+                    cv2.putText(frame, f"Frame: {frame_count} | cooldown", (10, 30),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (128, 128, 128), 2)
+                    cv2.imshow('YOLO Detection - 노트북 카메라', frame)
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        break
+                    continue
+
                 # YOLO 추론
-                results = self.model(frame)
+                results = self.model(frame, classes=classes, verbose=False)
+
+                # 박스를 그리기 전에 애매한 프레임 수집 (뽑힐 때만 복사)
+                # 쿨다운으로 클래스를 뺀 추론은 그 클래스 물체가 라벨 없이 저장되므로 제외
+                if self.harvester is not None and len(classes) == len(self.model.names):
+                    self.harvester.offer(frame, Detections.from_result(results[0]), self.model.names,
+                                         thresholds, 'notebook')
 
                 detected_classes = set()
+                # 임계값을 넘은 클래스별 최고 confidence (알림 판정은 박스가 아니라 추론 한 번에 한 번)
+                hits = {}
 
                 # 감지된 객체 처리
                 for r in results:
@@ -191,8 +187,8 @@ class YOLODetectorNotebook:
                         else:  # MONTHLY_CLASSES
                             threshold = confidence_threshold_monthly
 
-                        # 알림 처리
-                        self.handle_detection(class_name, conf, threshold)
+                        if conf >= threshold:
+                            hits[class_name] = max(conf, hits.get(class_name, 0.0))
 
                         # 박스 그리기
                         x1, y1, x2, y2 = box.xyxy[0]
@@ -215,6 +211,13 @@ class YOLODetectorNotebook:
                                     cv2.FONT_HERSHEY_SIMPLEX,
                                     0.6, color, 2)
 
+                # 알림 처리 (같은 클래스 박스가 여러 개여도 debounce 연속 횟수는 1만 증가)
+                for class_name, conf in hits.items():
+                    self.handle_detection(class_name, conf, thresholds.get(class_name, confidence_threshold_monthly))
+
+                # 이번 추론에서 안 보인 클래스는 debounce 연속 횟수 초기화
+                self.policy.end_frame(self.camera, set(hits))
+
                 # 우측 상단에 감지 정보 표시
                 info_text = f"Frame: {frame_count} | Detected: {len(detected_classes)}"
                 cv2.putText(frame, info_text, (10, 30),
@@ -228,7 +231,13 @@ class YOLODetectorNotebook:
                     break
 
         finally:
-            cap.release()
+            print(f"📊 카메라: {source.status()}")
+            print(f"📊 쿨다운으로 건너뛴 추론: {skipped}회, 알림 상태: {self.policy.status(self.camera)}")
+            self.policy.close()
+            if self.harvester is not None:
+                print(f"🧺 hard example: {self.harvester.stats()}")
+                self.harvester.close()
+            source.close()
             cv2.destroyAllWindows()
             print("\n🛑 카메라 종료")
             print("=" * 60)
@@ -236,8 +245,8 @@ class YOLODetectorNotebook:
 
 # ===== 실행 =====
 if __name__ == "__main__":
-    # 모델 경로 설정
-    model_path = r'C:\Users\dnjsr\Desktop\YOLO_Project\runs\detect\mounting_detection3\weights\best.pt'
+    # 모델 경로 설정 (MODEL_PATH 환경변수 > run 인덱스 최고 mAP50-95 모델)
+    model_path = resolve_model_path()
 
     # 모델이 없으면 안내
     if not os.path.exists(model_path):
@@ -0,0 +1,174 @@
+from copy import deepcopy
+from pathlib import Path
+
+from run_index import RUNS_DIR, RunIndex, measure_cpu_latency, print_runs
+
+# 학생 모델 기본 크기 (yolov8n = depth 0.33, width 0.25)
+STUDENT_DEPTH = 0.33
+STUDENT_WIDTH = 0.125
+KD_WEIGHT = 1.0       # 증류 손실 가중치 (검출 손실 대비)
+KD_TEMPERATURE = 2.0  # 박스 분포(DFL) soft target 온도
+
+
+def student_cfg(cfg, depth=STUDENT_DEPTH, width=STUDENT_WIDTH):
+    """모델 yaml(dict/경로)에서 채널 폭/깊이만 줄인 학생 설정
+
+    헤드 구조(stride, reg_max, nc)는 그대로라 교사와 출력 feature map 크기가 같다.
+    """
+    if not isinstance(cfg, dict):
+        from ultralytics.nn.tasks import yaml_model_load
+        cfg = yaml_model_load(cfg)
+    cfg = deepcopy(cfg)
+    cfg['scales'] = {'student': [depth, width, 1024]}
+    cfg['scale'] = 'student'
+    return cfg
+
+
+def default_teacher(runs_dir=RUNS_DIR):
+    """run 인덱스에서 mAP50-95가 가장 높은 (학생이 아닌) run의 best.pt"""
+    index = RunIndex(runs_dir).refresh()
+    runs = [r for r in index.list() if r['weights'] and r['best_map50_95'] is not None
+            and 'student' not in r['name']]
+    if not runs:
+        return None
+    return max(runs, key=lambda r: r['best_map50_95'])['weights']
+
+
+class DistillationLoss:
+    """v8 검출 손실 + 교사 출력 증류 손실
+
+    - 클래스: 교사 sigmoid 확률을 soft target으로 BCE
+    - 박스: 교사 DFL 분포와의 KL (온도 T)
+    loss_items(box/cls/dfl)는 그대로 두므로 results.csv 컬럼이 일반 학습과 같다.
+    """
+
+    def __init__(self, student, teacher, weight=KD_WEIGHT, temperature=KD_TEMPERATURE):
+        from ultralytics.utils.loss import v8DetectionLoss
+
+        self.detection = v8DetectionLoss(student)
+        self.teacher = teacher
+        self.weight = weight
+        self.temperature = temperature
+        head = student.model[-1]
+        self.nc = head.nc
+        self.reg_max = head.reg_max
+
+    def _flat(self, preds):
+        """head 출력 -> (박스 (b, 4*reg_max, A), 클래스 (b, nc, A)) - 모든 level의 anchor를 이어 붙임
+
+        ultralytics 8.4+는 {'boxes', 'scores'} dict, 이전 버전은 level별 (b, 4*reg_max+nc, h, w) 리스트
+        """
+        import torch
+
+        preds = preds[1] if isinstance(preds, tuple) else preds
+        if isinstance(preds, dict):
+            preds = preds.get('one2many', preds)
+            return preds['boxes'].float(), preds['scores'].float()
+        b = preds[0].shape[0]
+        x = torch.cat([p.view(b, self.reg_max * 4 + self.nc, -1) for p in preds], 2).float()
+        return x.split((self.reg_max * 4, self.nc), 1)
+
+    def distill_loss(self, s_preds, t_preds):
+        import torch.nn.functional as F
+
+        s_box, s_cls = self._flat(s_preds)
+        t_box, t_cls = self._flat(t_preds)
+        cls = F.binary_cross_entropy_with_logits(s_cls, t_cls.sigmoid())
+
+        T = self.temperature
+        b = s_box.shape[0]
+        s_box = s_box.view(b, 4, self.reg_max, -1)
+        t_box = t_box.view(b, 4, self.reg_max, -1)
+        box = F.kl_div(F.log_softmax(s_box / T, 2), F.softmax(t_box / T, 2), reduction='none').sum(2).mean()
+        return cls + box * T * T
+
+    def __call__(self, preds, batch):
+        import torch
+
+        loss, items = self.detection(preds, batch)
+        with torch.no_grad():
+            t_preds = self.teacher(batch['img'])
+
+        kd = self.distill_loss(preds, t_preds)
+        # 검출 손실과 같은 스케일 (v8DetectionLoss는 배치 크기를 곱해서 반환)
+        return loss + kd * self.weight * batch['img'].shape[0], items
+
+
+def make_distill_trainer(teacher_path, depth=STUDENT_DEPTH, width=STUDENT_WIDTH,
+                         weight=KD_WEIGHT, temperature=KD_TEMPERATURE, base=None):
+    """교사 -> 좁은 학생 증류용 DetectionTrainer 클래스
+
+    base: 부모 trainer (memmap 캐시를 쓰면 make_cached_trainer() 결과)
+    교사는 모듈로 등록하지 않으므로 체크포인트/EMA/옵티마이저에 들어가지 않는다.
+    """
+    from ultralytics import YOLO
+    from ultralytics.nn.tasks import DetectionModel
+
+    if base is None:
+        from ultralytics.models.yolo.detect import DetectionTrainer as base
+
+    class DistillationTrainer(base):
+        def get_model(self, cfg=None, weights=None, verbose=True):
+            # 교사와 채널 수가 달라 가중치는 옮길 수 없음 -> 처음부터 학습
+            return DetectionModel(student_cfg(cfg or 'yolov8n.yaml', depth, width),
+                                  nc=self.data['nc'], verbose=verbose)
+
+        def _setup_train(self, *args):
+            super()._setup_train(*args)  # ultralytics 8.4+는 인자 없음, 이전 버전은 world_size
+            teacher = YOLO(teacher_path).model.float().to(self.device).eval()
+            for p in teacher.parameters():
+                p.requires_grad_(False)
+            if teacher.model[-1].nc != self.model.model[-1].nc:
+                raise ValueError(f"클래스 수가 다릅니다: 교사 {teacher.model[-1].nc}, 학생 {self.model.model[-1].nc}")
+            self.model.criterion = DistillationLoss(self.model, teacher, weight, temperature)
+            print(f"🧑‍🏫 증류: 교사 {teacher_path} -> 학생 width={width}, depth={depth}")
+
+    return DistillationTrainer
+
+
+def report(run_dirs, imgsz=640):
+    """run들의 mAP와 CPU 지연시간을 나란히 출력 (측정값은 run 인덱스에 저장)"""
+    run_dirs = [Path(d) for d in run_dirs]
+    index = RunIndex(run_dirs[0].parent).refresh()
+    runs = []
+    for run_dir in run_dirs:
+        run = index.runs.get(run_dir.name)
+        if run is None:
+            continue
+        if run['weights'] and run['cpu_latency_ms'] is None:
+            print(f"⏱️  {run['name']}: CPU 지연시간 측정 중...")
+            run['cpu_latency_ms'] = measure_cpu_latency(run['weights'], run['imgsz'] or imgsz)
+        runs.append(run)
+    index.save()
+    print_runs(runs)
+    return runs
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from dataset_cache import default_workers
+
+    parser = argparse.ArgumentParser(description='학습된 모델을 작은 학생 모델로 증류')
+    parser.add_argument('--data', required=True, help='data.yaml')
+    parser.add_argument('--teacher', default=None, help='교사 가중치 (기본: run 인덱스 최고 mAP50-95)')
+    parser.add_argument('--width', type=float, default=STUDENT_WIDTH)
+    parser.add_argument('--depth', type=float, default=STUDENT_DEPTH)
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--batch', type=int, default=16)
+    opt = parser.parse_args()
+
+    import torch
+    from ultralytics import YOLO
+
+    teacher = opt.teacher or default_teacher()
+    if teacher is None:
+        raise SystemExit("❌ 교사 모델이 없습니다 (--teacher로 지정)")
+
+    student = YOLO('yolov8n.yaml')
+    student.train(trainer=make_distill_trainer(teacher, opt.depth, opt.width), data=opt.data,
+                  epochs=opt.epochs, imgsz=opt.imgsz, batch=opt.batch,
+                  device=0 if torch.cuda.is_available() else 'cpu',
+                  project=str(RUNS_DIR), name='mounting_detection_student', workers=default_workers())
+    report([Path(teacher).resolve().parent.parent, student.trainer.save_dir], opt.imgsz)
@@ -0,0 +1,486 @@
+import ipaddress
+import os
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+from multiprocessing.connection import Client, Listener
+
+import cv2
+import numpy as np
+
+from camera_source import open_source
+from cpu_plan import apply_torch, pin_thread, plan_from_env, plan_stats
+from frame_ring import FrameRing
+from imgsz_profile import imgsz_kwargs, select_imgsz
+from inference_worker import Detections, PRIORITY_ONDEMAND, PRIORITY_REALTIME
+from supabase_sink import save_detection_to_supabase
+
+# 기본 설정 (환경변수로 변경 가능)
+SHM_NAME = os.environ.get('BROKER_SHM', 'yolo_frames')
+CONTROL_ADDR = (os.environ.get('BROKER_HOST', '127.0.0.1'), int(os.environ.get('BROKER_PORT', 6001)))
+AUTHKEY = os.environ.get('BROKER_AUTHKEY')
+# 기본 키는 루프백에서만 (제어 채널은 pickle이라 키를 아는 쪽은 임의 코드를 실행할 수 있음)
+DEFAULT_AUTHKEY = b'yolo-broker'
+
+REALTIME_CLASSES = ['mounting']
+ONDEMAND_CLASSES = ['impossibility', 'sale']
+
+MAGIC = 0x594F4C4F  # 'YOLO'
+MAX_DETS = 64       # 프레임당 공유하는 최대 박스 수
+META_LEN = 8        # magic, slots, h, w, c, latest_seq, latest_slot, writer_pid
+
+
+def _align(n, a=64):
+    return (n + a - 1) // a * a
+
+
+def is_loopback(host):
+    """host가 이 PC 안에서만 닿는 주소인지 (이름이면 풀린 주소가 모두 루프백이어야 함)"""
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        pass
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except OSError:
+        return False
+    return bool(infos) and all(ipaddress.ip_address(info[4][0].split('%')[0]).is_loopback for info in infos)
+
+
+def resolve_authkey(address, authkey=None):
+    """제어 채널 인증 키 - 루프백이 아닌 주소는 BROKER_AUTHKEY가 있어야 함"""
+    if authkey:
+        return authkey.encode() if isinstance(authkey, str) else authkey
+    if not is_loopback(address[0]):
+        raise RuntimeError(f"BROKER_HOST={address[0]}는 루프백이 아닙니다 - BROKER_AUTHKEY를 설정하세요")
+    return DEFAULT_AUTHKEY
+
+
+# ===== 공유 메모리 프레임 링 =====
+
+class SharedFrameRing:
+    """multiprocessing.shared_memory 위의 프레임 + 탐지 결과 링
+
+    쓰는 프로세스는 하나(브로커), 읽는 프로세스는 여러 개.
+    슬롯마다 시퀀스 번호를 두고 (쓰는 중에는 -1) 읽기 전후 번호가 같을 때만
+    유효한 프레임으로 본다 (seqlock).
+    """
+
+    def __init__(self, name=SHM_NAME, shape=None, slots=8, create=False):
+        if create:
+            h, w, c = shape
+            size = self._layout(slots, h, w, c)[-1]
+            try:
+                # 이전 브로커가 비정상 종료해서 남은 세그먼트 정리
+                stale = shared_memory.SharedMemory(name)
+                stale.close()
+                stale.unlink()
+            except FileNotFoundError:
+                pass
+            self.shm = shared_memory.SharedMemory(name, create=True, size=size)
+            self._map(slots, h, w, c)
+            self.meta[:] = [MAGIC, slots, h, w, c, 0, -1, os.getpid()]
+            self.slot_seqs[:] = 0
+        else:
+            self.shm = shared_memory.SharedMemory(name)
+            _untrack(self.shm)
+            meta = np.ndarray((META_LEN,), np.int64, self.shm.buf, 0)
+            if meta[0] != MAGIC:
+                raise RuntimeError(f"브로커 공유 메모리가 아닙니다: {name}")
+            slots, h, w, c = (int(v) for v in meta[1:5])
+            del meta
+            self._map(slots, h, w, c)
+        self.create = create
+        self.shape = (h, w, c)
+        self.slots = slots
+
+    @staticmethod
+    def _layout(slots, h, w, c):
+        seqs = _align(META_LEN * 8)
+        counts = seqs + _align(slots * 8)
+        dets = counts + _align(slots * 8)
+        frames = dets + _align(slots * MAX_DETS * 6 * 4)
+        end = frames + slots * h * w * c
+        return seqs, counts, dets, frames, end
+
+    def _map(self, slots, h, w, c):
+        seqs, counts, dets, frames, _ = self._layout(slots, h, w, c)
+        buf = self.shm.buf
+        self.meta = np.ndarray((META_LEN,), np.int64, buf, 0)
+        self.slot_seqs = np.ndarray((slots,), np.int64, buf, seqs)
+        self.det_counts = np.ndarray((slots,), np.int64, buf, counts)
+        self.dets = np.ndarray((slots, MAX_DETS, 6), np.float32, buf, dets)
+        self.frames = np.ndarray((slots, h, w, c), np.uint8, buf, frames)
+
+    # ----- 쓰기 (브로커) -----
+
+    def begin_write(self):
+        slot = (int(self.meta[6]) + 1) % self.slots
+        self.slot_seqs[slot] = -1
+        return slot, self.frames[slot]
+
+    def commit(self, slot, detections):
+        n = min(len(detections), MAX_DETS)
+        if n:
+            self.dets[slot, :n, :4] = detections.xyxy[:n]
+            self.dets[slot, :n, 4] = detections.conf[:n]
+            self.dets[slot, :n, 5] = detections.cls[:n]
+        self.det_counts[slot] = n
+        seq = int(self.meta[5]) + 1
+        self.slot_seqs[slot] = seq
+        self.meta[6] = slot
+        self.meta[5] = seq
+        return seq
+
+    # ----- 읽기 (소비자) -----
+
+    @property
+    def latest_seq(self):
+        return int(self.meta[5])
+
+    def read_latest(self, out, after_seq=0):
+        """after_seq보다 새 프레임을 out에 복사 -> (seq, Detections) 또는 None"""
+        slot = int(self.meta[6])
+        if slot < 0:
+            return None
+        seq = int(self.slot_seqs[slot])
+        if seq <= after_seq:
+            return None
+        np.copyto(out, self.frames[slot])
+        n = int(self.det_counts[slot])
+        raw = self.dets[slot, :n].copy()
+        if int(self.slot_seqs[slot]) != seq:
+            return None  # 읽는 동안 덮어써짐
+        return seq, Detections(raw[:, :4], raw[:, 4], raw[:, 5].astype(int))
+
+    def close(self):
+        # numpy 뷰를 먼저 놓아야 close 가능
+        self.meta = self.slot_seqs = self.det_counts = self.dets = self.frames = None
+        self.shm.close()
+        if self.create:
+            self.shm.unlink()
+
+
+def _untrack(shm):
+    """소비자 프로세스가 종료될 때 세그먼트를 지우지 않도록 resource_tracker에서 제외"""
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except (ImportError, AttributeError, KeyError):
+        pass
+
+
+# ===== 브로커 (카메라 + 추론 소유) =====
+
+class FrameBroker:
+    """카메라와 모델을 가진 유일한 프로세스
+
+    프레임과 탐지 결과를 공유 메모리로 발행하고, 제어 채널로
+    온디맨드 탐지 / 메시지 / 상태 요청을 받는다.
+    """
+
+    def __init__(self, model_path, source=None, name=SHM_NAME, address=CONTROL_ADDR, authkey=AUTHKEY):
+        from model_manager import ModelManager
+        from inference_worker import InferenceWorker
+
+        self.models = ModelManager(model_path)
+        self.realtime_opts = imgsz_kwargs(select_imgsz(model_path, REALTIME_CLASSES, 'REALTIME', target_fps=15))
+        self.ondemand_opts = imgsz_kwargs(select_imgsz(model_path, ONDEMAND_CLASSES, 'ONDEMAND'))
+        self.worker = InferenceWorker(self.models)
+        self.source = source
+        self.capture = None
+        self.name = name
+        self.address = address
+        self.authkey = resolve_authkey(address, authkey)
+        self.ring = None
+        self.running = True
+        self.frame_count = 0
+        self.consumers = 0
+        self._consumers_lock = threading.Lock()
+
+        # 메시지 (id는 단조 증가 - 소비자가 after_id로 이어서 읽음)
+        self.messages = deque(maxlen=500)
+        self.next_message_id = 0
+        self._messages_lock = threading.Lock()
+
+    def add_message(self, class_name, confidence, detection_type):
+        with self._messages_lock:
+            message = {
+                "id": self.next_message_id,
+                "class": class_name,
+                "confidence": round(confidence * 100, 2),
+                "type": detection_type,
+                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "status": "success"
+            }
+            self.next_message_id += 1
+            self.messages.append(message)
+        # 탐지를 만든 브로커에서 한 번만 저장 (소비자 서버는 메시지만 동기화)
+        save_detection_to_supabase(class_name, confidence, detection_type)
+        print(f"📱 메시지 추가: {class_name} ({confidence:.2%})")
+        return message
+
+    # ----- 제어 채널 -----
+
+    def serve_control(self):
+        listener = Listener(self.address, authkey=self.authkey)
+        print(f"🔌 제어 채널: {self.address[0]}:{self.address[1]}")
+        while self.running:
+            try:
+                conn = listener.accept()
+            except (OSError, EOFError) as e:
+                print(f"⚠️  소비자 연결 실패: {e}")
+                continue
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with self._consumers_lock:
+            self.consumers += 1
+        try:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    break
+                try:
+                    reply = self._dispatch(request)
+                except Exception as e:
+                    reply = {"error": str(e)}
+                conn.send(reply)
+        finally:
+            with self._consumers_lock:
+                self.consumers -= 1
+            conn.close()
+
+    def _dispatch(self, request):
+        cmd = request.get('cmd')
+        if cmd == 'detect':
+            return self.detect_ondemand(request['class'], request.get('threshold', 0.6))
+        if cmd == 'messages':
+            after = request.get('after', -1)
+            with self._messages_lock:
+                return [m for m in self.messages if m['id'] > after]
+        if cmd == 'clear_messages':
+            with self._messages_lock:
+                self.messages.clear()
+            return {"success": True}
+        if cmd == 'status':
+            return {
+                "camera_running": self.running,
+                "frame_count": self.frame_count,
+                "camera": self.capture.status() if self.capture is not None else None,
+                "consumers": self.consumers,
+                "inference": self.worker.stats(),
+                "model": self.models.status(),
+                "cpu": plan_stats(),
+            }
+        return {"error": f"알 수 없는 명령: {cmd}"}
+
+    def detect_ondemand(self, class_name, confidence_threshold=0.6):
+        if self.ring is None or self.ring.latest_seq == 0:
+            return {"success": False, "message": "카메라 프레임이 없습니다", "class": class_name}
+        frame = np.empty(self.ring.shape, np.uint8)
+        if self.ring.read_latest(frame) is None:
+            return {"success": False, "message": "카메라 프레임이 없습니다", "class": class_name}
+
+        detections = self.worker.infer(frame, PRIORITY_ONDEMAND, **self.ondemand_opts)
+        names = self.models.names
+        confidence = max((conf for _, conf, cls in detections
+                          if names[cls] == class_name and conf > confidence_threshold), default=None)
+        if confidence is None:
+            return {"success": False, "message": f"{class_name}을(를) 감지하지 못했습니다", "class": class_name}
+        self.add_message(class_name, confidence, "ondemand")
+        return {
+            "success": True,
+            "message": f"{class_name} 감지됨!",
+            "class": class_name,
+            "confidence": round(confidence * 100, 2),
+            "type": "ondemand"
+        }
+
+    # ----- 캡처 루프 -----
+
+    def run(self, confidence_threshold=0.3):
+        pin_thread('capture')
+        self.capture = open_source(self.source)
+        first = self.capture.read(timeout=10.0)
+        if first is None:
+            print(f"❌ 카메라 읽기 실패: {self.capture.last_error or '프레임 없음'}")
+            self.capture.close()
+            return
+        self.ring = SharedFrameRing(self.name, first.shape, create=True)
+        threading.Thread(target=self.serve_control, daemon=True).start()
+        print(f"📡 프레임 발행: shm={self.name} {first.shape}")
+
+        try:
+            while self.running:
+                slot, frame = self.ring.begin_write()
+                if first is not None:
+                    np.copyto(frame, first)
+                    first = None
+                elif self.capture.read(frame, timeout=1.0) is None:
+                    # 재연결 중에는 슬롯을 다시 씀, 파일이 끝났으면 종료
+                    if self.capture.ended:
+                        break
+                    continue
+                self.frame_count += 1
+
+                detections = self.worker.infer(frame, PRIORITY_REALTIME, **self.realtime_opts)
+                names = self.models.names
+                for (x1, y1, x2, y2), conf, cls in detections:
+                    class_name = names[cls]
+                    if class_name in REALTIME_CLASSES and conf > confidence_threshold:
+                        self.add_message(class_name, conf, "realtime")
+                        cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 3)
+                        cv2.putText(frame, f"{class_name} {conf:.2%}", (int(x1), int(y1) - 10),
+                                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+
+                self.ring.commit(slot, detections)
+        finally:
+            self.running = False
+            self.capture.close()
+            self.ring.close()
+            print("\n🛑 브로커 종료")
+
+
+# ===== 소비자 =====
+
+class BrokerClient:
+    """브로커에 붙는 소비자 (웹 서버 / 알림 워커)
+
+    공유 메모리의 새 프레임을 로컬 FrameRing으로 한 번만 복사하므로
+    이 프로세스 안의 스트림/온디맨드 코드는 로컬 카메라와 똑같이 동작한다.
+    """
+
+    def __init__(self, name=SHM_NAME, address=CONTROL_ADDR, authkey=AUTHKEY, poll_interval=0.005):
+        self.shared = SharedFrameRing(name)
+        self.ring = FrameRing(self.shared.shape)
+        self.latest_detections = Detections.empty()
+        self.poll_interval = poll_interval
+        self._conn = Client(address, authkey=resolve_authkey(address, authkey))
+        self._conn_lock = threading.Lock()
+        self.alive = True
+        self.torn_reads = 0
+        threading.Thread(target=self._pump, name='broker-pump', daemon=True).start()
+
+    def _pump(self):
+        last_seq = 0
+        while self.alive:
+            try:
+                slot, buf = self.ring.acquire_write()
+            except TimeoutError:
+                # 모든 슬롯이 임대 중 (느린 viewer / 온디맨드) - 이번 프레임은 건너뜀 (ring stats의 write_drops)
+                continue
+            got = self.shared.read_latest(buf, last_seq)
+            if got is None:
+                if self.shared.latest_seq > last_seq:
+                    self.torn_reads += 1
+                time.sleep(self.poll_interval)
+                continue
+            last_seq, self.latest_detections = got
+            self.ring.commit(slot)
+
+    def request(self, **message):
+        with self._conn_lock:
+            try:
+                self._conn.send(message)
+                return self._conn.recv()
+            except (EOFError, OSError):
+                self.alive = False
+                raise
+
+    def detect(self, class_name, threshold=0.6):
+        return self.request(cmd='detect', **{'class': class_name, 'threshold': threshold})
+
+    def messages(self, after=-1):
+        return self.request(cmd='messages', after=after)
+
+    def status(self):
+        return self.request(cmd='status')
+
+
+class RemoteDetector:
+    """BrokerClient를 스트리밍 서버의 detector처럼 쓰기 위한 어댑터
+
+    모델은 브로커에 있으므로 models / managers는 None (/admin/model은 브로커에서 관리)
+    """
+
+    models = None
+    managers = None
+
+    def __init__(self, client, messages, poll_interval=0.5):
+        self.client = client
+        self.messages = messages
+        self._pool = ThreadPoolExecutor(4, thread_name_prefix='broker-request')
+        self._last_id = -1
+        self._poll_interval = poll_interval
+        threading.Thread(target=self._sync_messages, daemon=True).start()
+
+    @property
+    def camera_running(self):
+        return self.client.alive
+
+    def _sync_messages(self):
+        """브로커 메시지를 로컬 messages 큐로 가져옴"""
+        while self.client.alive:
+            try:
+                for message in self.client.messages(self._last_id):
+                    self.messages.append(message)
+                    self._last_id = message['id']
+            except (EOFError, OSError):
+                break
+            time.sleep(self._poll_interval)
+
+    def detect_ondemand(self, class_name, confidence_threshold=0.6):
+        return self.client.detect(class_name, confidence_threshold)
+
+    def detect_ondemand_async(self, class_name, confidence_threshold=0.6):
+        return self._pool.submit(self.detect_ondemand, class_name, confidence_threshold)
+
+    def inference_stats(self):
+        try:
+            return {**self.client.status()['inference'], "torn_reads": self.client.torn_reads}
+        except (EOFError, OSError, KeyError):
+            return None
+
+    def camera_stats(self):
+        try:
+            return self.client.status().get('camera')
+        except (EOFError, OSError):
+            return None
+
+
+# ===== 실행 =====
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='카메라/추론 브로커 프로세스')
+    sub = parser.add_subparsers(dest='cmd')
+    p_run = sub.add_parser('run', help='브로커 실행 (카메라 + 모델 소유)')
+    p_run.add_argument('--source', default=None, help='카메라 번호 / rtsp:// URL / 영상 경로 / replay:경로 (기본: CAMERA_SOURCE)')
+    p_run.add_argument('--model', default=None, help='가중치 경로 (기본: run 인덱스 선택)')
+    p_tail = sub.add_parser('tail', help='메시지를 출력하는 예제 알림 워커')
+    opt = parser.parse_args()
+
+    if opt.cmd == 'tail':
+        client = BrokerClient()
+        last_id = -1
+        while client.alive:
+            for message in client.messages(last_id):
+                print(f"🔔 {message['timestamp']} {message['class']} ({message['confidence']}%) [{message['type']}]")
+                last_id = message['id']
+            time.sleep(0.5)
+    else:
+        from run_index import resolve_model_path
+
+        # 추론 / 캡처 / I/O 스레드 배분 (CPU_PROFILE, CPU_PIN)
+        plan_from_env()
+        pin_thread('inference')
+        apply_torch()
+        broker = FrameBroker(getattr(opt, 'model', None) or resolve_model_path(),
+                             source=getattr(opt, 'source', None))
+        broker.run()
@@ -0,0 +1,216 @@
+import gc
+import os
+import threading
+import tracemalloc
+
+import numpy as np
+
+
+class FrameLease:
+    """링 슬롯 읽기 임대 (with 블록이 끝나면 반납)
+
+    frame은 읽기 전용 뷰 - 임대 중에는 캡처 쪽이 이 슬롯을 덮어쓰지 않는다
+    """
+
+    __slots__ = ('ring', 'slot', 'seq', 'frame', '_released')
+
+    def __init__(self, ring, slot, seq, frame):
+        self.ring = ring
+        self.slot = slot
+        self.seq = seq
+        self.frame = frame
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.ring._release(self.slot)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class FrameRing:
+    """미리 할당한 프레임 버퍼 링
+
+    - 캡처 쪽: acquire_write()로 빈 슬롯을 받아 직접 쓰고 commit()
+    - 읽는 쪽: lease_latest()로 최신 프레임을 복사 없이 임대
+    - 임대 중이거나 최신인 슬롯은 덮어쓰지 않음 (참조 카운트)
+    """
+
+    def __init__(self, shape, slots=8, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.buffers = [np.empty(self.shape, dtype) for _ in range(slots)]
+        self._views = []
+        for buf in self.buffers:
+            view = buf.view()
+            view.flags.writeable = False
+            self._views.append(view)
+        self.seqs = [0] * slots
+        self.refs = [0] * slots
+        self.latest = -1
+        self.seq = 0
+        self._writing = -1
+        self._cond = threading.Condition()
+
+        # 통계
+        self.commits = 0
+        self.write_waits = 0
+        self.write_drops = 0
+
+    # ===== 쓰기 =====
+
+    def acquire_write(self, timeout=1.0):
+        """덮어쓸 수 있는 슬롯 (번호, 버퍼) - 모두 임대 중이면 반납될 때까지 대기"""
+        with self._cond:
+            while True:
+                n = len(self.buffers)
+                for k in range(1, n + 1):
+                    slot = (self.latest + k) % n
+                    if slot != self.latest and self.refs[slot] == 0:
+                        self._writing = slot
+                        self.seqs[slot] = 0
+                        return slot, self.buffers[slot]
+                self.write_waits += 1
+                if not self._cond.wait(timeout):
+                    # 호출한 쪽은 이번 프레임을 버리고 계속 (write_drops로 집계)
+                    self.write_drops += 1
+                    raise TimeoutError("모든 프레임 슬롯이 임대 중입니다")
+
+    def commit(self, slot):
+        """슬롯을 최신 프레임으로 공개"""
+        with self._cond:
+            self.seq += 1
+            self.seqs[slot] = self.seq
+            self.latest = slot
+            self._writing = -1
+            self.commits += 1
+            self._cond.notify_all()
+        return self.seq
+
+    # ===== 읽기 =====
+
+    def _lease(self, slot):
+        self.refs[slot] += 1
+        return FrameLease(self, slot, self.seqs[slot], self._views[slot])
+
+    def lease_latest(self, after_seq=0, timeout=None):
+        """after_seq보다 새로운 최신 프레임 임대 (timeout 안에 없으면 None)"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.latest >= 0 and self.seq > after_seq, timeout):
+                return None
+            return self._lease(self.latest)
+
+    def lease_recent(self, k):
+        """최근 k개 프레임 임대 (오래된 것부터)"""
+        with self._cond:
+            slots = [s for s in range(len(self.buffers)) if self.seqs[s] > 0 and s != self._writing]
+            slots.sort(key=lambda s: self.seqs[s])
+            return [self._lease(s) for s in slots[-k:]]
+
+    def _release(self, slot):
+        with self._cond:
+            self.refs[slot] -= 1
+            if self.refs[slot] == 0:
+                self._cond.notify_all()
+
+    @property
+    def has_frame(self):
+        return self.latest >= 0
+
+    def stats(self):
+        return {
+            "slots": len(self.buffers),
+            "slot_mb": round(self.buffers[0].nbytes / 1e6, 2),
+            "seq": self.seq,
+            "leased": sum(1 for r in self.refs if r),
+            "write_waits": self.write_waits,
+            "write_drops": self.write_drops,
+        }
+
+
+# ===== 메모리 측정 =====
+
+def start_alloc_tracing():
+    """TRACE_ALLOC=1이면 tracemalloc 시작 (numpy 배열 할당도 집계됨)"""
+    if os.environ.get('TRACE_ALLOC') == '1' and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def memory_stats():
+    """RSS, GC 횟수, (켜져 있으면) tracemalloc 할당량"""
+    stats = {"gc_collections": [g['collections'] for g in gc.get_stats()]}
+    try:
+        with open('/proc/self/statm') as f:
+            stats["rss_mb"] = round(int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6, 1)
+    except (OSError, ValueError, AttributeError):
+        try:
+            import resource
+            stats["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3, 1)
+        except ImportError:
+            pass
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        stats["traced_mb"] = round(current / 1e6, 1)
+        stats["traced_peak_mb"] = round(peak / 1e6, 1)
+    return stats
+
+
+def benchmark(source='replay:synthetic', iters=200):
+    """카메라 루프 한 바퀴 비교: 프레임마다 새 배열 + 발행용 복사 vs 링 슬롯에 바로 캡처"""
+    import time
+
+    import cv2
+
+    from camera_source import open_source
+
+    def legacy(src, i):
+        frame = src.read()
+        published = frame.copy()  # 스트림 / 온디맨드 공용
+        cv2.putText(frame, f"Frame: {i}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        return published
+
+    def ring_loop(src, i):
+        slot, frame = ring.acquire_write()
+        src.read(frame)
+        ring.commit(slot)
+        np.copyto(preview, frame)
+        cv2.putText(preview, f"Frame: {i}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+    report = {}
+    with open_source(source, fps=0) as src:
+        first = src.read(timeout=10.0)
+        ring = FrameRing(first.shape)
+        preview = np.empty_like(first)
+        for name, fn in (("copy", legacy), ("ring", ring_loop)):
+            for i in range(10):
+                fn(src, i)
+            tracemalloc.start()
+            churn = 0
+            start = time.perf_counter()
+            for i in range(iters):
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                fn(src, i)
+                churn += tracemalloc.get_traced_memory()[1] - base
+            elapsed = time.perf_counter() - start
+            tracemalloc.stop()
+            report[name] = {"ms_per_frame": round(elapsed * 1000 / iters, 3),
+                            "alloc_kb_per_frame": round(churn / 1024 / iters, 1)}
+    report["frame_shape"] = list(first.shape)
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='프레임 링 vs 프레임마다 복사 (시간 / numpy 할당량)')
+    parser.add_argument('--source', default='replay:synthetic', help='CAMERA_SOURCE 형식 (영상 / replay:폴더)')
+    parser.add_argument('--iters', type=int, default=200)
+    opt = parser.parse_args()
+
+    print(json.dumps(benchmark(opt.source, opt.iters), indent=2))
@@ -0,0 +1,396 @@
+import asyncio
+import itertools
+import os
+import shutil
+import struct
+import subprocess
+import threading
+import time
+from collections import deque
+
+from cpu_plan import pin_thread
+from tracing import span
+
+# H.264 스트림 설정 (/video_h264)
+FPS = int(os.environ.get('H264_FPS', 15))
+BITRATE_KBPS = int(os.environ.get('H264_BITRATE', 400))
+GOP = int(os.environ.get('H264_GOP', 0)) or FPS  # 기본 1초 (= fragment 하나, 새 viewer 대기 시간)
+WIDTH = int(os.environ.get('H264_WIDTH', 0)) or None  # 지정하면 이 폭으로 축소 (높이는 비율 유지)
+PRESET = os.environ.get('H264_PRESET', 'veryfast')
+IDLE_S = float(os.environ.get('H264_IDLE_S', 30))
+FFMPEG = os.environ.get('FFMPEG', 'ffmpeg')
+
+
+# ===== viewer별 전송량 =====
+
+class ViewerMeter:
+    """스트림 종류 하나의 viewer별 전송 바이트 (MJPEG / H.264 bytes/s 비교용)
+
+    add()는 viewer 자기 스레드/코루틴에서만 부르므로 잠금 없이 정수 덧셈뿐.
+    """
+
+    def __init__(self, history=50):
+        self._ids = itertools.count()
+        self.open = {}
+        self.closed = deque(maxlen=history)
+
+    def connect(self):
+        viewer = next(self._ids)
+        self.open[viewer] = [time.perf_counter(), 0]
+        return viewer
+
+    def add(self, viewer, n):
+        self.open[viewer][1] += n
+
+    def disconnect(self, viewer):
+        start, sent = self.open.pop(viewer)
+        self.closed.append((time.perf_counter() - start, sent))
+
+    @property
+    def viewers(self):
+        return len(self.open)
+
+    def stats(self):
+        now = time.perf_counter()
+        rates = [sent / (now - start) for start, sent in list(self.open.values()) if now - start >= 1]
+        # 끝난 연결도 (1초 이상 본 것만) 평균에 넣음 - viewer가 없어도 비교 가능
+        recent = [sent / elapsed for elapsed, sent in self.closed if elapsed >= 1]
+        samples = rates or recent
+        mean = sum(samples) / len(samples) if samples else None
+        return {
+            "viewers": self.viewers,
+            "kbit_s_per_viewer": [round(r * 8 / 1000, 1) for r in rates],
+            "mean_kbit_s": round(mean * 8 / 1000, 1) if mean is not None else None,
+            "total_kbit_s": round(sum(rates) * 8 / 1000, 1),
+        }
+
+
+STREAM_METERS = {'mjpeg': ViewerMeter(), 'h264': ViewerMeter()}
+
+
+# ===== fMP4 박스 =====
+
+def read_box(stream):
+    """MP4 박스 하나 -> (type, 박스 전체 bytes), 스트림 끝이면 None"""
+    header = stream.read(8)
+    if len(header) < 8:
+        return None
+    size, box_type = struct.unpack('>I4s', header)
+    if size == 1:
+        large = stream.read(8)
+        if len(large) < 8:
+            return None
+        header += large
+        size = struct.unpack('>Q', large)[0]
+    body = stream.read(size - len(header)) if size else stream.read()
+    if size and len(body) < size - len(header):
+        return None
+    return box_type.decode('latin-1'), header + body
+
+
+class H264Stream:
+    """프레임 링 -> ffmpeg(libx264) 한 번 인코딩 -> fragmented MP4를 모든 viewer가 공유
+
+    - 인코더는 첫 viewer가 붙을 때 시작하고, viewer가 없이 idle_s가 지나면 멈춤
+    - feed 스레드가 fps 간격으로 최신 프레임을 링 슬롯에서 바로 ffmpeg stdin에 씀 (복사 없음)
+    - ffmpeg 출력은 init(ftyp+moov) + fragment(moof+mdat) 로 나눔.
+      frag_keyframe이라 fragment = GOP 하나 = 키프레임으로 시작 -> 새 viewer는
+      init + 가장 최근 fragment부터 받으면 바로 디코딩 가능
+    - 느린 viewer가 max_backlog보다 뒤처지면 최신 fragment로 건너뜀 (다른 viewer는 안 기다림)
+    - stream()은 스레드용 (Flask), astream()은 asyncio용 (ASGI) - astream viewer는 스레드를 잡지 않고
+      _read 스레드가 call_soon_threadsafe로 viewer별 asyncio.Queue에 넣어 줌
+    """
+
+    def __init__(self, lease_frame, fps=FPS, bitrate_kbps=BITRATE_KBPS, gop=GOP, width=WIDTH,
+                 preset=PRESET, idle_s=IDLE_S, max_backlog=3, meter=None):
+        self.lease_frame = lease_frame
+        self.fps = fps
+        self.bitrate_kbps = bitrate_kbps
+        self.gop = gop
+        self.width = width
+        self.preset = preset
+        self.idle_s = idle_s
+        self.max_backlog = max_backlog
+        self.meter = meter or STREAM_METERS['h264']
+
+        self.proc = None
+        self.running = False
+        self.init = None
+        self.seq = 0
+        self.fragments = deque(maxlen=max_backlog + 1)
+        self.shape = None
+        self.frames_fed = 0
+        self.bytes_out = 0
+        self.restarts = 0
+        self.skipped = 0
+        self.error = None
+        self._lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._subscribers = {}  # astream viewer -> (loop, asyncio.Queue)
+
+    @staticmethod
+    def available():
+        return shutil.which(FFMPEG) is not None
+
+    def command(self, shape):
+        h, w = shape[:2]
+        kbps = self.bitrate_kbps
+        return [
+            FFMPEG, '-hide_banner', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{w}x{h}', '-r', str(self.fps), '-i', '-',
+            *(['-vf', f'scale={self.width}:-2'] if self.width and self.width < w else []),
+            '-c:v', 'libx264', '-preset', self.preset, '-tune', 'zerolatency', '-pix_fmt', 'yuv420p',
+            '-b:v', f'{kbps}k', '-maxrate', f'{kbps}k', '-bufsize', f'{kbps * 2}k',
+            # 고정 GOP (장면 전환 키프레임 없음) -> fragment 길이가 일정
+            '-g', str(self.gop), '-keyint_min', str(self.gop), '-sc_threshold', '0',
+            '-f', 'mp4', '-movflags', 'frag_keyframe+empty_moov+default_base_moof', '-',
+        ]
+
+    # ===== 인코더 =====
+
+    def ensure_running(self):
+        """인코더가 없으면 시작 -> 실행 중이면 True"""
+        with self._lock:
+            if self.running:
+                return True
+            lease = self.lease_frame(0, 5.0)
+            if lease is None:
+                self.error = "프레임 없음"
+                return False
+            with lease:
+                self.shape = lease.frame.shape
+            try:
+                proc = subprocess.Popen(self.command(self.shape), stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            except OSError as e:
+                self.error = str(e)
+                return False
+            with self._cond:
+                self.proc = proc
+                self.running = True
+                self.init = None
+                self.fragments.clear()
+                self.error = None
+            self.restarts += 1
+            threading.Thread(target=self._feed, args=(proc,), name='h264-feed', daemon=True).start()
+            threading.Thread(target=self._read, args=(proc,), name='h264-read', daemon=True).start()
+            return True
+
+    def _feed(self, proc):
+        """fps 간격으로 최신 프레임을 ffmpeg에 (새 프레임이 없으면 같은 프레임 - 타임스탬프 유지)"""
+        pin_thread('encode')
+        interval = 1 / self.fps
+        next_at = time.perf_counter()
+        idle_since = None
+        try:
+            while self.running:
+                if self.meter.viewers == 0:
+                    idle_since = idle_since or time.perf_counter()
+                    if time.perf_counter() - idle_since > self.idle_s:
+                        break
+                else:
+                    idle_since = None
+
+                lease = self.lease_frame(0, 1.0)
+                if lease is None:
+                    continue
+                with lease:
+                    if lease.frame.shape != self.shape:
+                        self.error = "프레임 크기 변경 - 인코더 재시작"
+                        break
+                    with span('encode.h264', 'stream'):
+                        proc.stdin.write(lease.frame.data)
+                        proc.stdin.flush()
+                self.frames_fed += 1
+
+                next_at += interval
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_at = time.perf_counter()  # 밀렸으면 따라잡지 않음
+        except (BrokenPipeError, ValueError, OSError) as e:
+            self.error = f"ffmpeg 입력 실패: {e}"
+        finally:
+            self._stop(proc)
+
+    def _read(self, proc):
+        """ffmpeg stdout -> init / fragment"""
+        init, fragment = [], []
+        while True:
+            box = read_box(proc.stdout)
+            if box is None:
+                break
+            box_type, data = box
+            self.bytes_out += len(data)
+            if self.init is None:
+                init.append(data)
+                if box_type == 'moov':
+                    with self._cond:
+                        self.init = b''.join(init)
+                        self._publish((0, self.init))
+                        self._cond.notify_all()
+                continue
+            fragment.append(data)
+            if box_type == 'mdat':
+                with self._cond:
+                    self.seq += 1
+                    self.fragments.append((self.seq, b''.join(fragment)))
+                    self._publish(self.fragments[-1])
+                    self._cond.notify_all()
+                fragment = []
+        if proc.poll() not in (None, 0) and self.error is None:
+            self.error = f"ffmpeg 종료 코드 {proc.returncode}"
+        self._stop(proc)
+
+    def _stop(self, proc):
+        with self._cond:
+            if self.proc is proc:
+                self.running = False
+                self._publish(None)
+            self._cond.notify_all()
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    # ===== viewer =====
+
+    def stream(self):
+        """viewer 하나의 fMP4 바이트 스트림 (init -> 최근 fragment -> 이후 fragment)"""
+        if not self.ensure_running():
+            return
+        viewer = self.meter.connect()
+        try:
+            with self._cond:
+                if not self._cond.wait_for(lambda: (self.init is not None and self.fragments)
+                                           or not self.running, timeout=max(5.0, 3 * self.gop / self.fps)):
+                    return
+                if not self.running:
+                    return
+                init, last = self.init, self.fragments[-1][0] - 1
+            yield init
+            self.meter.add(viewer, len(init))
+
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self.seq > last or not self.running, timeout=5.0)
+                    if not self.running:
+                        return
+                    pending = [(seq, data) for seq, data in self.fragments if seq > last]
+                if len(pending) > self.max_backlog:
+                    self.skipped += len(pending) - 1
+                    pending = pending[-1:]
+                for seq, data in pending:
+                    yield data
+                    self.meter.add(viewer, len(data))
+                    last = seq
+        finally:
+            self.meter.disconnect(viewer)
+
+    def _publish(self, item):
+        """_cond 안에서: astream viewer들의 큐에 (seq, bytes) (init은 seq 0, 끝이면 None)"""
+        for loop, queue in list(self._subscribers.values()):
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, item)
+            except RuntimeError:
+                pass  # 이벤트 루프가 이미 닫힘
+
+    def _offer(self, queue, item):
+        """이벤트 루프 스레드에서 실행 - 밀린 viewer는 쌓인 fragment를 버리고 최신부터 (init은 남김)"""
+        if item is not None and item[0] > 0 and queue.qsize() >= self.max_backlog:
+            kept = []
+            while not queue.empty():
+                pending = queue.get_nowait()
+                if pending is not None and pending[0] == 0:
+                    kept.append(pending)
+                else:
+                    self.skipped += 1
+            for pending in kept:
+                queue.put_nowait(pending)
+        queue.put_nowait(item)
+
+    async def astream(self):
+        """stream()의 async 버전 - 기다리는 동안 스레드 풀을 쓰지 않음"""
+        if not await asyncio.to_thread(self.ensure_running):
+            return
+        queue = asyncio.Queue()
+        viewer = self.meter.connect()
+        try:
+            with self._cond:
+                if not self.running:
+                    return
+                self._subscribers[viewer] = (asyncio.get_running_loop(), queue)
+                # 이미 나온 init + 최근 fragment부터 (이후 것은 _read가 큐에 넣음)
+                if self.init is not None:
+                    queue.put_nowait((0, self.init))
+                    if self.fragments:
+                        queue.put_nowait(self.fragments[-1])
+            first = True
+            while True:
+                if first:
+                    try:
+                        item = await asyncio.wait_for(queue.get(), max(5.0, 3 * self.gop / self.fps))
+                    except asyncio.TimeoutError:
+                        return
+                    first = False
+                else:
+                    item = await queue.get()
+                if item is None:
+                    return
+                yield item[1]
+                self.meter.add(viewer, len(item[1]))
+        finally:
+            with self._cond:
+                self._subscribers.pop(viewer, None)
+            self.meter.disconnect(viewer)
+
+    def stats(self):
+        return {
+            "available": self.available(),
+            "running": self.running,
+            "fps": self.fps,
+            "bitrate_kbps": self.bitrate_kbps,
+            "gop": self.gop,
+            "width": self.width,
+            "preset": self.preset,
+            "input": [self.shape[1], self.shape[0]] if self.shape else None,
+            "frames_fed": self.frames_fed,
+            "encoded_mb": round(self.bytes_out / 1e6, 2),
+            "fragments": self.seq,
+            "skipped_fragments": self.skipped,
+            "restarts": self.restarts,
+            "error": self.error,
+        }
+
+
+# ===== 프로세스 공용 =====
+
+_shared = None
+
+
+def shared_stream(lease_frame):
+    """프로세스에 인코더 하나 (Flask / ASGI 어느 쪽이든 같은 것)"""
+    global _shared
+    if _shared is None:
+        _shared = H264Stream(lease_frame)
+    return _shared
+
+
+def stream_stats():
+    """/status의 streams: viewer별 bytes/s (MJPEG vs H.264) + 인코더 상태"""
+    mjpeg = STREAM_METERS['mjpeg'].stats()
+    h264 = STREAM_METERS['h264'].stats()
+    ratio = None
+    if mjpeg['mean_kbit_s'] and h264['mean_kbit_s']:
+        ratio = round(h264['mean_kbit_s'] / mjpeg['mean_kbit_s'], 3)
+    return {
+        "mjpeg": mjpeg,
+        "h264": h264,
+        "h264_vs_mjpeg": ratio,
+        "encoder": _shared.stats() if _shared is not None else None,
+    }
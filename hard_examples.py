@@ -0,0 +1,301 @@
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+
+import cv2
+
+from cpu_plan import pin_thread
+from dataset_cache import IMG_EXTS, iter_files
+from image_hash import HashIndex, phash
+from run_index import PROJECT_DIR
+
+# 애매한 탐지 프레임 수집 (HARVEST=1) -> YOLO images/ + labels/ 형식
+HARVEST_DIR = Path(os.environ.get('HARVEST_DIR', PROJECT_DIR / 'runs' / 'hard_examples'))
+QUOTA_BYTES = int(float(os.environ.get('HARVEST_QUOTA_MB', 1024)) * 1024 * 1024)
+# 임계값 +- margin 안의 confidence = 애매함
+MARGIN = float(os.environ.get('HARVEST_MARGIN', 0.1))
+# 같은 소스에서 최소 간격 (연속 프레임을 다 넣지 않도록)
+MIN_INTERVAL_S = float(os.environ.get('HARVEST_INTERVAL_S', 1.0))
+# pHash 해밍 거리가 이 이하면 이미 있는 장면으로 보고 버림
+MAX_DIST = int(os.environ.get('HARVEST_MAX_DIST', 6))
+# pseudo-label로 쓸 최소 confidence
+LABEL_CONF = float(os.environ.get('HARVEST_LABEL_CONF', 0.25))
+JPEG_QUALITY = 95
+
+
+def uncertain(detections, names, thresholds, margin=MARGIN):
+    """thresholds {클래스: 임계값} 근처 (+- margin) confidence가 있으면 그 최대 confidence, 없으면 None"""
+    best = None
+    for _, conf, cls in detections:
+        threshold = thresholds.get(names[cls])
+        if threshold is not None and abs(conf - threshold) <= margin:
+            best = conf if best is None else max(best, conf)
+    return best
+
+
+def class_map(names, label_names):
+    """탐지한 모델의 클래스 id -> 라벨 공간(label_names)의 id (이름 기준, 없는 클래스는 빠짐)"""
+    if not label_names:
+        return {cls: cls for cls in names}
+    ids = {name: cls for cls, name in label_names.items()}
+    return {cls: ids[name] for cls, name in names.items() if name in ids}
+
+
+def yolo_labels(detections, shape, min_conf=LABEL_CONF, ids=None):
+    """Detections -> YOLO 라벨 줄 (cls cx cy w h, 0~1 정규화)
+
+    ids: 클래스 id 변환 (class_map) - 라벨 공간에 없는 클래스가 있으면 None (반쪽 라벨은 false negative)
+    """
+    h, w = shape[:2]
+    lines = []
+    for (x1, y1, x2, y2), conf, cls in detections:
+        if conf < min_conf:
+            continue
+        if ids is not None:
+            if cls not in ids:
+                return None
+            cls = ids[cls]
+        lines.append(f"{cls} {(x1 + x2) / 2 / w:.6f} {(y1 + y2) / 2 / h:.6f} "
+                     f"{(x2 - x1) / w:.6f} {(y2 - y1) / h:.6f}")
+    return lines
+
+
+class HardExampleHarvester:
+    """추론 결과가 애매한 프레임을 백그라운드에서 pseudo-label과 함께 저장
+
+    - offer(): 추론 스레드에서 호출. 박스 몇 개 확인 + (뽑힐 때만) 프레임 복사 + put_nowait 뿐.
+      큐가 차 있으면 버림 (추론 루프는 절대 기다리지 않음)
+    - 저장 스레드: pHash -> HashIndex로 이미 있는 장면과 가까우면 버리고,
+      아니면 images/<이름>.jpg + labels/<이름>.txt 를 씀 (이름에 시각/소스/해시)
+    - quota_bytes를 넘으면 오래된 것부터 삭제. 재시작하면 파일 이름에서 인덱스를 다시 만듦
+    """
+
+    def __init__(self, root=HARVEST_DIR, names=None, quota_bytes=QUOTA_BYTES, max_dist=MAX_DIST,
+                 margin=MARGIN, min_interval_s=MIN_INTERVAL_S, label_conf=LABEL_CONF, queue_size=8):
+        self.root = Path(root)
+        self.images = self.root / 'images'
+        self.labels = self.root / 'labels'
+        self.names = dict(names or {})
+        self.quota_bytes = quota_bytes
+        self.margin = margin
+        self.min_interval_s = min_interval_s
+        self.label_conf = label_conf
+        self.index = HashIndex(max_dist)
+        self._files = deque()  # (이름, bytes) 오래된 순
+        self.bytes = 0
+        self._last = {}
+        self._class_maps = {}
+        self._queue = queue.Queue(queue_size)
+        self.counts = Counter()
+        self.offer_us = deque(maxlen=500)
+        self.hash_ms = deque(maxlen=200)
+        self.write_ms = deque(maxlen=200)
+
+        self.images.mkdir(parents=True, exist_ok=True)
+        self.labels.mkdir(parents=True, exist_ok=True)
+        self._load()
+        self._write_yaml()
+        self._thread = threading.Thread(target=self._loop, name='harvester', daemon=True)
+        self._thread.start()
+
+    # ===== 추론 스레드 쪽 =====
+
+    def offer(self, frame, detections, names, thresholds, source):
+        """애매하면 프레임을 복사해서 저장 큐에 (복사는 뽑힌 프레임만) -> 넣었으면 True
+
+        names: detections를 만든 모델의 클래스 이름 - 라벨 id는 저장 스레드에서
+        harvester의 names 기준으로 이름으로 바꿈 (실시간/온디맨드 모델이 달라도 같은 라벨 공간).
+        클래스 필터(classes=)를 건 추론 결과는 넘기지 말 것 (빠진 클래스가 라벨 없는 물체가 됨)
+        """
+        start = time.perf_counter()
+        try:
+            self.counts['offered'] += 1
+            if self.min_interval_s and start - self._last.get(source, -1e9) < self.min_interval_s:
+                return False
+            conf = uncertain(detections, names, thresholds, self.margin)
+            if conf is None:
+                return False
+            self._last[source] = start
+            try:
+                self._queue.put_nowait((frame.copy(), detections, names, source, conf, time.time()))
+            except queue.Full:
+                self.counts['dropped'] += 1
+                return False
+            self.counts['sampled'] += 1
+            return True
+        finally:
+            self.offer_us.append((time.perf_counter() - start) * 1e6)
+
+    # ===== 저장 스레드 =====
+
+    def _loop(self):
+        pin_thread('io')
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self._save(*item)
+            except Exception as e:
+                self.counts['errors'] += 1
+                print(f"❌ hard example 저장 실패: {e}")
+
+    def _save(self, frame, detections, names, source, conf, when):
+        label_lines = yolo_labels(detections, frame.shape, self.label_conf, self._ids(names))
+        if label_lines is None:
+            self.counts['unmapped'] += 1
+            return
+
+        start = time.perf_counter()
+        h = phash(frame)
+        self.hash_ms.append((time.perf_counter() - start) * 1000)
+        if self.index.nearest(h) is not None:
+            self.counts['duplicates'] += 1
+            return
+
+        start = time.perf_counter()
+        # ms는 버림 (반올림하면 .9996 -> .000 이 되어 같은 초 안에서 순서가 뒤집힘)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(when)) + f'.{int(when * 1000) % 1000:03d}'
+        name = f"{stamp}_{source}_{int(conf * 100):02d}_{h:016x}"
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        if not ok:
+            self.counts['errors'] += 1
+            return
+        # 라벨 먼저, 이미지는 tmp + rename (반쪽 이미지가 학습에 들어가지 않도록)
+        label = '\n'.join(label_lines)
+        (self.labels / f'{name}.txt').write_text(label + '\n' if label else '')
+        tmp = self.images / f'.{name}.jpg.tmp'
+        buffer.tofile(str(tmp))
+        os.replace(tmp, self.images / f'{name}.jpg')
+        self.write_ms.append((time.perf_counter() - start) * 1000)
+
+        size = buffer.nbytes + len(label)
+        self.index.add(name, h)
+        self._files.append((name, size))
+        self.bytes += size
+        self.counts['written'] += 1
+        self.evict()
+
+    def _ids(self, names):
+        key = tuple(sorted(dict(names).items()))  # 모델 교체로 이름이 바뀌어도 안전
+        ids = self._class_maps.get(key)
+        if ids is None:
+            ids = self._class_maps[key] = class_map(dict(key), self.names)
+        return ids
+
+    def evict(self, quota_bytes=None):
+        """quota를 넘는 만큼 오래된 것부터 삭제 -> 삭제 수"""
+        quota_bytes = self.quota_bytes if quota_bytes is None else quota_bytes
+        removed = 0
+        while self._files and self.bytes > quota_bytes:
+            name, size = self._files.popleft()
+            for path in (self.images / f'{name}.jpg', self.labels / f'{name}.txt'):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            self.index.remove(name)
+            self.bytes -= size
+            removed += 1
+        self.counts['evicted'] += removed
+        return removed
+
+    # ===== 시작 =====
+
+    def _load(self):
+        """기존 파일에서 인덱스 / 용량 복원 (이름 끝 16자리가 pHash)
+
+        오래된 순서는 mtime으로 (같은 ms에 저장된 파일은 이름이 해시 순이라 이름으로는 알 수 없음)
+        """
+        files = [(path.stat().st_mtime_ns, path) for path in iter_files(self.images, IMG_EXTS)]
+        for _, path in sorted(files):
+            name = path.stem
+            try:
+                h = int(name.rsplit('_', 1)[1], 16)
+            except (IndexError, ValueError):
+                continue
+            label = self.labels / f'{name}.txt'
+            size = path.stat().st_size + (label.stat().st_size if label.exists() else 0)
+            self.index.add(name, h)
+            self._files.append((name, size))
+            self.bytes += size
+        for tmp in self.images.glob('.*.tmp'):
+            tmp.unlink()
+
+    def _write_yaml(self):
+        """바로 학습/검증에 쓸 수 있게 data.yaml (클래스 이름은 모델 기준)"""
+        if not self.names:
+            return
+        lines = [f'path: {self.root.resolve()}', 'train: images', 'val: images', 'names:']
+        lines += [f'  {cls}: {name}' for cls, name in sorted(self.names.items())]
+        tmp = self.root / 'data.yaml.tmp'
+        tmp.write_text('\n'.join(lines) + '\n')
+        os.replace(tmp, self.root / 'data.yaml')
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def stats(self):
+        def mean(values):
+            values = list(values)
+            return round(sum(values) / len(values), 3) if values else None
+
+        return {
+            "dir": str(self.root),
+            "files": len(self._files),
+            "mb": round(self.bytes / 1e6, 1),
+            "quota_mb": round(self.quota_bytes / 1e6, 1),
+            "queued": self._queue.qsize(),
+            "offer_us": mean(self.offer_us),
+            "hash_ms": mean(self.hash_ms),
+            "write_ms": mean(self.write_ms),
+            **self.counts,
+        }
+
+
+def harvester_from_env(names, subdir=None, share=1):
+    """HARVEST=1 이면 harvester, 아니면 None
+
+    subdir: 모델마다 따로 모을 때 HARVEST_DIR/<subdir> (라벨 공간 = 그 모델의 클래스)
+    share:  harvester 개수 - quota를 나눠 가짐
+    """
+    if os.environ.get('HARVEST') != '1':
+        return None
+    harvester = HardExampleHarvester(HARVEST_DIR / subdir if subdir else HARVEST_DIR, names=names,
+                                     quota_bytes=QUOTA_BYTES // share)
+    print(f"🧺 hard example 수집: {harvester.root} ({len(harvester.index)}개, "
+          f"{harvester.bytes / 1e6:.1f}/{harvester.quota_bytes / 1e6:.0f}MB)")
+    return harvester
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='수집한 hard example 관리')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('summary', help='개수 / 용량 / 클래스별 라벨 수')
+    p_evict = sub.add_parser('evict', help='용량 줄이기 (오래된 것부터)')
+    p_evict.add_argument('--max-mb', type=float, required=True)
+    sub.add_parser('clear', help='전부 삭제')
+    opt = parser.parse_args()
+
+    if opt.cmd == 'clear':
+        shutil.rmtree(HARVEST_DIR, ignore_errors=True)
+        print(f"🗑️  {HARVEST_DIR} 삭제")
+    else:
+        harvester = HardExampleHarvester(min_interval_s=0)
+        if opt.cmd == 'evict':
+            removed = harvester.evict(int(opt.max_mb * 1024 * 1024))
+            print(f"🗑️  {removed}개 삭제")
+        per_class = Counter()
+        for label in iter_files(harvester.labels, {'.txt'}):
+            per_class.update(line.split()[0] for line in label.read_text().splitlines() if line.strip())
+        print(json.dumps({"files": len(harvester.index), "mb": round(harvester.bytes / 1e6, 1),
+                          "labels_per_class": dict(per_class)}, indent=2))
+        harvester.close()
@@ -0,0 +1,91 @@
+import cv2
+import numpy as np
+
+HASH_BITS = 64
+
+
+def phash(image):
+    """BGR(또는 gray) 이미지 -> 64bit perceptual hash (int)
+
+    32x32로 줄인 밝기의 DCT 저주파 8x8이 중앙값보다 큰지 여부.
+    밝기 / 압축 / 약간의 흔들림에는 거의 그대로이고 장면이 바뀌면 크게 달라짐.
+    """
+    small = cv2.resize(image, (32, 32), interpolation=cv2.INTER_AREA)  # 먼저 줄이고 회색 변환 (큰 프레임도 싸게)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    low = cv2.dct(small.astype(np.float32))[:8, :8].ravel()
+    bits = low > np.median(low[1:])  # DC(평균 밝기)는 중앙값에서 뺌
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class HashIndex:
+    """64bit 해시의 해밍 거리 근접 검색 (메모리, multi-index hashing)
+
+    해시를 max_dist + 1 개 구간으로 나눠 구간 값마다 dict에 넣는다.
+    거리가 max_dist 이하인 두 해시는 비둘기집 원리로 적어도 한 구간이 똑같으므로,
+    후보는 구간이 같은 것만 보면 된다 (전체 비교 없음, 항목 수와 거의 무관).
+    """
+
+    def __init__(self, max_dist=6, bits=HASH_BITS):
+        self.max_dist = max_dist
+        n = max_dist + 1
+        widths = [bits // n + (1 if i < bits % n else 0) for i in range(n)]
+        self._bands = []
+        shift = bits
+        for width in widths:
+            shift -= width
+            self._bands.append((shift, (1 << width) - 1))
+        self._tables = [{} for _ in self._bands]
+        self.hashes = {}
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def __contains__(self, key):
+        return key in self.hashes
+
+    def _keys(self, h):
+        return [(h >> shift) & mask for shift, mask in self._bands]
+
+    def add(self, key, h):
+        if key in self.hashes:
+            self.remove(key)
+        self.hashes[key] = h
+        for table, band in zip(self._tables, self._keys(h)):
+            table.setdefault(band, set()).add(key)
+
+    def remove(self, key):
+        h = self.hashes.pop(key, None)
+        if h is None:
+            return
+        for table, band in zip(self._tables, self._keys(h)):
+            bucket = table.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del table[band]
+
+    def query(self, h, max_dist=None):
+        """거리 max_dist(<= 인덱스의 max_dist) 이하인 항목 -> [(거리, key)] 가까운 순"""
+        max_dist = self.max_dist if max_dist is None else min(max_dist, self.max_dist)
+        candidates = set()
+        for table, band in zip(self._tables, self._keys(h)):
+            bucket = table.get(band)
+            if bucket:
+                candidates.update(bucket)
+        found = []
+        for key in candidates:
+            dist = hamming(h, self.hashes[key])
+            if dist <= max_dist:
+                found.append((dist, key))
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def nearest(self, h, max_dist=None):
+        """가장 가까운 (거리, key) - 없으면 None"""
+        found = self.query(h, max_dist)
+        return found[0] if found else None
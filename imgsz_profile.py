@@ -0,0 +1,202 @@
+import json
+import os
+import platform
+import time
+from pathlib import Path
+
+import yaml
+
+from run_index import _stat_key, measure_cpu_latency
+
+# 측정할 입력 크기 (32의 배수)
+SIZES = (320, 384, 448, 512, 576, 640)
+PROFILE_SUFFIX = '.imgsz.json'
+
+
+def profile_path(weights):
+    """가중치 옆에 저장 (best.pt -> best.imgsz.json)"""
+    return Path(weights).with_suffix(PROFILE_SUFFIX)
+
+
+def data_yaml_for(weights):
+    """학습 때 쓴 data.yaml (runs/detect/<run>/args.yaml의 data)"""
+    args_path = Path(weights).resolve().parent.parent / 'args.yaml'
+    if args_path.exists():
+        with open(args_path) as f:
+            return (yaml.safe_load(f) or {}).get('data')
+    return None
+
+
+# ===== 측정 =====
+
+def evaluate(weights, data, imgsz, batch=8, device='cpu'):
+    """검증 split에서 imgsz로 평가 -> 전체 / 클래스별 mAP"""
+    from ultralytics import YOLO
+
+    metrics = YOLO(weights).val(data=data, imgsz=imgsz, split='val', batch=batch, device=device,
+                                plots=False, verbose=False)
+    box = metrics.box
+    per_class = {}
+    for i, c in enumerate(box.ap_class_index):
+        per_class[metrics.names[int(c)]] = {
+            'map50': round(float(box.ap50[i]), 4),
+            'map50_95': round(float(box.ap[i]), 4),
+        }
+    return {
+        'map50': round(float(box.map50), 4),
+        'map50_95': round(float(box.map), 4),
+        'per_class': per_class,
+    }
+
+
+def build_profile(weights, data=None, sizes=SIZES, runs=20, batch=8):
+    """크기별 mAP(클래스별) + 이 PC의 CPU 지연시간 -> 프로필 저장"""
+    import torch
+
+    data = data or data_yaml_for(weights)
+    if not data:
+        raise FileNotFoundError(f"data.yaml을 찾을 수 없습니다 (--data로 지정): {weights}")
+
+    entries = []
+    for imgsz in sorted(sizes):
+        print(f"📐 imgsz={imgsz}: 검증 중...")
+        entry = {'imgsz': imgsz, **evaluate(weights, data, imgsz, batch=batch)}
+        entry['latency_ms'] = measure_cpu_latency(weights, imgsz, runs=runs)
+        entry['fps'] = round(1000 / entry['latency_ms'], 1)
+        print(f"   mAP50-95={entry['map50_95']:.4f}  {entry['latency_ms']}ms ({entry['fps']} fps)")
+        entries.append(entry)
+
+    profile = {
+        'weights': str(weights),
+        'fingerprint': _stat_key(weights),
+        'data': str(data),
+        'created': time.time(),
+        'machine': platform.node(),
+        'processor': platform.processor() or platform.machine(),
+        'torch_threads': torch.get_num_threads(),
+        'sizes': entries,
+    }
+    path = profile_path(weights)
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp, path)
+    print(f"✅ 프로필 저장: {path}")
+    return profile
+
+
+def load_profile(weights):
+    """저장된 프로필 (없거나 가중치가 바뀌었으면 None)"""
+    path = profile_path(weights)
+    try:
+        with open(path) as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if profile.get('fingerprint') != _stat_key(weights):
+        print(f"⚠️  가중치가 바뀌어 imgsz 프로필을 무시합니다 (imgsz_profile.py로 다시 측정): {path}")
+        return None
+    return profile
+
+
+# ===== 선택 =====
+
+def _score(entry, classes=None, metric='map50_95'):
+    """classes의 평균 mAP (클래스별 값이 없으면 전체 mAP)"""
+    if classes:
+        values = [entry['per_class'][c][metric] for c in classes if c in entry['per_class']]
+        if values:
+            return sum(values) / len(values)
+    return entry[metric]
+
+
+def pick_imgsz(profile, target_fps=None, classes=None, metric='map50_95'):
+    """target_fps를 넘는 크기 중 classes의 mAP가 가장 높은 크기
+
+    조건을 만족하는 크기가 없으면 가장 빠른 크기, 점수가 같으면 작은 크기
+    """
+    entries = sorted(profile['sizes'], key=lambda e: e['imgsz'])
+    if target_fps:
+        fast = [e for e in entries if e['fps'] >= target_fps]
+        if not fast:
+            best = max(entries, key=lambda e: e['fps'])
+            print(f"⚠️  {target_fps} fps를 넘는 크기가 없습니다 -> 가장 빠른 {best['imgsz']} ({best['fps']} fps)")
+            return best['imgsz']
+        entries = fast
+    return max(entries, key=lambda e: (_score(e, classes, metric), -e['imgsz']))['imgsz']
+
+
+def select_imgsz(weights, classes=None, env_prefix='REALTIME', target_fps=None):
+    """추론 입력 크기 결정 (None이면 ultralytics 기본값)
+
+    1. 환경변수 {env_prefix}_IMGSZ (고정)
+    2. 프로필 + {env_prefix}_TARGET_FPS (없으면 target_fps, 그것도 없으면 mAP 최고)
+    """
+    fixed = os.environ.get(f'{env_prefix}_IMGSZ')
+    if fixed:
+        return int(fixed)
+
+    profile = load_profile(weights)
+    if profile is None:
+        return None
+    if os.environ.get(f'{env_prefix}_TARGET_FPS'):
+        target_fps = float(os.environ[f'{env_prefix}_TARGET_FPS'])
+    imgsz = pick_imgsz(profile, target_fps, classes)
+    print(f"📐 {env_prefix.lower()} imgsz={imgsz} (목표 {target_fps or '-'} fps, {', '.join(classes or [])})")
+    return imgsz
+
+
+def imgsz_kwargs(imgsz):
+    """predict()에 넘길 옵션 (None이면 기본값 그대로)"""
+    return {} if imgsz is None else {'imgsz': imgsz}
+
+
+def print_profile(profile, classes=None):
+    names = classes or sorted({c for e in profile['sizes'] for c in e['per_class']})
+    print(f"{'imgsz':>6}{'ms':>8}{'fps':>7}{'mAP50':>8}{'50-95':>8}" + ''.join(f"{n[:12]:>14}" for n in names))
+    for e in sorted(profile['sizes'], key=lambda e: e['imgsz']):
+        per_class = ''.join(f"{e['per_class'].get(n, {}).get('map50_95', float('nan')):>14.4f}" for n in names)
+        print(f"{e['imgsz']:>6}{e['latency_ms']:>8}{e['fps']:>7}{e['map50']:>8.4f}{e['map50_95']:>8.4f}{per_class}")
+
+
+def main(argv=None):
+    import argparse
+
+    from run_index import resolve_model_path
+
+    parser = argparse.ArgumentParser(description='입력 크기별 정확도 / CPU 지연시간 프로필')
+    parser.add_argument('--weights', default=None, help='가중치 (기본: run 인덱스 선택)')
+    sub = parser.add_subparsers(dest='cmd')
+
+    p_run = sub.add_parser('run', help='크기별 검증 + 지연시간 측정 후 저장')
+    p_run.add_argument('--data', default=None, help='data.yaml (기본: run의 args.yaml)')
+    p_run.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    p_run.add_argument('--runs', type=int, default=20, help='지연시간 측정 반복 수')
+    p_run.add_argument('--batch', type=int, default=8)
+
+    p_pick = sub.add_parser('pick', help='목표 fps로 크기 선택')
+    p_pick.add_argument('--fps', type=float, default=None)
+    p_pick.add_argument('--classes', nargs='+', default=None)
+
+    sub.add_parser('show', help='저장된 프로필 출력')
+
+    opt = parser.parse_args(argv)
+    weights = opt.weights or resolve_model_path()
+
+    if opt.cmd == 'run':
+        print_profile(build_profile(weights, opt.data, opt.sizes, opt.runs, opt.batch))
+        return 0
+
+    profile = load_profile(weights)
+    if profile is None:
+        print(f"❌ 프로필이 없습니다: python imgsz_profile.py --weights {weights} run")
+        return 1
+    if opt.cmd == 'pick':
+        print(pick_imgsz(profile, opt.fps, opt.classes))
+    else:
+        print_profile(profile)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
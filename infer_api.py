@@ -0,0 +1,97 @@
+import os
+
+import cv2
+import numpy as np
+
+from inference_worker import PRIORITY_BATCH
+
+# /infer 요청 제한
+MAX_IMAGES = int(os.environ.get('INFER_MAX_IMAGES', 32))
+MAX_BYTES = int(os.environ.get('INFER_MAX_MB', 20)) * 1024 * 1024
+# 박스 한 개 = [x1, y1, x2, y2, conf, cls] (키 반복 없는 간단한 JSON)
+FIELDS = ['x1', 'y1', 'x2', 'y2', 'conf', 'cls']
+
+
+class InferRequestError(ValueError):
+    """잘못된 /infer 요청 (status = HTTP 상태 코드)"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_options(args, models, content_length=None):
+    """?model=ondemand|realtime&conf=0.25 -> (model, min_conf)"""
+    if content_length and content_length > MAX_BYTES:
+        raise InferRequestError(f"요청이 너무 큽니다 (최대 {MAX_BYTES // (1024 * 1024)}MB)", 413)
+    model = args.get('model', 'ondemand')
+    if model not in models:
+        raise InferRequestError(f"알 수 없는 모델: {model} ({', '.join(models)})")
+    try:
+        min_conf = float(args.get('conf', 0.25))
+    except ValueError:
+        raise InferRequestError("conf는 숫자여야 합니다")
+    return model, min_conf
+
+
+def check_images(blobs):
+    if not blobs:
+        raise InferRequestError("이미지가 없습니다 (multipart 파일 또는 raw 이미지 body)")
+    if len(blobs) > MAX_IMAGES:
+        raise InferRequestError(f"이미지가 너무 많습니다 (최대 {MAX_IMAGES}장)", 413)
+
+
+def flask_images(request):
+    """Flask request -> (labels, blobs): multipart 파일 전부, 없으면 raw body 한 장"""
+    if request.files:
+        files = [f for key in request.files for f in request.files.getlist(key)]
+        return [f.filename or f.name for f in files], [f.read() for f in files]
+    data = request.get_data(cache=False)
+    return (['body'], [data]) if data else ([], [])
+
+
+async def starlette_images(request):
+    """Starlette request -> (labels, blobs) (flask_images와 같은 규칙)"""
+    if request.headers.get('content-type', '').startswith('multipart/'):
+        # python-multipart가 필요 (없으면 starlette가 AssertionError)
+        try:
+            form = await request.form()
+        except AssertionError as e:
+            raise InferRequestError(str(e), 415)
+        files = [value for _, value in form.multi_items() if hasattr(value, 'read')]
+        return [f.filename for f in files], [await f.read() for f in files]
+    data = await request.body()
+    return (['body'], [data]) if data else ([], [])
+
+
+def submit_images(worker, blobs, model, opts):
+    """인코딩된 이미지들 -> [(frame shape, Future[Detections]) 또는 None (디코딩 실패)]
+
+    요청 버퍼를 np.frombuffer로 감싸서 복사 없이 디코딩하고 PRIORITY_BATCH로 제출.
+    동시에 들어온 요청들은 추론 스레드가 같은 forward로 묶는다 (micro-batching).
+    """
+    submitted = []
+    for blob in blobs:
+        frame = cv2.imdecode(np.frombuffer(blob, np.uint8), cv2.IMREAD_COLOR) if blob else None
+        if frame is None:
+            submitted.append(None)
+            continue
+        submitted.append((frame.shape, worker.submit(frame, PRIORITY_BATCH, model=model, **opts)))
+    return submitted
+
+
+def images_payload(labels, results, names, min_conf):
+    """[(shape, Detections) 또는 None] -> /infer 응답"""
+    images = []
+    for label, result in zip(labels, results):
+        if result is None:
+            images.append({"name": label, "error": "이미지를 디코딩할 수 없습니다"})
+            continue
+        shape, detections = result
+        images.append({
+            "name": label,
+            "size": [shape[1], shape[0]],
+            "boxes": [[round(x1, 1), round(y1, 1), round(x2, 1), round(y2, 1), round(conf, 3), cls]
+                      for (x1, y1, x2, y2), conf, cls in detections if conf >= min_conf],
+        })
+    return {"success": True, "fields": FIELDS, "names": dict(names), "images": images}
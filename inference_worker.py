@@ -0,0 +1,204 @@
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from cpu_plan import pin_thread
+
+# 우선순위 (작을수록 먼저)
+PRIORITY_ONDEMAND = 0   # 앱 버튼 (/detect_sale, /detect_impossibility)
+PRIORITY_BATCH = 1      # 외부 요청
+PRIORITY_REALTIME = 2   # 카메라 실시간 프레임
+# 우선순위별 양보 시간 (초) - 큐는 "도착 시각 + 양보 시간" (마감) 순서.
+# 높은 우선순위가 계속 들어와도 실시간 프레임은 이만큼만 밀림 (캡처 루프가 멈추지 않음)
+MAX_WAIT_S = {PRIORITY_ONDEMAND: 0.0, PRIORITY_BATCH: 0.05, PRIORITY_REALTIME: 0.1}
+
+
+class Detections:
+    """한 프레임의 탐지 결과 (numpy 배열)"""
+
+    __slots__ = ('xyxy', 'conf', 'cls')
+
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, int))
+
+    @classmethod
+    def from_result(cls, result):
+        """ultralytics Results -> Detections (박스마다 .item() 하지 않고 한 번에 변환)"""
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return cls.empty()
+        return cls(boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy().astype(int))
+
+    def __len__(self):
+        return len(self.conf)
+
+    def __iter__(self):
+        """((x1, y1, x2, y2), conf, cls) 파이썬 값으로 순회"""
+        return zip(self.xyxy.tolist(), self.conf.tolist(), self.cls.tolist())
+
+
+def frame_evidence(per_frame, names, class_name, threshold, mode='vote', min_votes=None):
+    """여러 프레임 탐지 결과 -> class_name 판정 근거
+
+    프레임마다 class_name의 최고 confidence (없으면 0)를 모아서
+      - max:  가장 높은 프레임이 threshold 초과
+      - mean: 프레임 평균이 threshold 초과
+      - vote: threshold를 넘은 프레임 수 >= min_votes (기본 절반 이상)
+    -> {"detected", "confidence", "max", "mean", "votes", "frames", "per_frame"}
+    """
+    best = [max((conf for _, conf, cls in detections if names[cls] == class_name), default=0.0)
+            for detections in per_frame]
+    n = len(best)
+    passed = [conf for conf in best if conf > threshold]
+    evidence = {
+        "max": max(best, default=0.0),
+        "mean": sum(best) / n if n else 0.0,
+        "votes": len(passed),
+        "frames": n,
+    }
+    if mode == 'max':
+        detected, confidence = evidence["max"] > threshold, evidence["max"]
+    elif mode == 'mean':
+        detected, confidence = evidence["mean"] > threshold, evidence["mean"]
+    else:
+        needed = min_votes or (n + 1) // 2
+        detected = n > 0 and len(passed) >= needed
+        confidence = sum(passed) / len(passed) if passed else evidence["max"]
+    return {"detected": detected, "confidence": confidence, **evidence, "per_frame": best}
+
+
+class InferenceWorker:
+    """모델을 단독으로 소유하는 추론 스레드
+
+    - 모든 추론 요청은 우선순위 큐를 거침 (온디맨드 > 외부 요청 > 실시간)
+      순서는 도착 시각 + MAX_WAIT_S[우선순위] 라서 낮은 우선순위도 무한정 굶지 않음
+    - 이미 쌓인 요청은 한 번의 forward로 묶고, 사용자 요청이 섞여 있으면
+      batch_window_ms 동안 더 기다렸다가 같이 처리 (micro-batching)
+    - 모델을 한 스레드만 호출하므로 torch 스레드 풀이 동시에 여러 번 돌지 않음
+    """
+
+    def __init__(self, manager, batch_window_ms=4.0, max_batch=8):
+        # ModelManager 하나 또는 {이름: ModelManager} (캐스케이드 - 모델이 다르면 따로 묶음)
+        self.managers = manager if isinstance(manager, dict) else {'default': manager}
+        self.manager = next(iter(self.managers.values()))
+        self.default_model = next(iter(self.managers))
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max_batch
+
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name='inference', daemon=True)
+
+        # 통계
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+        self.busy_s = 0.0
+
+        self._thread.start()
+
+    def submit(self, frame, priority=PRIORITY_REALTIME, model=None, **kwargs):
+        """추론 요청 -> Future[Detections] (model: managers의 이름, 기본은 첫 번째)"""
+        future = Future()
+        key = (model or self.default_model, tuple(sorted(kwargs.items())))
+        deadline = time.perf_counter() + MAX_WAIT_S.get(priority, MAX_WAIT_S[PRIORITY_REALTIME])
+        self._queue.put((deadline, next(self._seq), frame, key, future, priority))
+        return future
+
+    def infer(self, frame, priority=PRIORITY_REALTIME, timeout=None, **kwargs):
+        """동기 추론 (호출 스레드는 결과를 기다림)"""
+        return self.submit(frame, priority, **kwargs).result(timeout)
+
+    def stop(self):
+        self._running = False
+        self._queue.put((float('-inf'), next(self._seq), None, (), None, None))
+
+    def _collect(self, first):
+        """first와 같은 모델 + 옵션의 요청을 묶어서 반환 (다른 것은 deferred)"""
+        batch, deferred = [first], []
+        key = first[3]
+        deadline = None
+
+        while len(batch) < self.max_batch:
+            if deadline is None:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    # 사용자 요청이 있을 때만 잠깐 더 기다림 (실시간 프레임만이면 바로 실행)
+                    if all(b[5] == PRIORITY_REALTIME for b in batch) or self.batch_window <= 0:
+                        break
+                    deadline = time.perf_counter() + self.batch_window
+                    continue
+            else:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if item[4] is None:
+                deferred.append(item)
+                break
+            (batch if item[3] == key else deferred).append(item)
+
+        for item in deferred:
+            self._queue.put(item)
+        return batch
+
+    def _loop(self):
+        pin_thread('inference')
+        while self._running:
+            first = self._queue.get()
+            if first[4] is None:
+                continue
+
+            # 취소된 요청은 빼고 나머지는 RUNNING으로 (이후엔 취소 불가 -> set_result가 실패하지 않음)
+            batch = [item for item in self._collect(first) if item[4].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            frames = [item[2] for item in batch]
+            model, kwargs = batch[0][3]
+
+            start = time.perf_counter()
+            try:
+                detections = self.managers[model].detect(frames, **dict(kwargs))
+            except Exception as e:
+                detections, error = [], e
+            else:
+                error = RuntimeError(f"추론 결과 {len(detections)}개 < 요청 {len(batch)}개")
+            # 요청마다 따로 - 한 future의 문제가 같은 배치의 다른 요청으로 번지지 않게
+            for item, result in itertools.zip_longest(batch, detections[:len(batch)]):
+                if result is None:
+                    item[4].set_exception(error)
+                else:
+                    item[4].set_result(result)
+            self.busy_s += time.perf_counter() - start
+
+            self.batches += 1
+            self.items += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch": round(self.items / self.batches, 2) if self.batches else None,
+            "max_batch": self.max_batch_seen,
+            "busy_s": round(self.busy_s, 2),
+            "preprocess": (self.manager.preprocess_stats() if len(self.managers) == 1 else
+                           {name: m.preprocess_stats() for name, m in self.managers.items()}),
+        }
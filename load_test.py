@@ -0,0 +1,582 @@
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import urlparse
+
+PROJECT_DIR = Path(__file__).resolve().parent
+STREAMING_SERVER = PROJECT_DIR / 'detection streaming server.py'
+
+# 프론트엔드(App.tsx / CameraFeed.tsx)와 같은 주기
+POLL_INTERVAL = 3.0      # /get_latest_message
+HEALTH_INTERVAL = 10.0   # /health
+BUTTON_INTERVAL = 20.0   # 판매 확인 버튼 (평균, 지수분포)
+CLIENT_TIMEOUT = 5.0     # fetch AbortController 5초
+BOUNDARY = b'--frame\r\n'
+# 스트림 경로 -> 프레임(또는 fragment) 하나마다 한 번 나오는 표시
+STREAM_MARKERS = {'/video_feed': BOUNDARY, '/video_h264': b'moof'}
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+class Recorder:
+    """엔드포인트별 지연시간 / 상태 코드 / 오류 (스레드 공용)
+
+    실패한 요청도 지연시간에 넣음 (timeout은 CLIENT_TIMEOUT) - 빼면 서버가 밀릴수록 p99가 좋아 보임
+    """
+
+    def __init__(self):
+        self.latency = defaultdict(list)
+        self.codes = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, ms, code=None, error=None):
+        with self._lock:
+            self.latency[endpoint].append(ms)
+            if error is None:
+                self.codes[endpoint][code] += 1
+            else:
+                self.errors[endpoint] += 1
+                self.codes[endpoint][error] += 1
+
+    def summary(self, duration):
+        rows = {}
+        for endpoint in sorted(set(self.latency) | set(self.errors)):
+            ms = self.latency[endpoint]
+            rows[endpoint] = {
+                "requests": len(ms),
+                "rps": round(len(ms) / duration, 2),
+                "errors": self.errors[endpoint],
+                "codes": {str(k): v for k, v in self.codes[endpoint].items()},
+                "p50_ms": _round(percentile(ms, 0.50)),
+                "p90_ms": _round(percentile(ms, 0.90)),
+                "p99_ms": _round(percentile(ms, 0.99)),
+                "max_ms": _round(max(ms) if ms else None),
+            }
+        return rows
+
+
+def _round(v, n=1):
+    return None if v is None else round(v, n)
+
+
+def _viewer_group(streams):
+    """스트림 client 묶음 -> 한 명당 평균 fps / kbit/s (없으면 None)"""
+    streams = [s for s in streams if s["seconds"]]
+    if not streams:
+        return None
+    return {"clients": len(streams),
+            "fps_mean": _round(sum(s["frames"] / s["seconds"] for s in streams) / len(streams)),
+            "kbit_per_s": _round(sum(s["bytes"] * 8 / 1000 / s["seconds"] for s in streams) / len(streams))}
+
+
+def _failure(e, start):
+    """실패한 요청 -> (지연 ms, 상태 코드, 오류 종류) - timeout은 적어도 CLIENT_TIMEOUT만큼 걸린 것으로"""
+    ms = (time.perf_counter() - start) * 1000
+    if isinstance(e, TimeoutError):
+        return max(ms, CLIENT_TIMEOUT * 1000), None, 'timeout'
+    return ms, None, type(e).__name__
+
+
+# ===== 가상 태블릿 =====
+
+class Tablet:
+    """대시보드를 연 태블릿 한 대
+
+    - 3초마다 /get_latest_message, 10초마다 /health
+    - 가끔 판매 확인 버튼: /detect_sale -> 실패하면 /detect_impossibility
+    - /video_feed (또는 /video_h264) 를 계속 열어 두고 받은 프레임(fragment) 수 / 바이트를 셈
+    - read_kbps가 있으면 느린 client처럼 그 속도로만 읽음 (서버 pacing 확인용)
+    """
+
+    def __init__(self, index, base_url, recorder, stop, video=True, button_interval=BUTTON_INTERVAL, seed=0,
+                 poll_path='/get_latest_message', poll_interval=POLL_INTERVAL, video_path='/video_feed',
+                 read_kbps=None):
+        self.index = index
+        url = urlparse(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.recorder = recorder
+        self.stop = stop
+        self.video = video
+        self.button_interval = button_interval
+        self.poll_path = poll_path
+        self.poll_interval = poll_interval
+        self.video_path = video_path
+        self.read_kbps = read_kbps
+        self.rng = random.Random(seed * 1000 + index)
+        self.stream = {"client": index, "frames": 0, "bytes": 0, "first_frame_ms": None,
+                       "seconds": 0.0, "error": None, "slow": bool(read_kbps)}
+
+    def _request(self, conn, method, path):
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, headers={'Content-Type': 'application/json'} if method == 'POST' else {})
+            resp = conn.getresponse()
+            body = resp.read()
+            self.recorder.record(path, (time.perf_counter() - start) * 1000, resp.status)
+            return resp.status, body
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            self.recorder.record(path, *_failure(e, start))
+            return None, None
+
+    def _periodic(self, path, interval):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=CLIENT_TIMEOUT)
+        # 태블릿마다 시작 시점이 다름
+        next_at = time.perf_counter() + self.rng.uniform(0, interval)
+        while not self.stop.wait(max(0.0, next_at - time.perf_counter())):
+            self._request(conn, 'GET', path)
+            next_at += interval
+        conn.close()
+
+    def _buttons(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=CLIENT_TIMEOUT)
+        while not self.stop.wait(self.rng.expovariate(1 / self.button_interval)):
+            status, body = self._request(conn, 'POST', '/detect_sale')
+            try:
+                success = status is not None and json.loads(body).get('success')
+            except ValueError:
+                success = False
+            if not success:
+                self._request(conn, 'POST', '/detect_impossibility')
+        conn.close()
+
+    def _video(self):
+        stream = self.stream
+        marker = STREAM_MARKERS[self.video_path]
+        start = time.perf_counter()
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=CLIENT_TIMEOUT)
+        try:
+            read_size = 65536
+            if self.read_kbps:
+                # 느린 client: 수신 버퍼도 작게 (커널 버퍼가 몇 MB씩 받아 주면 서버가 느린 걸 모름)
+                conn.connect()
+                conn.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 32768)
+                read_size = 4096
+            conn.request('GET', self.video_path)
+            resp = conn.getresponse()
+            tail = b''
+            while not self.stop.is_set():
+                chunk = resp.read1(read_size)
+                if not chunk:
+                    stream["error"] = 'closed'
+                    break
+                data = tail + chunk
+                frames = data.count(marker)
+                if frames and stream["first_frame_ms"] is None:
+                    stream["first_frame_ms"] = round((time.perf_counter() - start) * 1000, 1)
+                stream["frames"] += frames
+                stream["bytes"] += len(chunk)
+                stream["seconds"] = time.perf_counter() - start
+                tail = data[-(len(marker) - 1):]
+                if self.read_kbps:
+                    # 지금까지 받은 양이 read_kbps 속도를 넘으면 그만큼 쉼
+                    ahead = stream["bytes"] * 8 / 1000 / self.read_kbps - stream["seconds"]
+                    if ahead > 0:
+                        self.stop.wait(ahead)
+        except (OSError, http.client.HTTPException) as e:
+            stream["error"] = type(e).__name__
+        finally:
+            stream["seconds"] = time.perf_counter() - start
+            conn.close()
+
+    def threads(self):
+        targets = [(self._periodic, (self.poll_path, self.poll_interval)),
+                   (self._periodic, ('/health', HEALTH_INTERVAL)),
+                   (self._buttons, ())]
+        if self.video:
+            targets.append((self._video, ()))
+        return [threading.Thread(target=t, args=a, daemon=True) for t, a in targets]
+
+
+class InferClient:
+    """외부 시스템 한 대: 응답을 받자마자 같은 이미지를 /infer로 다시 보냄 (닫힌 루프)"""
+
+    def __init__(self, index, base_url, recorder, stop, image):
+        url = urlparse(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.recorder = recorder
+        self.stop = stop
+        self.image = image
+
+    def _loop(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=CLIENT_TIMEOUT)
+        while not self.stop.is_set():
+            start = time.perf_counter()
+            try:
+                conn.request('POST', '/infer', body=self.image, headers={'Content-Type': 'image/jpeg'})
+                resp = conn.getresponse()
+                resp.read()
+                self.recorder.record('/infer', (time.perf_counter() - start) * 1000, resp.status)
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                self.recorder.record('/infer', *_failure(e, start))
+                self.stop.wait(0.5)
+        conn.close()
+
+    def threads(self):
+        return [threading.Thread(target=self._loop, daemon=True)]
+
+
+def resized_jpegs(image, count):
+    """같은 JPEG을 서로 다른 크기 count장으로 (외부 시스템마다 카메라 해상도 / 비율이 다른 경우)"""
+    import cv2
+    import numpy as np
+
+    frame = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR)
+    ratios = [(16, 9), (4, 3), (3, 2)]    # 흔한 가로 사진 비율
+    images = []
+    for i in range(count):
+        rw, rh = ratios[i % len(ratios)]
+        width = 640 + 160 * i             # 해상도도 모두 다름
+        ok, data = cv2.imencode('.jpg', cv2.resize(frame, (width, width * rh // rw)))
+        images.append(data.tobytes())
+    return images
+
+
+def fetch_jpeg(base_url, timeout=10.0):
+    """/video_feed에서 JPEG 한 장 (/infer 부하용 이미지)"""
+    url = urlparse(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+    try:
+        conn.request('GET', '/video_feed')
+        resp = conn.getresponse()
+        data = b''
+        while True:
+            chunk = resp.read1(65536)
+            if not chunk:
+                return None
+            data += chunk
+            start = data.find(b'\xff\xd8')
+            end = data.find(b'\xff\xd9', start + 2) if start >= 0 else -1
+            if end >= 0:
+                return data[start:end + 2]
+    finally:
+        conn.close()
+
+
+# ===== 서버 자원 측정 =====
+
+class ProcessSampler:
+    """서버 프로세스 CPU% / RSS를 1초마다 샘플 (psutil이 없으면 /proc)"""
+
+    def __init__(self, pid, interval=1.0):
+        self.pid = pid
+        self.interval = interval
+        self.cpu = []
+        self.rss_mb = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        try:
+            import psutil
+            self._proc = psutil.Process(pid)
+        except ImportError:
+            self._proc = None
+
+    def _times(self):
+        if self._proc is not None:
+            t = self._proc.cpu_times()
+            return t.user + t.system, self._proc.memory_info().rss / 1e6
+        with open(f'/proc/{self.pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open(f'/proc/{self.pid}/statm') as f:
+            rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+        ticks = os.sysconf('SC_CLK_TCK')
+        return (int(fields[11]) + int(fields[12])) / ticks, rss
+
+    def _loop(self):
+        try:
+            last_cpu, _ = self._times()
+            last = time.perf_counter()
+            while not self._stop.wait(self.interval):
+                cpu, rss = self._times()
+                now = time.perf_counter()
+                self.cpu.append((cpu - last_cpu) / (now - last) * 100)
+                self.rss_mb.append(rss)
+                last_cpu, last = cpu, now
+        except (OSError, ValueError, IndexError):
+            pass
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        return {
+            "cpu_percent_avg": _round(sum(self.cpu) / len(self.cpu)) if self.cpu else None,
+            "cpu_percent_max": _round(max(self.cpu)) if self.cpu else None,
+            "rss_mb_start": _round(self.rss_mb[0]) if self.rss_mb else None,
+            "rss_mb_max": _round(max(self.rss_mb)) if self.rss_mb else None,
+        }
+
+
+# ===== 실행 =====
+
+def spawn_server(port, serve_mode='flask', source='replay:synthetic', stub_ms=20.0, log_path=None, extra_env=None,
+                 model=None):
+    """replay 영상 + 가짜 모델로 스트리밍 서버 실행 (model을 주면 그 가중치로)"""
+    env = {**os.environ, 'PORT': str(port), 'SERVE_MODE': serve_mode, 'CAMERA_SOURCE': source,
+           'MODEL_PATH': model or f'stub:{stub_ms}', 'HEADLESS': '1', 'PYTHONUNBUFFERED': '1', **(extra_env or {})}
+    log = open(log_path or os.devnull, 'w')
+    return subprocess.Popen([sys.executable, str(STREAMING_SERVER)], env=env, cwd=str(PROJECT_DIR),
+                            stdout=log, stderr=subprocess.STDOUT)
+
+
+def measure_startup(port, serve_mode='flask', source='replay:synthetic', model=None, stub_ms=20.0, timeout=120.0):
+    """서버 실행부터 포트 열림 / /health 200 / 첫 추론까지 걸린 시간(ms)"""
+    base_url = f'http://127.0.0.1:{port}'
+    start = time.perf_counter()
+    server = spawn_server(port, serve_mode, source, stub_ms, model=model)
+    result = {"port_open_ms": None, "ready_ms": None, "first_inference_ms": None, "startup_ms": None}
+    try:
+        while time.perf_counter() - start < timeout and result["first_inference_ms"] is None:
+            url = urlparse(base_url)
+            try:
+                conn = http.client.HTTPConnection(url.hostname, url.port, timeout=2)
+                conn.request('GET', '/health')
+                resp = conn.getresponse()
+                health = json.loads(resp.read())
+            except (OSError, ValueError, http.client.HTTPException):
+                time.sleep(0.02)
+                continue
+            ms = round((time.perf_counter() - start) * 1000)
+            result["port_open_ms"] = result["port_open_ms"] or ms
+            if resp.status == 200:
+                result["ready_ms"] = result["ready_ms"] or ms
+                result["startup_ms"] = health.get('startup_ms')
+                # 서버가 첫 추론을 기록한 것을 처음 본 시각 (다른 값들과 같은 기준)
+                if 'first_inference' in health.get('since_start_ms', {}):
+                    result["first_inference_ms"] = ms
+            if server.poll() is not None:
+                break
+            time.sleep(0.02)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return result
+
+
+def wait_ready(base_url, timeout=60.0):
+    url = urlparse(base_url)
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=2)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return True
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def fetch_json(base_url, path):
+    url = urlparse(base_url)
+    try:
+        conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=CLIENT_TIMEOUT)
+        conn.request('GET', path)
+        return json.loads(conn.getresponse().read())
+    except (OSError, ValueError, http.client.HTTPException):
+        return None
+
+
+def run_load(base_url, users, duration, ramp=5.0, video=True, button_interval=BUTTON_INTERVAL,
+             server_pid=None, seed=0, infer_clients=0, infer_images=None,
+             poll_path='/get_latest_message', poll_interval=POLL_INTERVAL, video_path='/video_feed',
+             slow_viewers=0, slow_kbps=1000):
+    recorder = Recorder()
+    stop = threading.Event()
+    sampler = ProcessSampler(server_pid).start() if server_pid else None
+
+    tablets = []
+    start = time.perf_counter()
+    for i in range(users):
+        tablet = Tablet(i, base_url, recorder, stop, video, button_interval, seed, poll_path, poll_interval,
+                        video_path, slow_kbps if i < slow_viewers else None)
+        for t in tablet.threads():
+            t.start()
+        tablets.append(tablet)
+        # 한꺼번에 접속하지 않도록 ramp 동안 나눠서
+        if ramp and users > 1:
+            time.sleep(ramp / users)
+    # 외부 시스템 /infer 클라이언트
+    for i in range(infer_clients if infer_images else 0):
+        for t in InferClient(i, base_url, recorder, stop, infer_images[i % len(infer_images)]).threads():
+            t.start()
+    print(f"👥 {users}대 접속 완료 ({time.perf_counter() - start:.1f}초), {duration}초 측정...")
+
+    time.sleep(duration)
+    elapsed = time.perf_counter() - start
+    # client가 연결돼 있을 때의 서버 상태 (stream_clients의 pacing 값)
+    status = fetch_json(base_url, '/status')
+    stop.set()
+    time.sleep(0.5)
+
+    streams = [t.stream for t in tablets] if video else []
+    fps = [s["frames"] / s["seconds"] for s in streams if s["seconds"]]
+    report = {
+        "users": users,
+        "duration_s": round(elapsed, 1),
+        "endpoints": recorder.summary(elapsed),
+        "video": {
+            "path": video_path,
+            "clients": len(streams),
+            # 끝까지 열려 있던 연결 (프레임을 받았고 오류 없이 측정 종료)
+            "held": sum(1 for s in streams if s["frames"] and not s["error"]),
+            "fps_min": _round(min(fps)) if fps else None,
+            "fps_p50": _round(percentile(fps, 0.5)) if fps else None,
+            "fps_mean": _round(sum(fps) / len(fps)) if fps else None,
+            "first_frame_ms_p90": _round(percentile([s["first_frame_ms"] for s in streams
+                                                      if s["first_frame_ms"] is not None], 0.9)),
+            "mbit_per_s": _round(sum(s["bytes"] for s in streams) * 8 / 1e6 / elapsed, 2),
+            "errors": sum(1 for s in streams if s["error"] and s["error"] != 'closed'),
+            "kbit_per_viewer": _round(sum(s["bytes"] * 8 / 1000 / s["seconds"] for s in streams if s["seconds"])
+                                      / max(1, sum(1 for s in streams if s["seconds"]))),
+            # 보통 viewer / 느린 viewer 각각 한 명당 평균
+            "normal": _viewer_group([s for s in streams if not s["slow"]]),
+            "slow": _viewer_group([s for s in streams if s["slow"]]),
+            "per_client": [{**s, "fps": _round(s["frames"] / s["seconds"]) if s["seconds"] else None,
+                            "seconds": _round(s["seconds"])} for s in streams],
+        },
+        "server": sampler.stop() if sampler else None,
+        "server_status": status,
+    }
+    return report
+
+
+def print_report(report):
+    print(f"\n📊 {report['users']}대 / {report['duration_s']}초")
+    print(f"{'endpoint':<24}{'req':>7}{'rps':>7}{'err':>6}{'p50':>8}{'p90':>8}{'p99':>8}{'max':>8}")
+    for endpoint, r in report['endpoints'].items():
+        cells = [r[k] if r[k] is not None else '-' for k in ('p50_ms', 'p90_ms', 'p99_ms', 'max_ms')]
+        print(f"{endpoint:<24}{r['requests']:>7}{r['rps']:>7}{r['errors']:>6}" + ''.join(f"{c:>8}" for c in cells))
+    v = report['video']
+    if v['clients']:
+        print(f"\n📺 {v['path']} {v['clients']}개 (유지 {v['held']}): "
+              f"fps min={v['fps_min']} p50={v['fps_p50']} mean={v['fps_mean']}, "
+              f"첫 프레임 p90={v['first_frame_ms_p90']}ms, {v['mbit_per_s']} Mbit/s, 오류 {v['errors']}")
+        print(f"   viewer당 {v['kbit_per_viewer']} kbit/s")
+        if v['slow']:
+            for group in ('normal', 'slow'):
+                g = v[group]
+                if g:
+                    print(f"   {group}: {g['clients']}개, viewer당 fps {g['fps_mean']}, {g['kbit_per_s']} kbit/s")
+        pacing = (report['server_status'] or {}).get('stream_clients')
+        if pacing and pacing['clients']:
+            levels = sorted(c['level'] for c in pacing['clients'])
+            print(f"   서버 pacing: level {levels}, lag 최대 {pacing['max_lag_ms']}ms (한도 {pacing['lag_limit_ms']}ms)")
+    s = report['server']
+    if s:
+        print(f"\n🖥️  서버 CPU avg={s['cpu_percent_avg']}% max={s['cpu_percent_max']}%, "
+              f"RSS {s['rss_mb_start']} -> {s['rss_mb_max']} MB")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='대시보드 태블릿 부하 테스트')
+    parser.add_argument('--users', type=int, nargs='+', default=[5], help='동시 태블릿 수 (여러 개면 차례로)')
+    parser.add_argument('--duration', type=float, default=60.0)
+    parser.add_argument('--ramp', type=float, default=5.0, help='접속을 나눠서 여는 시간(초)')
+    parser.add_argument('--button-interval', type=float, default=BUTTON_INTERVAL)
+    parser.add_argument('--poll-path', default='/get_latest_message', help='태블릿이 주기적으로 부르는 경로')
+    parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL)
+    parser.add_argument('--no-video', action='store_true', help='/video_feed 없이')
+    parser.add_argument('--video-path', default='/video_feed', choices=list(STREAM_MARKERS),
+                        help='태블릿이 여는 스트림 (MJPEG 또는 H.264)')
+    parser.add_argument('--slow-viewers', type=int, default=0, help='느리게 읽는 태블릿 수 (앞에서부터)')
+    parser.add_argument('--slow-kbps', type=float, default=1000, help='느린 태블릿의 수신 속도 (kbit/s)')
+    parser.add_argument('--url', default=None, help='이미 실행 중인 서버 (없으면 직접 실행)')
+    parser.add_argument('--server-pid', type=int, default=None, help='--url 서버의 PID (CPU/RSS 측정)')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--serve-mode', default='flask', choices=['flask', 'asgi'])
+    parser.add_argument('--source', default='replay:synthetic', help='CAMERA_SOURCE (replay:영상/폴더)')
+    parser.add_argument('--stub-ms', type=float, default=20.0, help='가짜 모델 추론 시간')
+    parser.add_argument('--model', default=None, help='가짜 모델 대신 쓸 가중치 (직접 실행한 서버의 MODEL_PATH)')
+    parser.add_argument('--startup', type=int, default=0, metavar='N',
+                        help='부하 대신 서버를 N번 실행해서 시작 시간만 측정')
+    parser.add_argument('--infer-clients', type=int, default=0, help='/infer를 연속 호출하는 외부 클라이언트 수')
+    parser.add_argument('--infer-image', default=None, help='/infer에 보낼 JPEG (기본: /video_feed 한 장)')
+    parser.add_argument('--infer-mixed', action='store_true',
+                        help='/infer 클라이언트마다 크기가 다른 이미지 (외부 스틸 이미지처럼)')
+    parser.add_argument('--max-batch', type=int, default=None,
+                        help='직접 실행한 서버의 INFER_MAX_BATCH (1이면 요청마다 따로 추론)')
+    parser.add_argument('--json', default=None, help='결과 저장 경로')
+    parser.add_argument('--seed', type=int, default=0)
+    opt = parser.parse_args(argv)
+
+    if opt.startup:
+        runs = []
+        for i in range(opt.startup):
+            runs.append(measure_startup(opt.port, opt.serve_mode, opt.source, opt.model, opt.stub_ms))
+            print(f"⏱️  {i + 1}/{opt.startup}: {runs[-1]}")
+        summary = {key: percentile([r[key] for r in runs if r[key] is not None], 0.5)
+                   for key in ('port_open_ms', 'ready_ms', 'first_inference_ms')}
+        print(f"\n📊 시작 시간 중앙값(ms): {summary}")
+        if opt.json:
+            with open(opt.json, 'w') as f:
+                json.dump({"runs": runs, "median": summary}, f, indent=2, ensure_ascii=False)
+        return 0
+
+    server = None
+    base_url = opt.url
+    pid = opt.server_pid
+    if base_url is None:
+        base_url = f'http://127.0.0.1:{opt.port}'
+        extra_env = {'INFER_MAX_BATCH': str(opt.max_batch)} if opt.max_batch else None
+        server = spawn_server(opt.port, opt.serve_mode, opt.source, opt.stub_ms,
+                              log_path=PROJECT_DIR / 'load_test_server.log', extra_env=extra_env, model=opt.model)
+        pid = server.pid
+        print(f"🚀 서버 실행 (pid={pid}, {opt.serve_mode}, {opt.source}, {opt.model or f'stub {opt.stub_ms}ms'})")
+
+    try:
+        if not wait_ready(base_url):
+            print("❌ 서버가 준비되지 않았습니다 (load_test_server.log 확인)")
+            return 1
+        infer_images = None
+        if opt.infer_clients:
+            if opt.infer_image:
+                with open(opt.infer_image, 'rb') as f:
+                    infer_image = f.read()
+            else:
+                infer_image = fetch_jpeg(base_url)
+            if not infer_image:
+                print("❌ /infer에 보낼 이미지가 없습니다 (--infer-image)")
+                return 1
+            infer_images = resized_jpegs(infer_image, opt.infer_clients) if opt.infer_mixed else [infer_image]
+        reports = []
+        for users in opt.users:
+            report = run_load(base_url, users, opt.duration, opt.ramp, not opt.no_video,
+                              opt.button_interval, pid, opt.seed, opt.infer_clients, infer_images,
+                              opt.poll_path, opt.poll_interval, opt.video_path, opt.slow_viewers, opt.slow_kbps)
+            print_report(report)
+            reports.append(report)
+        if opt.json:
+            with open(opt.json, 'w') as f:
+                json.dump(reports, f, indent=2, ensure_ascii=False)
+            print(f"\n💾 {opt.json}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
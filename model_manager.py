@@ -0,0 +1,477 @@
+import hmac
+import os
+import queue
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+from inference_worker import Detections
+from preprocess import direct_predictor
+from tracing import span
+
+# /admin/model 인증 토큰 (Authorization: Bearer <토큰> 또는 X-Admin-Token) - 없으면 관리자 엔드포인트 사용 불가
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+# /admin/model/reload로 로드할 수 있는 가중치 위치 (torch.load는 임의 코드를 실행할 수 있음)
+RELOAD_ROOT = Path(os.environ.get('MODEL_RELOAD_ROOT') or Path(__file__).resolve().parent / 'runs')
+
+
+def load_yolo(model_path):
+    """기본 로더 (ultralytics는 필요할 때 import, 'stub:<ms>'는 부하 테스트용 가짜 모델)
+
+    MODEL_BACKEND=fused|onnx|openvino|torchscript 이면 .pt 대신 파생 모델 캐시에서 로드
+    (없거나 가중치/버전이 바뀌었으면 그때 한 번 빌드, artifact_cache.py)
+    """
+    if str(model_path).startswith('stub'):
+        from stub_model import StubModel
+        return StubModel.from_spec(model_path)
+    backend = os.environ.get('MODEL_BACKEND', 'pt')
+    if backend != 'pt' and str(model_path).endswith('.pt'):
+        from artifact_cache import load_cached
+        return load_cached(model_path, backend, int(os.environ.get('MODEL_IMGSZ', 640)))
+    from ultralytics import YOLO
+    return YOLO(model_path)
+
+
+def cascade_paths(model_path):
+    """(실시간, 온디맨드) 가중치 - REALTIME_MODEL_PATH / ONDEMAND_MODEL_PATH, 없으면 둘 다 model_path"""
+    return (os.environ.get('REALTIME_MODEL_PATH') or model_path,
+            os.environ.get('ONDEMAND_MODEL_PATH') or model_path)
+
+
+def select_manager(managers, name=None):
+    """get_manager() 결과 (ModelManager 또는 {이름: ModelManager}) -> name 모델 (없으면 첫 번째)"""
+    if not isinstance(managers, dict):
+        return managers
+    return managers.get(name) if name else next(iter(managers.values()), None)
+
+
+def box_arrays(results):
+    """ultralytics 결과 -> (cls[N], conf[N], xyxy[N,4]) numpy"""
+    if not results:
+        return np.zeros(0, int), np.zeros(0, np.float32), np.zeros((0, 4), np.float32)
+    boxes = results[0].boxes
+    return (boxes.cls.cpu().numpy().astype(int),
+            boxes.conf.cpu().numpy(),
+            boxes.xyxy.cpu().numpy())
+
+
+def box_iou(a, b):
+    """xyxy 박스 IoU 행렬 [len(a), len(b)]"""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def detection_agreement(live, candidate, iou_threshold=0.5):
+    """두 모델 결과 일치도 (같은 클래스 + IoU 기준 F1, 둘 다 없으면 1.0)"""
+    live_cls, _, live_xyxy = live
+    cand_cls, _, cand_xyxy = candidate
+    if len(live_cls) == 0 and len(cand_cls) == 0:
+        return 1.0
+    if len(live_cls) == 0 or len(cand_cls) == 0:
+        return 0.0
+    iou = box_iou(live_xyxy, cand_xyxy)
+    iou[live_cls[:, None] != cand_cls[None, :]] = 0
+    matched = 0
+    used = set()
+    for i in np.argsort(-iou.max(axis=1)):
+        j = int(iou[i].argmax())
+        if iou[i, j] >= iou_threshold and j not in used:
+            used.add(j)
+            matched += 1
+    return 2 * matched / (len(live_cls) + len(cand_cls))
+
+
+class ShadowStats:
+    """섀도 모드 통계 (일치도, 지연시간)"""
+
+    def __init__(self):
+        self.samples = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self.agreement_sum = 0.0
+        self.live_ms = deque(maxlen=200)
+        self.candidate_ms = deque(maxlen=200)
+
+    def to_dict(self):
+        def median(values):
+            return round(float(np.median(values)), 2) if values else None
+
+        return {
+            "samples": self.samples,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "agreement": round(self.agreement_sum / self.samples, 4) if self.samples else None,
+            "live_ms_median": median(list(self.live_ms)),
+            "candidate_ms_median": median(list(self.candidate_ms)),
+        }
+
+
+class ModelManager:
+    """실행 중인 서버의 모델 hot-swap
+
+    - 새 가중치는 백그라운드 스레드에서 로드하고 최근 프레임으로 warm-up
+    - 교체는 참조 하나를 바꾸는 것뿐이라 진행 중인 추론은 이전 모델로 끝나고
+      다음 추론부터 새 모델을 사용 (캡처/스트리밍은 멈추지 않음)
+    - 섀도 모드: 후보 모델을 일부 프레임에만 따로 돌려 현재 모델과 비교
+    """
+
+    def __init__(self, model_path, loader=load_yolo, warmup_frames=4):
+        self.loader = loader
+        self._model = loader(model_path)
+        self.model_path = model_path
+        self.version = 1
+        self.recent_frames = deque(maxlen=warmup_frames)
+        # 모델별 자체 전처리 경로 (교체된 모델은 참조가 사라지면 같이 정리됨)
+        self._direct = weakref.WeakKeyDictionary()
+
+        self._reload_lock = threading.Lock()
+        self.reload_state = {"state": "idle", "path": None, "error": None}
+
+        # 섀도 모드
+        self.shadow = None
+        self.shadow_path = None
+        self.shadow_rate = 0.0
+        self.shadow_stats = ShadowStats()
+        self._shadow_queue = queue.Queue(maxsize=2)
+        self._shadow_thread = None
+
+        # 파일 감시
+        self._watch_thread = None
+        self.watch_errors = 0
+
+    # ===== 추론 =====
+
+    @property
+    def model(self):
+        return self._model
+
+    @property
+    def names(self):
+        return self._model.names
+
+    def predict(self, frame, **kwargs):
+        """현재 모델로 추론 (교체 중에도 참조를 한 번만 읽어서 일관됨)
+
+        frame은 한 장 또는 프레임 리스트 (배치)
+        """
+        kwargs.setdefault('verbose', False)
+        model = self._model
+        frames = frame if isinstance(frame, list) else [frame]
+        start = time.perf_counter()
+        with span('inference', 'model', batch=len(frames), version=self.version):
+            results = model(frame, **kwargs)
+        live_ms = (time.perf_counter() - start) * 1000
+
+        self._observe(frames, lambda k: box_arrays(results[k:k + 1]), live_ms, kwargs)
+        return results
+
+    def detect(self, frame, **kwargs):
+        """현재 모델로 추론 -> [Detections]
+
+        PyTorch 모델이면 자체 전처리 경로 (preprocess.DirectPredictor),
+        아니면 ultralytics predictor 결과를 변환
+        """
+        kwargs.setdefault('verbose', False)
+        model = self._model
+        direct = self._direct_for(model)
+        if direct is None:
+            results = self.predict(frame, **kwargs)
+            with span('postprocess', 'model', batch=len(results)):
+                return [Detections.from_result(result) for result in results]
+
+        frames = frame if isinstance(frame, list) else [frame]
+        start = time.perf_counter()
+        with span('inference', 'model', batch=len(frames), version=self.version):
+            detections = direct(frames, **kwargs)
+        live_ms = (time.perf_counter() - start) * 1000
+
+        self._observe(frames, lambda k: (detections[k].cls, detections[k].conf, detections[k].xyxy),
+                      live_ms, kwargs)
+        return detections
+
+    def _direct_for(self, model):
+        if model not in self._direct:
+            self._direct[model] = direct_predictor(model)
+        return self._direct[model]
+
+    def preprocess_stats(self):
+        direct = self._direct_for(self._model)
+        return direct.stats() if direct is not None else {"path": "ultralytics"}
+
+    def _observe(self, frames, live_boxes, live_ms, kwargs):
+        """warm-up용 최근 프레임 + 섀도 샘플 (live_boxes(k) -> k번째 프레임의 현재 모델 결과)"""
+        self.recent_frames.append(frames[-1])
+
+        if self.shadow is not None and random.random() < self.shadow_rate:
+            k = random.randrange(len(frames))
+            try:
+                # 프레임 버퍼는 캡처 쪽에서 재사용되므로 샘플만 복사
+                self._shadow_queue.put_nowait((frames[k].copy(), live_boxes(k), live_ms / len(frames), kwargs))
+            except queue.Full:
+                # 섀도가 밀리면 라이브 경로를 기다리게 하지 않고 버림
+                self.shadow_stats.dropped += 1
+
+    # ===== 교체 =====
+
+    def _load_candidate(self, path, force=False):
+        """로드 + 클래스 확인 + warm-up"""
+        self.reload_state = {"state": "loading", "path": path, "error": None}
+        start = time.perf_counter()
+        candidate = self.loader(path)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        if not force and dict(candidate.names) != dict(self._model.names):
+            raise ValueError(f"클래스가 다릅니다: {candidate.names} != {self._model.names}")
+
+        self.reload_state["state"] = "warming"
+        warmup_ms = self._warmup(candidate)
+        return candidate, round(load_ms, 1), warmup_ms
+
+    def _warmup(self, model, frame_shape=(720, 1280, 3)):
+        """최근 프레임(없으면 빈 프레임)으로 첫 추론 비용을 미리 치름 -> 걸린 시간(ms)"""
+        start = time.perf_counter()
+        frames = list(self.recent_frames) or [np.zeros(frame_shape, np.uint8)]
+        direct = self._direct_for(model)
+        for frame in frames:
+            model(frame, verbose=False)
+            if direct is not None:
+                # 전처리 버퍼 할당도 미리
+                direct([frame])
+        return round((time.perf_counter() - start) * 1000, 1)
+
+    def warmup(self, frame_shape=(720, 1280, 3)):
+        """현재 모델 warm-up (서버 시작 시)"""
+        return self._warmup(self._model, frame_shape)
+
+    def reload(self, path=None, shadow=False, sample_rate=0.1, force=False, wait=False):
+        """새 가중치를 백그라운드로 로드 (shadow=True면 교체하지 않고 섀도로 비교)"""
+        path = path or self.model_path
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        if not self._reload_lock.acquire(blocking=False):
+            raise RuntimeError("이미 모델을 로드하는 중입니다")
+
+        def worker():
+            try:
+                candidate, load_ms, warmup_ms = self._load_candidate(path, force)
+                if shadow:
+                    self.start_shadow(candidate, path, sample_rate)
+                    state = "shadow"
+                else:
+                    self._swap(candidate, path)
+                    state = "ready"
+                self.reload_state = {"state": state, "path": path, "error": None,
+                                     "load_ms": load_ms, "warmup_ms": warmup_ms}
+                print(f"🔄 모델 {'섀도 시작' if shadow else '교체 완료'}: {path} "
+                      f"(로드 {load_ms}ms, warm-up {warmup_ms}ms)")
+            except Exception as e:
+                self.reload_state = {"state": "failed", "path": path, "error": str(e)}
+                print(f"❌ 모델 로드 실패: {e}")
+            finally:
+                self._reload_lock.release()
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        if wait:
+            thread.join()
+        return self.reload_state
+
+    def _swap(self, candidate, path):
+        # 참조 대입은 원자적 - 다음 predict()부터 새 모델 사용
+        self._model = candidate
+        self.model_path = path
+        self.version += 1
+
+    def promote(self):
+        """섀도 모델을 라이브로 승격"""
+        candidate, path = self.shadow, self.shadow_path
+        if candidate is None:
+            return False
+        self.stop_shadow()
+        self._swap(candidate, path)
+        self.reload_state = {"state": "ready", "path": path, "error": None}
+        print(f"⬆️  섀도 모델 승격: {path}")
+        return True
+
+    # ===== 섀도 모드 =====
+
+    def start_shadow(self, candidate, path, sample_rate=0.1):
+        self.shadow_stats = ShadowStats()
+        self.shadow_rate = max(0.0, min(1.0, sample_rate))
+        self.shadow_path = path
+        self.shadow = candidate
+        if self._shadow_thread is None or not self._shadow_thread.is_alive():
+            self._shadow_thread = threading.Thread(target=self._shadow_loop, daemon=True)
+            self._shadow_thread.start()
+
+    def stop_shadow(self):
+        self.shadow = None
+        self.shadow_path = None
+        self.shadow_rate = 0.0
+
+    def _shadow_loop(self):
+        while True:
+            frame, live, live_ms, kwargs = self._shadow_queue.get()
+            candidate = self.shadow
+            if candidate is None:
+                continue
+            stats = self.shadow_stats
+            try:
+                start = time.perf_counter()
+                results = candidate(frame, **kwargs)
+                cand_ms = (time.perf_counter() - start) * 1000
+                agreement = detection_agreement(live, box_arrays(results))
+            except Exception as e:
+                # 후보 모델이 실패해도 섀도 스레드는 계속 (라이브에는 영향 없음)
+                stats.errors += 1
+                stats.last_error = f"{type(e).__name__}: {e}"
+                print(f"⚠️  섀도 추론 실패: {stats.last_error}")
+                continue
+
+            stats.samples += 1
+            stats.agreement_sum += agreement
+            stats.live_ms.append(live_ms)
+            stats.candidate_ms.append(cand_ms)
+
+    # ===== 파일 감시 =====
+
+    def watch(self, path=None, interval=5.0):
+        """가중치 파일이 바뀌면 자동으로 reload"""
+        path = path or self.model_path
+
+        def loop():
+            last = os.stat(path).st_mtime_ns if os.path.exists(path) else None
+            while True:
+                time.sleep(interval)
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue
+                if mtime == last:
+                    continue
+                try:
+                    # 학습이 파일을 쓰는 중일 수 있으니 한 주기 더 기다림
+                    time.sleep(interval)
+                    last = os.stat(path).st_mtime_ns
+                    print(f"👀 가중치 변경 감지: {path}")
+                    self.reload(path)
+                except Exception as e:
+                    # 파일이 사라짐 / 이미 로드 중 등 - 감시는 계속
+                    self.watch_errors += 1
+                    print(f"⚠️  가중치 감시: {e}")
+
+        self._watch_thread = threading.Thread(target=loop, daemon=True)
+        self._watch_thread.start()
+
+    def status(self):
+        return {
+            "model_path": self.model_path,
+            "version": self.version,
+            "reload": self.reload_state,
+            "shadow": None if self.shadow is None else {
+                "path": self.shadow_path,
+                "sample_rate": self.shadow_rate,
+                **self.shadow_stats.to_dict(),
+            },
+            "watching": self._watch_thread is not None,
+            "watch_errors": self.watch_errors,
+        }
+
+
+# ===== 관리자 인증 =====
+
+def admin_authorized(headers):
+    """요청 헤더의 토큰이 ADMIN_TOKEN과 같은지 (ADMIN_TOKEN이 없으면 항상 False)"""
+    if not ADMIN_TOKEN:
+        return False
+    auth = headers.get('Authorization', '')
+    token = auth[7:] if auth.startswith('Bearer ') else headers.get('X-Admin-Token', '')
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+def check_reload_path(path):
+    """reload 요청 경로가 RELOAD_ROOT 아래인지 (아니면 PermissionError) - None은 현재 경로 재로드"""
+    if path is None:
+        return None
+    resolved = Path(path).resolve()
+    if RELOAD_ROOT.resolve() not in resolved.parents:
+        raise PermissionError(f"{RELOAD_ROOT} 아래의 가중치만 로드할 수 있습니다")
+    return str(resolved)
+
+
+ADMIN_DENIED = "관리자 토큰이 필요합니다 (ADMIN_TOKEN)"
+
+
+# ===== Flask 관리자 엔드포인트 =====
+
+def register_admin_routes(app, get_manager):
+    """/admin/model 엔드포인트 등록 (get_manager: 현재 ModelManager 또는 {이름: ModelManager})
+
+    모델이 여러 개면 ?model=ondemand 처럼 고름 (기본은 첫 번째)
+    get_manager()가 None이면 (시작 중 / 브로커 모드) 404, 토큰이 틀리면 401
+    """
+    from functools import wraps
+
+    from flask import jsonify, request
+
+    def manager():
+        return select_manager(get_manager(), request.args.get('model'))
+
+    def requires_manager(view):
+        @wraps(view)
+        def wrapper():
+            if not admin_authorized(request.headers):
+                return jsonify({"success": False, "message": ADMIN_DENIED}), 401
+            if manager() is None:
+                return jsonify({"success": False, "message": "모델을 사용할 수 없습니다 (시작 중이거나 브로커 모드)"}), 404
+            return view()
+        return wrapper
+
+    @app.route('/admin/model', methods=['GET'])
+    @requires_manager
+    def admin_model_status():
+        """모델 / reload / 섀도 상태"""
+        return jsonify(manager().status()), 200
+
+    @app.route('/admin/model/reload', methods=['POST'])
+    @requires_manager
+    def admin_model_reload():
+        """새 가중치 로드 {"path": ..., "shadow": false, "sample_rate": 0.1, "force": false}"""
+        body = request.get_json(silent=True) or {}
+        try:
+            state = manager().reload(check_reload_path(body.get('path')), shadow=bool(body.get('shadow')),
+                                         sample_rate=float(body.get('sample_rate', 0.1)),
+                                         force=bool(body.get('force')))
+        except PermissionError as e:
+            return jsonify({"success": False, "message": str(e)}), 403
+        except FileNotFoundError as e:
+            return jsonify({"success": False, "message": f"파일 없음: {e}"}), 404
+        except RuntimeError as e:
+            return jsonify({"success": False, "message": str(e)}), 409
+        return jsonify({"success": True, "reload": state}), 202
+
+    @app.route('/admin/model/promote', methods=['POST'])
+    @requires_manager
+    def admin_model_promote():
+        """섀도 모델을 라이브로 승격"""
+        if not manager().promote():
+            return jsonify({"success": False, "message": "섀도 모델 없음"}), 400
+        return jsonify({"success": True, **manager().status()}), 200
+
+    @app.route('/admin/model/shadow', methods=['DELETE'])
+    @requires_manager
+    def admin_model_stop_shadow():
+        """섀도 모드 종료"""
+        manager().stop_shadow()
+        return jsonify({"success": True}), 200
@@ -0,0 +1,375 @@
+import math
+import os
+import platform
+import time
+from collections import OrderedDict, deque
+
+import cv2
+import numpy as np
+
+from inference_worker import Detections
+from tracing import span
+
+PAD_VALUE = 114                       # ultralytics LetterBox 패딩 색
+SCALE = np.float32(1 / 255)
+# DIRECT_PREPROCESS=0 이면 ultralytics predictor 경로 그대로 사용
+USE_DIRECT = os.environ.get('DIRECT_PREPROCESS', '1') != '0'
+# 프레임 크기별 Preprocessor를 몇 개까지 들고 있을지 (LRU, 외부 이미지 크기가 제각각이어도 메모리 상한)
+CACHE_SIZE = int(os.environ.get('PREPROCESS_CACHE', 4))
+
+
+def letterbox_geometry(shape, imgsz, stride=32):
+    """ultralytics LetterBox(auto=True, center=True)와 같은 규칙
+
+    -> (r, (new_h, new_w), (top, left), (out_h, out_w))
+    긴 변을 imgsz로 맞추고 짧은 변은 stride 배수까지만 패딩 (정사각형으로 채우지 않음)
+    """
+    h, w = shape[:2]
+    r = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * r)), int(round(h * r))
+    dw, dh = (imgsz - new_w) % stride / 2, (imgsz - new_h) % stride / 2
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    return r, (new_h, new_w), (top, left), (new_h + top + bottom, new_w + left + right)
+
+
+def _write_chw(src, region):
+    """BGR HWC uint8 -> RGB CHW float /255 를 region(텐서 메모리)에 바로 씀"""
+    for c in range(3):
+        np.multiply(src[:, :, 2 - c], SCALE, out=region[c], dtype=np.float32)
+
+
+class Preprocessor:
+    """프레임 -> 모델 입력 텐서 (한 가지 프레임 크기 / imgsz 전용, 버퍼 재사용)
+
+    - 리사이즈는 미리 잡아 둔 uint8 버퍼에 (cv2.resize dst=)
+    - BGR->RGB, HWC->CHW, /255 는 채널마다 np.multiply(out=)로 텐서 메모리에 바로 씀
+    - 패딩 영역은 할당할 때 한 번만 채우고 이후로는 건드리지 않음
+    그래서 정상 상태에서는 프레임마다 새 배열/텐서를 만들지 않는다.
+    """
+
+    def __init__(self, frame_shape, imgsz=640, stride=32, max_batch=8, device=None, dtype=None):
+        import torch
+
+        self.frame_shape = tuple(frame_shape[:2])
+        self.r, (self.new_h, self.new_w), (self.top, self.left), self.out_shape = \
+            letterbox_geometry(frame_shape, imgsz, stride)
+        self.resize = (self.new_h, self.new_w) != self.frame_shape
+        self.resized = np.empty((self.new_h, self.new_w, 3), np.uint8) if self.resize else None
+
+        # 좌표 복원용 상수 (network -> frame)
+        self.offset = np.array([self.left, self.top] * 2, np.float32)
+        self.limit = np.array([self.frame_shape[1], self.frame_shape[0]] * 2, np.float32)
+
+        self.device = torch.device(device or 'cpu')
+        self.dtype = dtype or torch.float32
+        self._allocate(max_batch)
+
+    def _allocate(self, max_batch):
+        import torch
+
+        self.max_batch = max_batch
+        shape = (max_batch, 3, *self.out_shape)
+        host = torch.full(shape, PAD_VALUE / 255, dtype=torch.float32)
+        if self.device.type == 'cuda':
+            # pinned 메모리 -> 비동기 복사
+            host = host.pin_memory()
+            self.device_tensor = torch.empty(shape, dtype=self.dtype, device=self.device)
+        else:
+            self.device_tensor = None
+        self.host = host
+        self.array = host.numpy()  # 같은 메모리를 보는 numpy 뷰
+        self.region = self.array[:, :, self.top:self.top + self.new_h, self.left:self.left + self.new_w]
+
+    def __call__(self, frames):
+        """같은 크기의 BGR 프레임 리스트 -> 입력 텐서 [N, 3, H, W] (내부 버퍼의 뷰)"""
+        n = len(frames)
+        if n > self.max_batch:
+            self._allocate(n)
+        for b, frame in enumerate(frames):
+            src = frame
+            if self.resize:
+                cv2.resize(frame, (self.new_w, self.new_h), dst=self.resized, interpolation=cv2.INTER_LINEAR)
+                src = self.resized
+            _write_chw(src, self.region[b])
+        if self.device_tensor is None:
+            return self.host[:n]
+        x = self.device_tensor[:n]
+        x.copy_(self.host[:n], non_blocking=True)
+        return x
+
+    def scale_back(self, xyxy, index=0):
+        """입력 텐서 좌표 -> 원본 프레임 좌표 (in place, 박스 전체를 한 번에)"""
+        xyxy -= self.offset
+        xyxy /= self.r
+        np.clip(xyxy, 0, self.limit, out=xyxy)
+        return xyxy
+
+
+class CanvasPreprocessor:
+    """크기가 섞인 프레임 -> 공용 캔버스 텐서 하나 (imgsz마다 버퍼 하나)
+
+    외부 이미지(/infer)처럼 크기가 제각각인 배치도 한 번의 forward로 묶기 위한 것.
+    프레임마다 letterbox_geometry로 줄인 뒤, 배치에서 가장 큰 입력 크기 (stride 배수, 최대 imgsz x imgsz)
+    캔버스 가운데에 놓는다 - 비율이 같은 이미지끼리면 패딩이 늘지 않음 (ultralytics val의 rect 배치와 같은 방식).
+    이미지 크기가 늘어나도 버퍼는 imgsz x imgsz 하나라서 메모리가 늘지 않는다.
+    좌표 복원값은 호출마다 프레임별로 다시 계산 (scale_back(xyxy, index)).
+    """
+
+    def __init__(self, imgsz=640, stride=32, max_batch=8, device=None, dtype=None):
+        import torch
+
+        self.imgsz = imgsz
+        self.stride = stride
+        self.out_shape = (imgsz, imgsz)
+        # 리사이즈 결과는 크기가 매번 달라서 1차원 버퍼의 앞부분을 잘라 씀 (cv2 dst는 연속 메모리여야 함)
+        self.scratch = np.empty(imgsz * imgsz * 3, np.uint8)
+        self.device = torch.device(device or 'cpu')
+        self.dtype = dtype or torch.float32
+        self.geometry = []
+        self._allocate(max_batch)
+
+    def _allocate(self, max_batch):
+        import torch
+
+        self.max_batch = max_batch
+        # 캔버스 크기가 호출마다 달라도 [N, 3, H, W]가 연속 메모리가 되도록 1차원으로 잡고 앞부분을 view
+        size = max_batch * 3 * self.imgsz * self.imgsz
+        host = torch.full((size,), PAD_VALUE / 255, dtype=torch.float32)
+        if self.device.type == 'cuda':
+            host = host.pin_memory()
+            self.device_tensor = torch.empty(size, dtype=self.dtype, device=self.device)
+        else:
+            self.device_tensor = None
+        self.host = host
+        self.canvas = None                 # 마지막 캔버스 (H, W)
+        self.placed = [None] * max_batch   # 슬롯마다 이미지가 놓인 영역 (패딩을 다시 칠할지 판단)
+
+    def __call__(self, frames):
+        """BGR 프레임 리스트 (크기 무관) -> 입력 텐서 [N, 3, H, W] (내부 버퍼의 뷰)"""
+        n = len(frames)
+        if n > self.max_batch:
+            self._allocate(n)
+        geometry = [letterbox_geometry(f.shape, self.imgsz, self.stride) for f in frames]
+        out_h = max(g[3][0] for g in geometry)
+        out_w = max(g[3][1] for g in geometry)
+        numel = n * 3 * out_h * out_w
+        array = self.host[:numel].numpy().reshape(n, 3, out_h, out_w)
+        if self.canvas != (out_h, out_w):
+            # 캔버스 모양이 바뀌면 메모리 배치도 바뀜 -> 모든 슬롯을 다시 칠해야 함
+            self.canvas = (out_h, out_w)
+            self.placed = [None] * self.max_batch
+
+        self.geometry = []
+        for b, (frame, (r, (new_h, new_w), _, _)) in enumerate(zip(frames, geometry)):
+            src = frame
+            if (new_h, new_w) != frame.shape[:2]:
+                src = self.scratch[:new_h * new_w * 3].reshape(new_h, new_w, 3)
+                cv2.resize(frame, (new_w, new_h), dst=src, interpolation=cv2.INTER_LINEAR)
+            top, left = (out_h - new_h) // 2, (out_w - new_w) // 2
+            placed = (top, left, new_h, new_w)
+            if self.placed[b] != placed:
+                # 이전 이미지가 있던 자리를 패딩 색으로 (같은 자리면 이미지로 다 덮이므로 생략)
+                array[b].fill(PAD_VALUE / 255)
+                self.placed[b] = placed
+            _write_chw(src, array[b, :, top:top + new_h, left:left + new_w])
+            h, w = frame.shape[:2]
+            self.geometry.append((r, np.array([left, top] * 2, np.float32), np.array([w, h] * 2, np.float32)))
+
+        x = self.host[:numel].view(n, 3, out_h, out_w)
+        if self.device_tensor is None:
+            return x
+        y = self.device_tensor[:numel].view(n, 3, out_h, out_w)
+        y.copy_(x, non_blocking=True)
+        return y
+
+    def scale_back(self, xyxy, index=0):
+        """입력 텐서 좌표 -> index번째 프레임 좌표 (in place)"""
+        r, offset, limit = self.geometry[index]
+        xyxy -= offset
+        xyxy /= r
+        np.clip(xyxy, 0, limit, out=xyxy)
+        return xyxy
+
+
+def _nms():
+    try:
+        from ultralytics.utils.nms import non_max_suppression
+    except ImportError:
+        from ultralytics.utils.ops import non_max_suppression
+    return non_max_suppression
+
+
+def _prefers_channels_last(device):
+    """ultralytics AutoBackend가 가중치를 channels_last로 바꾸는 조건 (x86 CPU + mkldnn)"""
+    import torch
+
+    return (device.type == 'cpu' and platform.machine() in ('AMD64', 'x86_64')
+            and platform.system() in ('Linux', 'Windows')
+            and torch.backends.mkldnn.is_available() and torch.backends.mkldnn.enabled)
+
+
+class DirectPredictor:
+    """ultralytics YOLO(.pt)를 predictor 없이 바로 호출
+
+    Preprocessor로 만든 텐서를 모델 nn.Module에 넣고 NMS 후 좌표만 되돌린다.
+    ultralytics predictor가 프레임마다 만드는 letterbox 배열 / 텐서 / Results 객체를 건너뜀.
+    Preprocessor는 (imgsz, 프레임 크기)마다 하나씩 만들어 재사용한다 (최근 CACHE_SIZE개만, LRU).
+    크기가 섞인 배치는 imgsz마다 하나인 CanvasPreprocessor로 한 번의 forward에 처리.
+    """
+
+    def __init__(self, yolo, device=None, max_batch=8, cache_size=CACHE_SIZE):
+        import torch
+        from ultralytics.utils.torch_utils import select_device
+
+        net = yolo.model
+        if hasattr(net, 'fuse') and not net.is_fused():
+            net = net.fuse(verbose=False)
+        self.device = select_device(device or '', verbose=False)
+        self.net = net.to(self.device).eval()
+        if _prefers_channels_last(self.device):
+            # ultralytics AutoBackend와 같이 - x86 CPU(mkldnn)에서는 NHWC 가중치 conv가 ~30% 빠름
+            self.net = self.net.to(memory_format=torch.channels_last)
+        self.dtype = next(self.net.parameters()).dtype
+        self.stride = max(int(self.net.stride.max()), 32)
+        self.names = yolo.names
+        self.max_batch = max_batch
+        self.non_max_suppression = _nms()
+        self._torch = torch
+        self.cache_size = cache_size
+        self._pre = OrderedDict()
+        self.preprocess_ms = deque(maxlen=200)
+
+    @staticmethod
+    def supports(model):
+        """PyTorch 검출 모델만 (stub / onnx / engine 은 ultralytics 경로)"""
+        if not USE_DIRECT or not hasattr(model, 'model'):
+            return False
+        import torch
+        return isinstance(model.model, torch.nn.Module) and getattr(model, 'task', 'detect') == 'detect'
+
+    def preprocessor(self, frame_shape, imgsz, batch=1):
+        """(imgsz, 프레임 크기)별 Preprocessor, frame_shape=None 이면 imgsz의 CanvasPreprocessor"""
+        key = (imgsz, None if frame_shape is None else tuple(frame_shape[:2]))
+        pre = self._pre.get(key)
+        if pre is not None:
+            self._pre.move_to_end(key)
+            return pre
+        if frame_shape is None:
+            pre = CanvasPreprocessor(imgsz, self.stride, self.max_batch, self.device, self.dtype)
+        else:
+            # 크기별 버퍼는 실제 배치만큼만 (더 큰 배치가 오면 그때 늘림)
+            pre = Preprocessor(frame_shape, imgsz, self.stride, batch, self.device, self.dtype)
+        self._pre[key] = pre
+        while len(self._pre) > self.cache_size:
+            self._pre.popitem(last=False)
+        return pre
+
+    def __call__(self, frames, imgsz=640, conf=0.25, iou=0.7, classes=None, max_det=300,
+                 agnostic_nms=False, **_ultralytics_only):
+        """프레임 (또는 리스트) -> [Detections]"""
+        frames = frames if isinstance(frames, list) else [frames]
+        shape = frames[0].shape
+        mixed = any(f.shape != shape for f in frames[1:])
+        if not isinstance(imgsz, int):
+            imgsz = max(imgsz)
+        imgsz = math.ceil(imgsz / self.stride) * self.stride
+        # 크기가 섞이면 공용 캔버스 하나에 letterbox (프레임별 forward 대신 한 번)
+        pre = self.preprocessor(None if mixed else shape, imgsz, len(frames))
+
+        start = time.perf_counter()
+        with span('preprocess', 'model', batch=len(frames)):
+            x = pre(frames)
+        self.preprocess_ms.append((time.perf_counter() - start) * 1000 / len(frames))
+
+        with self._torch.inference_mode():
+            preds = self.net(x)
+
+        with span('postprocess', 'model', batch=len(frames)):
+            out = self.non_max_suppression(preds, conf, iou, classes=classes, agnostic=agnostic_nms,
+                                           max_det=max_det)
+            detections = []
+            for i, det in enumerate(out):
+                if len(det) == 0:
+                    detections.append(Detections.empty())
+                    continue
+                det = det.float().cpu().numpy()
+                detections.append(Detections(pre.scale_back(det[:, :4], i), det[:, 4], det[:, 5].astype(int)))
+        return detections
+
+    def stats(self):
+        ms = list(self.preprocess_ms)
+        return {
+            "device": str(self.device),
+            "preprocess_ms": round(float(np.mean(ms)), 3) if ms else None,
+            "buffers": [{"imgsz": imgsz, "frame": list(shape) if shape else "mixed", "input": list(pre.out_shape),
+                         "max_batch": pre.max_batch} for (imgsz, shape), pre in self._pre.items()],
+        }
+
+
+def direct_predictor(model, device=None):
+    """지원하면 DirectPredictor, 아니면 None"""
+    return DirectPredictor(model, device) if DirectPredictor.supports(model) else None
+
+
+# ===== 벤치마크 =====
+
+def ultralytics_style(frames, imgsz=640, stride=32):
+    """비교용: ultralytics predictor.preprocess와 같은 단계 (프레임마다 새 배열)"""
+    import torch
+
+    r, (new_h, new_w), (top, left), (out_h, out_w) = letterbox_geometry(frames[0].shape, imgsz, stride)
+    boxed = []
+    for frame in frames:
+        im = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        im = cv2.copyMakeBorder(im, top, out_h - new_h - top, left, out_w - new_w - left,
+                                cv2.BORDER_CONSTANT, value=(PAD_VALUE,) * 3)
+        boxed.append(im)
+    im = np.stack(boxed)[..., ::-1].transpose((0, 3, 1, 2))
+    im = torch.from_numpy(np.ascontiguousarray(im))
+    return im.float() / 255
+
+
+def benchmark(frame_shape=(720, 1280, 3), imgsz=640, batch=1, iters=200):
+    """프레임당 전처리 시간 / numpy 할당량 비교 (torch 내부 할당은 tracemalloc에 안 잡힘)"""
+    import tracemalloc
+
+    import torch
+
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, frame_shape, dtype=np.uint8) for _ in range(batch)]
+    pre = Preprocessor(frame_shape, imgsz, max_batch=batch)
+    assert torch.allclose(pre(frames), ultralytics_style(frames, imgsz), atol=1e-6)
+
+    report = {}
+    for name, fn in (("ultralytics", lambda: ultralytics_style(frames, imgsz)), ("reused", lambda: pre(frames))):
+        for _ in range(10):
+            fn()
+        tracemalloc.start()
+        churn = 0
+        start = time.perf_counter()
+        for _ in range(iters):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            fn()
+            churn += tracemalloc.get_traced_memory()[1] - base
+        elapsed = time.perf_counter() - start
+        tracemalloc.stop()
+        report[name] = {"ms_per_frame": round(elapsed * 1000 / (iters * batch), 3),
+                        "alloc_kb_per_frame": round(churn / 1024 / (iters * batch), 1)}
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='전처리 경로 비교 (ultralytics 방식 vs 버퍼 재사용)')
+    parser.add_argument('--shape', default='720x1280', help='프레임 크기 HxW')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--batch', type=int, default=1)
+    parser.add_argument('--iters', type=int, default=200)
+    opt = parser.parse_args()
+
+    h, w = (int(v) for v in opt.shape.lower().split('x'))
+    print(json.dumps(benchmark((h, w, 3), opt.imgsz, opt.batch, opt.iters), indent=2))
@@ -0,0 +1,57 @@
+import threading
+import time
+
+# 프로세스 시작 기준 시각 (서버 스크립트가 가장 먼저 import)
+PROCESS_T0 = time.perf_counter()
+
+
+class Readiness:
+    """서버 준비 단계와 시작 시간 측정
+
+    단계: starting -> loading -> warming -> ready (실패 시 failed)
+    mark(step)는 직전 mark부터 걸린 시간을 기록해서 시작 시간 내역을 만든다.
+    """
+
+    PHASES = ('starting', 'loading', 'warming', 'ready', 'failed')
+
+    def __init__(self, t0=PROCESS_T0):
+        self.t0 = t0
+        self.phase = 'starting'
+        self.error = None
+        self.timings = {}
+        self.milestones = {}
+        self._last = t0
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.phase == 'ready'
+
+    def set_phase(self, phase, error=None):
+        assert phase in self.PHASES, phase
+        self.phase = phase
+        self.error = error
+        self.milestone(phase)
+        print(f"🚦 서버 상태: {phase}" + (f" ({error})" if error else ""))
+
+    def mark(self, step):
+        """직전 mark 이후 걸린 시간(ms)을 step 이름으로 기록"""
+        with self._lock:
+            now = time.perf_counter()
+            self.timings[step] = round((now - self._last) * 1000, 1)
+            self._last = now
+
+    def milestone(self, name):
+        """프로세스 시작부터 name까지 걸린 시간(ms) - 처음 한 번만 기록"""
+        with self._lock:
+            if name not in self.milestones:
+                self.milestones[name] = round((time.perf_counter() - self.t0) * 1000, 1)
+
+    def to_dict(self):
+        return {
+            "phase": self.phase,
+            "ready": self.ready,
+            "error": self.error,
+            "startup_ms": dict(self.timings),
+            "since_start_ms": dict(self.milestones),
+        }
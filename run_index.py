@@ -0,0 +1,320 @@
+import json
+import os
+import time
+from pathlib import Path
+
+import yaml
+
+# 학습 결과 폴더 (이 파일 기준)
+PROJECT_DIR = Path(__file__).resolve().parent
+RUNS_DIR = PROJECT_DIR / 'runs' / 'detect'
+INDEX_FILE = 'run_index.json'
+
+# 예전 하드코딩 경로 (인덱스에서 고를 수 없을 때만 사용)
+LEGACY_MODEL_PATH = r'C:\Users\dnjsr\Desktop\YOLO_Project\runs\detect\mounting_detection3\weights\best.pt'
+
+# results.csv 컬럼
+MAP50_COL = 'metrics/mAP50(B)'
+MAP50_95_COL = 'metrics/mAP50-95(B)'
+
+# 정책별 정렬 기준
+POLICIES = {
+    'map50-95': 'best_map50_95',
+    'map50': 'best_map50',
+    'final-map50-95': 'final_map50_95',
+}
+
+
+# ===== 파싱 =====
+
+def _stat_key(path):
+    """파일 변경 감지용 (크기, mtime) - 없으면 None"""
+    try:
+        st = os.stat(path)
+        return [st.st_size, st.st_mtime_ns]
+    except OSError:
+        return None
+
+
+def read_results_csv(results_csv):
+    """results.csv -> {컬럼: [값...]} (ultralytics 헤더의 공백 제거)"""
+    with open(results_csv) as f:
+        header = [h.strip() for h in f.readline().split(',')]
+        columns = {h: [] for h in header}
+        for line in f:
+            if not line.strip():
+                continue
+            for h, v in zip(header, line.split(',')):
+                try:
+                    columns[h].append(float(v))
+                except ValueError:
+                    columns[h].append(None)
+    return columns
+
+
+def summarize_run(run_dir):
+    """학습 폴더 하나 요약 (args.yaml + results.csv + weights)"""
+    run_dir = Path(run_dir)
+    summary = {
+        'name': run_dir.name,
+        'dir': str(run_dir),
+        'model': None,
+        'imgsz': None,
+        'epochs_planned': None,
+        'epochs': 0,
+        'final_map50': None,
+        'final_map50_95': None,
+        'best_map50': None,
+        'best_map50_95': None,
+        'best_epoch': None,
+        'train_time_s': None,
+        'weights': None,
+        'weights_mb': None,
+        'cpu_latency_ms': None,
+    }
+
+    args_path = run_dir / 'args.yaml'
+    if args_path.exists():
+        with open(args_path) as f:
+            args = yaml.safe_load(f) or {}
+        summary['model'] = args.get('model')
+        summary['imgsz'] = args.get('imgsz')
+        summary['epochs_planned'] = args.get('epochs')
+
+    results_csv = run_dir / 'results.csv'
+    if results_csv.exists():
+        cols = read_results_csv(results_csv)
+        map50 = [v for v in cols.get(MAP50_COL, []) if v is not None]
+        map50_95 = [v for v in cols.get(MAP50_95_COL, []) if v is not None]
+        epochs = cols.get('epoch', [])
+        summary['epochs'] = len(epochs)
+        if map50_95:
+            best = max(range(len(map50_95)), key=map50_95.__getitem__)
+            summary['final_map50'] = map50[-1] if map50 else None
+            summary['final_map50_95'] = map50_95[-1]
+            summary['best_map50'] = max(map50) if map50 else None
+            summary['best_map50_95'] = map50_95[best]
+            summary['best_epoch'] = int(epochs[best]) if epochs and epochs[best] is not None else best + 1
+        times = [v for v in cols.get('time', []) if v is not None]
+        if times:
+            summary['train_time_s'] = times[-1]
+
+    weights = run_dir / 'weights' / 'best.pt'
+    if weights.exists():
+        summary['weights'] = str(weights)
+        summary['weights_mb'] = round(weights.stat().st_size / 1e6, 2)
+
+    return summary
+
+
+def _fingerprint(run_dir):
+    run_dir = Path(run_dir)
+    return {
+        'args': _stat_key(run_dir / 'args.yaml'),
+        'results': _stat_key(run_dir / 'results.csv'),
+        'weights': _stat_key(run_dir / 'weights' / 'best.pt'),
+    }
+
+
+# ===== CPU 지연시간 측정 =====
+
+def measure_cpu_latency(weights, imgsz=640, runs=20, warmup=3, frame_shape=(720, 1280, 3)):
+    """CPU에서 프레임 1장 추론 시간(ms, 중앙값) 측정"""
+    import numpy as np
+    from ultralytics import YOLO
+
+    model = YOLO(weights)
+    frame = np.zeros(frame_shape, dtype=np.uint8)
+    for _ in range(warmup):
+        model(frame, imgsz=imgsz, device='cpu', verbose=False)
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model(frame, imgsz=imgsz, device='cpu', verbose=False)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return round(timings[len(timings) // 2], 2)
+
+
+# ===== 인덱스 =====
+
+class RunIndex:
+    """runs/detect 아래 학습 결과를 한 번만 파싱해서 run_index.json에 캐시
+
+    파일 크기/mtime이 바뀐 폴더만 다시 파싱하고, CPU 지연시간은
+    가중치 파일이 바뀌지 않는 한 재측정하지 않는다.
+    """
+
+    def __init__(self, runs_dir=RUNS_DIR):
+        self.runs_dir = Path(runs_dir)
+        self.index_path = self.runs_dir / INDEX_FILE
+        self.runs = {}
+        self._load()
+
+    def _load(self):
+        if self.index_path.exists():
+            try:
+                with open(self.index_path) as f:
+                    self.runs = json.load(f).get('runs', {})
+            except (OSError, ValueError):
+                self.runs = {}
+
+    def save(self):
+        """원자적으로 저장 (임시 파일 -> replace)"""
+        self.runs_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix('.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'updated': time.time(), 'runs': self.runs}, f, indent=2)
+        os.replace(tmp, self.index_path)
+
+    def refresh(self, bench=False, force=False):
+        """바뀐 폴더만 다시 요약 (bench=True면 지연시간이 없는 run을 측정)"""
+        changed = False
+        seen = set()
+        if self.runs_dir.is_dir():
+            with os.scandir(self.runs_dir) as it:
+                run_dirs = sorted(Path(e.path) for e in it if e.is_dir())
+        else:
+            run_dirs = []
+
+        for run_dir in run_dirs:
+            name = run_dir.name
+            seen.add(name)
+            fp = _fingerprint(run_dir)
+            cached = self.runs.get(name)
+            if force or cached is None or cached.get('fingerprint') != fp:
+                summary = summarize_run(run_dir)
+                # 가중치가 그대로면 기존 측정값 유지
+                if cached and cached.get('fingerprint', {}).get('weights') == fp['weights']:
+                    summary['cpu_latency_ms'] = cached.get('cpu_latency_ms')
+                summary['fingerprint'] = fp
+                self.runs[name] = summary
+                changed = True
+
+            run = self.runs[name]
+            if bench and run['weights'] and run['cpu_latency_ms'] is None:
+                print(f"⏱️  {name}: CPU 지연시간 측정 중...")
+                run['cpu_latency_ms'] = measure_cpu_latency(run['weights'], run['imgsz'] or 640)
+                changed = True
+
+        for name in list(self.runs):
+            if name not in seen:
+                del self.runs[name]
+                changed = True
+
+        if changed:
+            self.save()
+        return self
+
+    def list(self):
+        return sorted(self.runs.values(), key=lambda r: r['name'])
+
+    def select(self, policy='map50-95', max_latency_ms=None, require_weights=True):
+        """정책에 맞는 최고 run 선택 ("best mAP50-95 under X ms")
+
+        max_latency_ms가 있으면 측정된 지연시간이 그 이하인 run만 고려
+        """
+        key = POLICIES[policy]
+        candidates = [r for r in self.runs.values()
+                      if r.get(key) is not None and (r.get('weights') or not require_weights)]
+        if max_latency_ms is not None:
+            candidates = [r for r in candidates
+                          if r.get('cpu_latency_ms') is not None and r['cpu_latency_ms'] <= max_latency_ms]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda r: r[key])
+
+
+def resolve_model_path(policy='map50-95', max_latency_ms=None, runs_dir=RUNS_DIR, env_prefix='MODEL'):
+    """서버용 모델 경로 결정
+
+    1. 환경변수 {env_prefix}_PATH
+    2. run 인덱스에서 정책으로 선택 ({env_prefix}_MAX_LATENCY_MS로 지연시간 제한)
+    3. 예전 하드코딩 경로
+    """
+    env_path = os.environ.get(f'{env_prefix}_PATH')
+    if env_path:
+        return env_path
+
+    if max_latency_ms is None and os.environ.get(f'{env_prefix}_MAX_LATENCY_MS'):
+        max_latency_ms = float(os.environ[f'{env_prefix}_MAX_LATENCY_MS'])
+
+    index = RunIndex(runs_dir).refresh()
+    run = index.select(policy, max_latency_ms)
+    if run is None and max_latency_ms is not None:
+        print(f"⚠️  {max_latency_ms}ms 이하로 측정된 모델이 없습니다 (run_index.py list --bench로 측정)")
+        run = index.select(policy)
+    if run is not None:
+        print(f"🏆 모델 선택: {run['name']} (mAP50-95={run['best_map50_95']:.4f}, "
+              f"latency={run['cpu_latency_ms']}ms)")
+        return run['weights']
+    return LEGACY_MODEL_PATH
+
+
+# ===== CLI =====
+
+def _fmt(v, spec=''):
+    if v is None:
+        return '-'
+    return format(v, spec)
+
+
+def print_runs(runs):
+    print(f"{'run':<22}{'model':<14}{'imgsz':>6}{'epochs':>8}{'best50':>9}{'best50-95':>11}"
+          f"{'final50-95':>12}{'MB':>7}{'ms':>8}")
+    for r in runs:
+        print(f"{r['name']:<22}{_fmt(r['model']):<14}{_fmt(r['imgsz']):>6}{r['epochs']:>8}"
+              f"{_fmt(r['best_map50'], '.4f'):>9}{_fmt(r['best_map50_95'], '.4f'):>11}"
+              f"{_fmt(r['final_map50_95'], '.4f'):>12}{_fmt(r['weights_mb']):>7}{_fmt(r['cpu_latency_ms']):>8}")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='학습 run 인덱스')
+    parser.add_argument('--runs-dir', default=str(RUNS_DIR))
+    sub = parser.add_subparsers(dest='cmd')
+
+    p_list = sub.add_parser('list', help='run 목록')
+    p_list.add_argument('--bench', action='store_true', help='CPU 지연시간 측정')
+    p_list.add_argument('--refresh', action='store_true', help='캐시 무시하고 다시 파싱')
+
+    p_cmp = sub.add_parser('compare', help='run 비교')
+    p_cmp.add_argument('runs', nargs='+')
+
+    p_best = sub.add_parser('best', help='정책으로 모델 선택')
+    p_best.add_argument('--policy', default='map50-95', choices=sorted(POLICIES))
+    p_best.add_argument('--max-latency', type=float, default=None, help='최대 CPU 지연시간 (ms)')
+
+    opt = parser.parse_args(argv)
+    index = RunIndex(opt.runs_dir)
+
+    if opt.cmd == 'compare':
+        index.refresh()
+        runs = [index.runs[n] for n in opt.runs if n in index.runs]
+        missing = [n for n in opt.runs if n not in index.runs]
+        if missing:
+            print(f"❌ 없는 run: {', '.join(missing)}")
+        print_runs(runs)
+        if len(runs) >= 2:
+            base = runs[0]
+            for r in runs[1:]:
+                if base['best_map50_95'] is not None and r['best_map50_95'] is not None:
+                    print(f"   {r['name']} vs {base['name']}: "
+                          f"mAP50-95 {r['best_map50_95'] - base['best_map50_95']:+.4f}")
+    elif opt.cmd == 'best':
+        run = index.refresh().select(opt.policy, opt.max_latency)
+        if run is None:
+            print("❌ 조건에 맞는 run이 없습니다")
+            return 1
+        print_runs([run])
+        print(run['weights'])
+    else:
+        index.refresh(bench=getattr(opt, 'bench', False), force=getattr(opt, 'refresh', False))
+        print_runs(index.list())
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,182 @@
+import itertools
+import os
+import socket
+import time
+from collections import namedtuple
+
+import cv2
+
+# 느린 client는 아래 단계로 내려감 (fps, JPEG 품질, 축소 비율)
+StreamProfile = namedtuple('StreamProfile', 'fps quality scale')
+PROFILES = [
+    StreamProfile(30, 80, 1.0),
+    StreamProfile(20, 70, 1.0),
+    StreamProfile(15, 60, 0.75),
+    StreamProfile(10, 50, 0.5),
+    StreamProfile(5, 40, 0.5),
+]
+# 프레임을 임대한 뒤 client 소켓에 다 쓸 때까지 허용 지연
+MAX_LAG_MS = float(os.environ.get('STREAM_MAX_LAG_MS', 500))
+# 소켓 송신 버퍼를 프레임 몇 장 크기로 줄일지 (0이면 커널 기본값 - 몇 MB까지 쌓여서 지연이 숨음)
+SNDBUF_FRAMES = float(os.environ.get('STREAM_SNDBUF_FRAMES', 2))
+# 여유가 이만큼 계속되면 한 단계 올림
+UPGRADE_AFTER_S = 5.0
+
+
+def encode_jpeg(frame, profile):
+    """프레임 -> JPEG bytes (profile의 축소 비율 / 품질)"""
+    if profile.scale < 1:
+        h, w = frame.shape[:2]
+        frame = cv2.resize(frame, (int(w * profile.scale), int(h * profile.scale)), interpolation=cv2.INTER_AREA)
+    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, profile.quality])
+    return buffer.tobytes()
+
+
+def mjpeg_part(frame_bytes):
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n'
+            b'Content-Length: ' + str(len(frame_bytes)).encode() + b'\r\n\r\n'
+            + frame_bytes + b'\r\n')
+
+
+def limit_send_buffer(sock, nbytes):
+    """송신 버퍼를 줄여서 느린 client의 backpressure가 바로 write 시간에 드러나게 함"""
+    if sock is None or nbytes <= 0:
+        return False
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, int(nbytes))
+        return True
+    except (OSError, AttributeError):
+        return False
+
+
+class ClientPacer:
+    """stream client 하나의 전송 속도 조절
+
+    프레임마다 (임대 시각, 쓰기 시작, 쓰기 끝) 을 받아서
+    - drain: 소켓 쓰기가 막힌 시간 (EWMA) - client가 못 따라오면 늘어남
+    - lag:   프레임 임대 -> client 소켓에 다 쓸 때까지
+    를 보고, 밀리면 한 단계 낮은 profile (fps / 품질 / 크기) 로, 여유가 계속되면 다시 올림.
+    다음 프레임까지 쉬는 시간은 고정 0.033초가 아니라 interval - 이미 쓴 시간.
+    항상 최신 프레임만 임대하므로 밀린 프레임은 쌓이지 않고 건너뛴다 (skipped).
+    """
+
+    def __init__(self, client_id, kind, sock=None, level=0, max_lag_ms=MAX_LAG_MS):
+        self.id = client_id
+        self.kind = kind
+        self.sock = sock
+        self.level = level
+        self.max_lag = max_lag_ms / 1000
+        self.connected = time.perf_counter()
+        self.drain = 0.0
+        self.lag = 0.0
+        self.max_seen_lag = 0.0
+        self.frames = 0
+        self.bytes = 0
+        self.skipped = 0
+        self.downgrades = 0
+        self.upgrades = 0
+        self.sndbuf = None
+        self._slow = 0
+        self._changed = self.connected
+        self._last_start = None
+
+    @property
+    def profile(self):
+        return PROFILES[self.level]
+
+    @property
+    def interval(self):
+        return 1 / self.profile.fps
+
+    def record(self, leased_at, start, done, nbytes, skipped=0):
+        """프레임 하나를 client에 다 씀"""
+        drain = done - start
+        self.drain = drain if self.frames == 0 else 0.7 * self.drain + 0.3 * drain
+        self.lag = done - leased_at
+        self.max_seen_lag = max(self.max_seen_lag, self.lag)
+        self.frames += 1
+        self.bytes += nbytes
+        self.skipped += max(0, skipped)
+        self._last_start = start
+        self._adapt(done)
+
+    def _adapt(self, now):
+        interval = self.interval
+        if self.drain > 0.7 * interval or self.lag > self.max_lag:
+            self._slow += 1
+            # 두 프레임 연속이면 (일시적인 한 번은 무시)
+            if self._slow >= 2 and self.level < len(PROFILES) - 1:
+                self.level += 1
+                self.downgrades += 1
+                self._slow = 0
+                self._changed = now
+            return
+        self._slow = 0
+        if (self.level > 0 and self.drain < 0.25 * interval
+                and now - self._changed > UPGRADE_AFTER_S):
+            self.level -= 1
+            self.upgrades += 1
+            self._changed = now
+
+    def delay(self, now=None):
+        """다음 프레임까지 쉴 시간 (쓰기에 이미 interval을 넘게 썼으면 0)"""
+        if self._last_start is None:
+            return 0.0
+        now = time.perf_counter() if now is None else now
+        return max(0.0, self._last_start + self.interval - now)
+
+    def to_dict(self):
+        elapsed = max(time.perf_counter() - self.connected, 1e-6)
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "level": self.level,
+            **self.profile._asdict(),
+            "lag_ms": round(self.lag * 1000, 1),
+            "max_lag_ms": round(self.max_seen_lag * 1000, 1),
+            "drain_ms": round(self.drain * 1000, 1),
+            "kbit_s": round(self.bytes * 8 / 1000 / elapsed, 1),
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "downgrades": self.downgrades,
+            "upgrades": self.upgrades,
+            "sndbuf": self.sndbuf,
+        }
+
+
+class StreamClients:
+    """연결된 client의 pacer 목록 (/status의 stream_clients)"""
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self.clients = {}
+
+    def connect(self, kind, sock=None):
+        pacer = ClientPacer(next(self._ids), kind, sock)
+        self.clients[pacer.id] = pacer
+        return pacer
+
+    def first_frame(self, pacer, nbytes):
+        """첫 프레임 크기를 보고 송신 버퍼를 SNDBUF_FRAMES장 크기로"""
+        if SNDBUF_FRAMES and limit_send_buffer(pacer.sock, nbytes * SNDBUF_FRAMES):
+            pacer.sndbuf = pacer.sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+
+    def disconnect(self, pacer):
+        self.clients.pop(pacer.id, None)
+        pacer.sock = None
+
+    def levels(self, kind=None):
+        return {p.level for p in list(self.clients.values()) if kind is None or p.kind == kind}
+
+    def stats(self):
+        clients = [p.to_dict() for p in list(self.clients.values())]
+        return {
+            "clients": clients,
+            "max_lag_ms": max((c["lag_ms"] for c in clients), default=None),
+            "lag_limit_ms": MAX_LAG_MS,
+            "profiles": [p._asdict() for p in PROFILES],
+        }
+
+
+CLIENTS = StreamClients()
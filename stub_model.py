@@ -0,0 +1,84 @@
+import random
+import time
+
+import numpy as np
+
+# 학습한 모델과 같은 클래스
+STUB_NAMES = {0: 'mounting', 1: 'impossibility', 2: 'sale'}
+
+
+def is_stub(model_path):
+    """MODEL_PATH=stub 또는 stub:<ms> 이면 가짜 모델"""
+    return str(model_path).startswith('stub')
+
+
+class _Array:
+    """torch 텐서처럼 .cpu().numpy()를 지원하는 numpy 래퍼"""
+
+    __slots__ = ('a',)
+
+    def __init__(self, a):
+        self.a = a
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.a
+
+    def __len__(self):
+        return len(self.a)
+
+
+class StubBoxes:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = _Array(xyxy)
+        self.conf = _Array(conf)
+        self.cls = _Array(cls.astype(np.float32))
+
+    def __len__(self):
+        return len(self.conf)
+
+
+class StubResult:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class StubModel:
+    """부하 테스트용 가짜 YOLO
+
+    실제 추론 대신 latency_ms만큼 sleep하고 (torch처럼 GIL을 놓음)
+    seed로 정해진 순서의 박스를 돌려준다 - 같은 설정이면 항상 같은 결과.
+    배치는 프레임 한 장당 batch_ms가 추가된다.
+    """
+
+    def __init__(self, latency_ms=20.0, batch_ms=None, detect_rate=0.3, seed=0):
+        self.names = dict(STUB_NAMES)
+        self.latency_ms = latency_ms
+        self.batch_ms = latency_ms * 0.3 if batch_ms is None else batch_ms
+        self.detect_rate = detect_rate
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    @classmethod
+    def from_spec(cls, spec):
+        """'stub' / 'stub:25' (ms)"""
+        _, _, ms = str(spec).partition(':')
+        return cls(latency_ms=float(ms) if ms else 20.0)
+
+    def _result(self, frame):
+        h, w = frame.shape[:2]
+        if self._rng.random() >= self.detect_rate:
+            return StubResult(StubBoxes(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, int)))
+        cls = self._rng.randrange(len(self.names))
+        x1, y1 = self._rng.uniform(0, w * 0.6), self._rng.uniform(0, h * 0.6)
+        box = np.array([[x1, y1, x1 + w * 0.3, y1 + h * 0.3]], np.float32)
+        conf = np.array([self._rng.uniform(0.25, 0.95)], np.float32)
+        return StubResult(StubBoxes(box, conf, np.array([cls])))
+
+    def __call__(self, source, **kwargs):
+        frames = source if isinstance(source, list) else [source]
+        time.sleep((self.latency_ms + self.batch_ms * (len(frames) - 1)) / 1000)
+        self.calls += 1
+        return [self._result(f) for f in frames]
@@ -0,0 +1,338 @@
+import itertools
+import json
+import math
+import os
+import queue
+import random
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import yaml
+
+from run_index import MAP50_95_COL, MAP50_COL, PROJECT_DIR, read_results_csv, summarize_run
+
+SWEEP_DIR = PROJECT_DIR / 'runs' / 'sweep'
+
+# 기본 탐색 공간 (train_model()에서 손으로 바꿔 보던 값들)
+# 리스트 = 선택지, {'min', 'max', 'log'} = 범위에서 샘플
+DEFAULT_SPACE = {
+    'lr0': {'min': 0.001, 'max': 0.02, 'log': True},
+    'batch': [8, 16],
+    'hsv_s': [0.5, 0.7],
+    'degrees': [0, 10],
+    'flipud': [0.0, 0.5],
+    'mosaic': [0.5, 1.0],
+}
+
+
+# ===== 탐색 공간 =====
+
+def load_space(path=None):
+    if path is None:
+        return DEFAULT_SPACE
+    with open(path) as f:
+        return yaml.safe_load(f)
+
+
+def sample_configs(space, n, seed=0):
+    """n개 설정 (모두 선택지면 격자에서, 범위가 있으면 무작위 샘플)"""
+    rng = random.Random(seed)
+    if all(isinstance(v, list) for v in space.values()):
+        grid = [dict(zip(space, values)) for values in itertools.product(*space.values())]
+        rng.shuffle(grid)
+        return grid[:n]
+
+    configs = []
+    for _ in range(n):
+        config = {}
+        for key, spec in space.items():
+            if isinstance(spec, list):
+                config[key] = rng.choice(spec)
+            elif spec.get('log'):
+                config[key] = round(math.exp(rng.uniform(math.log(spec['min']), math.log(spec['max']))), 6)
+            else:
+                config[key] = round(rng.uniform(spec['min'], spec['max']), 6)
+        configs.append(config)
+    return configs
+
+
+def rungs(min_epochs, max_epochs, eta):
+    """successive halving 단계별 epoch (min, min*eta, ... , max)"""
+    points = []
+    e = min_epochs
+    while e < max_epochs:
+        points.append(e)
+        e *= eta
+    return points + [max_epochs]
+
+
+def fitness(results_csv):
+    """마지막 epoch의 ultralytics fitness (0.1*mAP50 + 0.9*mAP50-95)"""
+    try:
+        cols = read_results_csv(results_csv)
+    except OSError:
+        return None
+    map50, map50_95 = cols.get(MAP50_COL) or [], cols.get(MAP50_95_COL) or []
+    if not map50 or map50[-1] is None or map50_95[-1] is None:
+        return None
+    return 0.1 * map50[-1] + 0.9 * map50_95[-1]
+
+
+# ===== trial (하위 프로세스) =====
+
+def rung_stopper(stop_at, rung_ckpt):
+    """on_model_save 콜백: rung epoch에 도달하면 체크포인트를 보관하고 멈춤
+
+    on_fit_epoch_end는 쓰지 않음 - ultralytics 8.4+는 최종 정리(last.pt의 optimizer 삭제) 뒤에
+    한 번 더 부르므로 resume할 수 없는 체크포인트로 덮어쓰게 됨
+    """
+    def stop_at_rung(trainer):
+        if trainer.epoch + 1 >= stop_at:
+            shutil.copy(trainer.last, rung_ckpt)
+            trainer.stop = True
+
+    return stop_at_rung
+
+
+def run_trial(opt):
+    """trial 하나를 stop_at epoch까지 학습 (이어서 학습하면 rung 체크포인트에서 resume)"""
+    import torch
+    from ultralytics import YOLO
+
+    from dataset_cache import make_cached_trainer
+
+    torch.set_num_threads(opt.threads)
+    if opt.cores and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, [int(c) for c in opt.cores.split(',')])
+
+    trial_dir = Path(opt.project) / opt.name
+    last = trial_dir / 'weights' / 'last.pt'
+    rung_ckpt = trial_dir / 'weights' / 'rung.pt'
+    stop_at_rung = rung_stopper(opt.stop_at, rung_ckpt)
+
+    if rung_ckpt.exists():
+        shutil.copy(rung_ckpt, last)
+        model = YOLO(str(last))
+        model.add_callback('on_model_save', stop_at_rung)
+        model.train(resume=True, trainer=make_cached_trainer())
+    else:
+        model = YOLO(opt.model)
+        model.add_callback('on_model_save', stop_at_rung)
+        model.train(
+            trainer=make_cached_trainer(),
+            data=opt.data,
+            imgsz=opt.imgsz,
+            epochs=opt.epochs,  # LR 스케줄은 전체 예산 기준
+            device='cpu',
+            workers=opt.workers,
+            patience=opt.epochs,
+            project=opt.project,
+            name=opt.name,
+            exist_ok=True,
+            plots=False,
+            verbose=False,
+            **json.loads(opt.params),
+        )
+
+
+# ===== 스윕 =====
+
+class Sweep:
+    """CPU에서 trial을 병렬로 돌리고 successive halving으로 걸러냄
+
+    trial마다 하위 프로세스 하나, torch/OpenMP 스레드는 threads개로 제한하고
+    (pin=True면 겹치지 않는 코어에 고정) 동시에 cpus // threads개를 실행한다.
+    """
+
+    def __init__(self, name, data, space, trials=9, min_epochs=5, max_epochs=45, eta=3,
+                 threads=2, parallel=None, pin=False, imgsz=640, model='yolov8n.pt', workers=1, seed=0):
+        self.name = name
+        self.dir = SWEEP_DIR / name
+        self.data = str(data)
+        self.space = space
+        self.trials = trials
+        self.rungs = rungs(min_epochs, max_epochs, eta)
+        self.max_epochs = max_epochs
+        self.eta = eta
+        self.threads = threads
+        cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+        self.cpus = cpus
+        self.parallel = parallel or max(1, cpus // threads)
+        self.pin = pin
+        self.imgsz = imgsz
+        self.model = model
+        self.workers = workers
+        self.seed = seed
+        self.state = {}
+
+    def _cores(self, slot):
+        if not self.pin:
+            return ''
+        start = slot * self.threads % self.cpus
+        return ','.join(str((start + i) % self.cpus) for i in range(self.threads))
+
+    def _launch(self, trial, stop_at, slot):
+        env = {**os.environ, 'OMP_NUM_THREADS': str(self.threads), 'MKL_NUM_THREADS': str(self.threads)}
+        cmd = [sys.executable, os.path.abspath(__file__), 'trial',
+               '--name', trial['name'], '--project', str(self.dir), '--data', self.data,
+               '--params', json.dumps(trial['params']), '--epochs', str(self.max_epochs),
+               '--stop-at', str(stop_at), '--threads', str(self.threads), '--imgsz', str(self.imgsz),
+               '--model', self.model, '--workers', str(self.workers), '--cores', self._cores(slot)]
+        log_path = self.dir / f"{trial['name']}.log"
+        start = time.perf_counter()
+        with open(log_path, 'a') as log:
+            code = subprocess.call(cmd, stdout=log, stderr=subprocess.STDOUT, env=env)
+        trial['train_s'] += time.perf_counter() - start
+        trial['epochs'] = stop_at
+        trial['fitness'] = fitness(self.dir / trial['name'] / 'results.csv')
+        if code != 0:
+            trial['error'] = f"exit {code} ({log_path.name})"
+        print(f"   {trial['name']}: {stop_at} epoch, fitness={trial['fitness']}"
+              + (f" ❌ {trial['error']}" if code else ''))
+        return trial
+
+    def run(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        configs = sample_configs(self.space, self.trials, self.seed)
+        alive = [{'name': f'trial_{i:02d}', 'params': c, 'epochs': 0, 'fitness': None,
+                  'train_s': 0.0, 'rung': 0, 'error': None} for i, c in enumerate(configs)]
+        self.state = {t['name']: t for t in alive}
+        print(f"🔬 스윕 {self.name}: {len(alive)} trial, rung={self.rungs}, "
+              f"동시 {self.parallel}개 x {self.threads} 스레드")
+
+        start = time.perf_counter()
+        for level, stop_at in enumerate(self.rungs):
+            print(f"\n🪜 rung {level}: {len(alive)} trial -> {stop_at} epoch")
+            # 빈 코어 묶음(slot)을 받아서 실행하고 끝나면 반납
+            slots = queue.Queue()
+            for slot in range(self.parallel):
+                slots.put(slot)
+
+            def launch(trial):
+                slot = slots.get()
+                try:
+                    return self._launch(trial, stop_at, slot)
+                finally:
+                    slots.put(slot)
+
+            with ThreadPoolExecutor(self.parallel) as pool:
+                list(pool.map(launch, alive))
+            for trial in alive:
+                trial['rung'] = level
+            self.save(time.perf_counter() - start)
+
+            if level == len(self.rungs) - 1:
+                break
+            ranked = sorted((t for t in alive if t['fitness'] is not None), key=lambda t: -t['fitness'])
+            alive = ranked[:max(1, math.ceil(len(alive) / self.eta))]
+
+        wall_s = time.perf_counter() - start
+        board = self.save(wall_s)
+        print_leaderboard(board)
+        sequential_s = sum(t['train_s'] for t in self.state.values())
+        print(f"\n⏱️  실제 {wall_s / 60:.1f}분 (trial 합계 {sequential_s / 60:.1f}분, "
+              f"전체 {len(self.state)}개를 {self.max_epochs} epoch까지 순차 학습했다면 더 오래 걸림)")
+        return board
+
+    def leaderboard(self):
+        """trial들의 results.csv로 만든 비교표 (rung이 높고 fitness가 높은 순)"""
+        rows = []
+        for trial in self.state.values():
+            summary = summarize_run(self.dir / trial['name'])
+            rows.append({
+                'name': trial['name'],
+                'rung': trial['rung'],
+                'epochs': summary['epochs'],
+                'fitness': trial['fitness'],
+                'best_map50': summary['best_map50'],
+                'best_map50_95': summary['best_map50_95'],
+                'train_s': round(trial['train_s'], 1),
+                'weights': summary['weights'],
+                'error': trial['error'],
+                **{f'p.{k}': v for k, v in trial['params'].items()},
+            })
+        rows.sort(key=lambda r: (-r['rung'], -(r['fitness'] or -1)))
+        return rows
+
+    def save(self, wall_s):
+        board = self.leaderboard()
+        payload = {'name': self.name, 'data': self.data, 'space': self.space, 'rungs': self.rungs,
+                   'threads': self.threads, 'parallel': self.parallel, 'wall_s': round(wall_s, 1),
+                   'leaderboard': board}
+        tmp = self.dir / 'leaderboard.json.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(payload, f, indent=2)
+        os.replace(tmp, self.dir / 'leaderboard.json')
+
+        keys = list(dict.fromkeys(k for row in board for k in row))
+        with open(self.dir / 'leaderboard.csv', 'w') as f:
+            f.write(','.join(keys) + '\n')
+            for row in board:
+                f.write(','.join('' if row.get(k) is None else str(row.get(k)) for k in keys) + '\n')
+        return board
+
+
+def print_leaderboard(board):
+    print(f"\n{'trial':<10}{'rung':>5}{'epochs':>8}{'fitness':>9}{'best50':>9}{'best50-95':>11}{'min':>7}  params")
+    for r in board:
+        params = ' '.join(f"{k[2:]}={v}" for k, v in r.items() if k.startswith('p.'))
+        fit = '-' if r['fitness'] is None else f"{r['fitness']:.4f}"
+        b50 = '-' if r['best_map50'] is None else f"{r['best_map50']:.4f}"
+        b5095 = '-' if r['best_map50_95'] is None else f"{r['best_map50_95']:.4f}"
+        print(f"{r['name']:<10}{r['rung']:>5}{r['epochs']:>8}{fit:>9}{b50:>9}{b5095:>11}"
+              f"{r['train_s'] / 60:>7.1f}  {params}")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='CPU 병렬 하이퍼파라미터 스윕 (successive halving)')
+    sub = parser.add_subparsers(dest='cmd')
+
+    p_run = sub.add_parser('run', help='스윕 실행')
+    p_run.add_argument('--data', required=True, help='data.yaml')
+    p_run.add_argument('--name', default=time.strftime('sweep_%Y%m%d_%H%M'))
+    p_run.add_argument('--space', default=None, help='탐색 공간 yaml (기본: DEFAULT_SPACE)')
+    p_run.add_argument('--trials', type=int, default=9)
+    p_run.add_argument('--min-epochs', type=int, default=5)
+    p_run.add_argument('--max-epochs', type=int, default=45)
+    p_run.add_argument('--eta', type=int, default=3, help='rung마다 1/eta만 남김')
+    p_run.add_argument('--threads', type=int, default=2, help='trial당 torch 스레드')
+    p_run.add_argument('--parallel', type=int, default=None, help='동시 trial 수 (기본: CPU 수 / threads)')
+    p_run.add_argument('--pin', action='store_true', help='trial마다 겹치지 않는 코어에 고정')
+    p_run.add_argument('--imgsz', type=int, default=640)
+    p_run.add_argument('--model', default='yolov8n.pt')
+    p_run.add_argument('--workers', type=int, default=1, help='trial당 DataLoader 워커')
+    p_run.add_argument('--seed', type=int, default=0)
+
+    p_show = sub.add_parser('show', help='leaderboard 출력')
+    p_show.add_argument('name')
+
+    # 내부용: 하위 프로세스에서 trial 하나 실행
+    p_trial = sub.add_parser('trial')
+    for arg in ('--name', '--project', '--data', '--params', '--model', '--cores'):
+        p_trial.add_argument(arg, default='')
+    for arg in ('--epochs', '--stop-at', '--threads', '--imgsz', '--workers'):
+        p_trial.add_argument(arg, type=int, default=1)
+
+    opt = parser.parse_args(argv)
+    if opt.cmd == 'trial':
+        run_trial(opt)
+    elif opt.cmd == 'show':
+        with open(SWEEP_DIR / opt.name / 'leaderboard.json') as f:
+            print_leaderboard(json.load(f)['leaderboard'])
+    elif opt.cmd == 'run':
+        Sweep(opt.name, opt.data, load_space(opt.space), trials=opt.trials, min_epochs=opt.min_epochs,
+              max_epochs=opt.max_epochs, eta=opt.eta, threads=opt.threads, parallel=opt.parallel,
+              pin=opt.pin, imgsz=opt.imgsz, model=opt.model, workers=opt.workers, seed=opt.seed).run()
+    else:
+        parser.print_help()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 모듈이 저장소 루트에 평평하게 있음 (패키지 아님)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,76 @@
+import json
+
+from alert_policy import AlertPolicy, ClassPolicy
+
+CAM = 'cam0'
+
+
+def test_debounce_needs_consecutive_inferences():
+    policy = AlertPolicy({'sale': ClassPolicy(min_hits=3)})
+    assert not policy.observe(CAM, 'sale', now=0)
+    assert not policy.observe(CAM, 'sale', now=1)
+    # 한 번 안 보이면 처음부터
+    policy.end_frame(CAM, set())
+    assert not policy.observe(CAM, 'sale', now=2)
+    assert not policy.observe(CAM, 'sale', now=3)
+    assert policy.observe(CAM, 'sale', now=4)
+
+
+def test_end_frame_only_resets_missing_classes_of_that_camera():
+    policy = AlertPolicy({'sale': ClassPolicy(min_hits=2), 'mounting': ClassPolicy(min_hits=2)})
+    policy.observe(CAM, 'sale', now=0)
+    policy.observe(CAM, 'mounting', now=0)
+    policy.observe('cam1', 'sale', now=0)
+    policy.end_frame(CAM, {'sale'})
+    assert policy.observe(CAM, 'sale', now=1)
+    assert not policy.observe(CAM, 'mounting', now=1)
+    assert policy.observe('cam1', 'sale', now=1)
+
+
+def test_cooldown_is_per_camera():
+    policy = AlertPolicy({'sale': ClassPolicy(cooldown_s=60)})
+    assert policy.observe(CAM, 'sale', now=100)
+    assert not policy.observe(CAM, 'sale', now=159)
+    assert policy.next_allowed(CAM, 'sale', now=159) == 160
+    assert policy.observe('cam1', 'sale', now=159)
+    assert policy.observe(CAM, 'sale', now=160)
+
+
+def test_rate_limit_window():
+    policy = AlertPolicy({'sale': ClassPolicy(max_alerts=2, window_s=100)})
+    assert policy.observe(CAM, 'sale', now=0)
+    assert policy.observe(CAM, 'sale', now=10)
+    assert not policy.observe(CAM, 'sale', now=50)
+    assert policy.next_allowed(CAM, 'sale', now=50) == 100
+    assert policy.observe(CAM, 'sale', now=100)
+
+
+def test_active_classes_and_unknown_class():
+    policy = AlertPolicy({'sale': ClassPolicy(cooldown_s=60), 'mounting': ClassPolicy()})
+    policy.observe(CAM, 'sale', now=0)
+    assert policy.active_classes(CAM, now=30) == {'mounting'}
+    assert policy.active_classes(CAM, now=60) == {'sale', 'mounting'}
+    # 정책이 없는 클래스는 항상 알림
+    assert policy.observe(CAM, 'other', now=0)
+
+
+def test_state_survives_restart(tmp_path):
+    path = tmp_path / 'alert_log.json'
+    policy = AlertPolicy({'sale': ClassPolicy(cooldown_s=3600)}, path=str(path), flush_interval=0)
+    now = 1_700_000_000
+    assert policy.observe(CAM, 'sale', now=now)
+    policy.close()
+    assert json.loads(path.read_text())['cameras'][CAM]['sale']['last_alert']
+
+    restarted = AlertPolicy({'sale': ClassPolicy(cooldown_s=3600)}, path=str(path))
+    assert not restarted.observe(CAM, 'sale', now=now + 60)
+    restarted.close()
+
+
+def test_reads_legacy_log(tmp_path):
+    path = tmp_path / 'alert_log.json'
+    path.write_text(json.dumps({'sale': '2024-01-01T09:00:00'}))
+    policy = AlertPolicy({'sale': ClassPolicy(cooldown_s=60)}, path=str(path))
+    last = policy._states[('default', 'sale')].last_alert
+    assert policy.next_allowed('default', 'sale', now=last + 30) == last + 60
+    policy.close()
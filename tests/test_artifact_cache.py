@@ -0,0 +1,163 @@
+import os
+
+import pytest
+
+pytest.importorskip('yaml')
+pytest.importorskip('cv2')  # weights_hash -> dataset_cache
+
+import artifact_cache
+import dataset_cache
+from artifact_cache import ArtifactCache
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """_build 대신 - backend 이름의 파일을 size 바이트로 만들고 호출을 기록"""
+    calls = []
+
+    def fake_build(weights, backend, imgsz, out_dir, size=100):
+        calls.append((backend, imgsz))
+        path = out_dir / f'{backend}.bin'
+        path.write_bytes(b'x' * size)
+        return path
+
+    monkeypatch.setattr(artifact_cache, '_build', fake_build)
+    return calls
+
+
+@pytest.fixture
+def weights(tmp_path):
+    path = tmp_path / 'best.pt'
+    path.write_bytes(b'weights-v1')
+    return path
+
+
+def _cache(tmp_path, max_bytes=10_000):
+    return ArtifactCache(tmp_path / 'cache', max_bytes=max_bytes)
+
+
+def test_key_changes_with_weights_imgsz_backend_and_versions(tmp_path, weights, monkeypatch):
+    cache = _cache(tmp_path)
+    base, spec = cache.key(weights, 'fused', 640)
+    assert base.startswith('best-fused-640-')
+    assert cache.key(weights, 'fused', 640)[0] == base
+    assert cache.key(weights, 'fused', 320)[0] != base
+    assert cache.key(weights, 'onnx', 640)[0] != base
+
+    real = artifact_cache.package_versions
+    monkeypatch.setattr(artifact_cache, 'package_versions', lambda names: {**real(names), 'torch': '0.0-other'})
+    assert cache.key(weights, 'fused', 640)[0] != base
+    monkeypatch.setattr(artifact_cache, 'package_versions', real)
+
+    weights.write_bytes(b'weights-v2-retrained')
+    key, new_spec = cache.key(weights, 'fused', 640)
+    assert key != base and new_spec['weights_hash'] != spec['weights_hash']
+
+    with pytest.raises(ValueError):
+        cache.key(weights, 'tensorrt', 640)
+
+
+def test_build_then_get_hit_updates_last_used(tmp_path, weights, builds):
+    cache = _cache(tmp_path)
+    assert cache.get(weights, 'fused', 640) is None
+
+    path = cache.build(weights, 'fused', 640)
+    assert path.read_bytes() == b'x' * 100
+    assert not list(cache.root.glob('.tmp-*'))
+    (key, entry), = cache.entries().items()
+    assert entry['bytes'] == 100 and entry['hits'] == 0
+
+    before = entry['last_used']
+    assert cache.get(weights, 'fused', 640) == path
+    entry = cache.entries()[key]
+    assert entry['hits'] == 1 and entry['last_used'] >= before
+
+    # 있으면 빌드하지 않음
+    assert cache.path_for(weights, 'fused', 640) == path
+    assert builds == [('fused', 640)]
+
+
+def test_build_keeps_weights_hash_memo(tmp_path, weights, builds, monkeypatch):
+    hashed = []
+    real = dataset_cache.file_hash
+    monkeypatch.setattr(dataset_cache, 'file_hash', lambda path: hashed.append(path) or real(path))
+    cache = _cache(tmp_path)
+
+    cache.build(weights, 'fused', 640)
+    cache.get(weights, 'fused', 640)
+    cache.build(weights, 'onnx', 640)
+    # 가중치가 그대로면 한 번만 해시
+    assert len(hashed) == 1
+    assert str(weights.resolve()) in cache._load_index()['hashes']
+
+
+def test_build_keeps_entries_added_by_another_process(tmp_path, weights, builds, monkeypatch):
+    cache = _cache(tmp_path)
+    other = _cache(tmp_path)
+    real = artifact_cache._build
+
+    def build_while_other_process_builds(weights, backend, imgsz, out_dir):
+        if backend == 'fused':
+            other.build(weights, 'onnx', imgsz)
+        return real(weights, backend, imgsz, out_dir)
+
+    monkeypatch.setattr(artifact_cache, '_build', build_while_other_process_builds)
+    cache.build(weights, 'fused', 640)
+    assert sorted(e['backend'] for e in cache.entries().values()) == ['fused', 'onnx']
+
+
+def test_lru_eviction_order_respects_keep(tmp_path, weights, builds):
+    cache = _cache(tmp_path, max_bytes=250)
+    for imgsz in (320, 416, 512):
+        cache.build(weights, 'fused', imgsz)
+    # 지금까지 300 바이트 -> 넣자마자 가장 오래 안 쓴 320이 빠짐
+    assert sorted(e['imgsz'] for e in cache.entries().values()) == [416, 512]
+
+    index = cache._load_index()
+    keys = {e['imgsz']: k for k, e in index['entries'].items()}
+    # 416을 방금 쓴 것으로 -> 512가 가장 오래됨
+    index['entries'][keys[416]]['last_used'] += 100
+    cache._save_index(index)
+
+    assert cache.evict(max_bytes=100) == [keys[512]]
+    assert not (cache.root / keys[512]).exists()
+
+    # keep은 가장 오래돼도 남김
+    cache.build(weights, 'fused', 640)
+    index = cache._load_index()
+    keys = {e['imgsz']: k for k, e in index['entries'].items()}
+    index['entries'][keys[416]]['last_used'] = 0
+    cache._save_index(index)
+    assert cache.evict(keep={keys[416]}, max_bytes=100) == [keys[640]]
+    assert [e['imgsz'] for e in cache.entries().values()] == [416]
+
+
+def test_evict_drops_entries_whose_folder_is_gone(tmp_path, weights, builds):
+    cache = _cache(tmp_path)
+    path = cache.build(weights, 'fused', 640)
+    for f in path.parent.iterdir():
+        f.unlink()
+    path.parent.rmdir()
+    assert cache.get(weights, 'fused', 640) is None
+    cache.evict()
+    assert cache.entries() == {}
+
+
+def test_concurrent_build_uses_the_folder_that_won_the_rename(tmp_path, weights, monkeypatch):
+    cache = _cache(tmp_path)
+    key, _ = cache.key(weights, 'fused', 640)
+
+    def lose_the_race(weights, backend, imgsz, out_dir):
+        # 다른 프로세스가 같은 키를 먼저 공개
+        winner = cache.root / key
+        winner.mkdir(parents=True)
+        (winner / 'fused.bin').write_bytes(b'winner')
+        path = out_dir / 'fused.bin'
+        path.write_bytes(b'loser')
+        return path
+
+    monkeypatch.setattr(artifact_cache, '_build', lose_the_race)
+    path = cache.build(weights, 'fused', 640)
+    assert path == cache.root / key / 'fused.bin' and path.read_bytes() == b'winner'
+    assert sorted(os.listdir(cache.root)) == sorted(['index.json', key])
+    assert cache.entries()[key]['bytes'] == len(b'winner')
@@ -0,0 +1,116 @@
+import asyncio
+from concurrent.futures import Future
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+pytest.importorskip('starlette')
+pytest.importorskip('httpx')
+
+from starlette.testclient import TestClient
+
+import asgi_server
+from asgi_server import JpegHub, create_app
+from frame_ring import FrameRing
+
+
+class FakeDetector:
+    """detect_ondemand_async만 있는 detector - 클래스별 결과를 미리 정해 둠"""
+
+    def __init__(self, results):
+        self.results = results
+        self.calls = []
+
+    def detect_ondemand_async(self, class_name, conf):
+        self.calls.append((class_name, conf))
+        future = Future()
+        future.set_result(self.results[class_name])
+        return future
+
+
+def _ring(value=0):
+    ring = FrameRing((48, 64, 3), slots=3)
+    slot, buf = ring.acquire_write()
+    buf[:] = value
+    ring.commit(slot)
+    return ring
+
+
+@pytest.fixture
+def server():
+    state = {'detector': None, 'ready': False}
+    ring = _ring()
+    app = create_app(get_detector=lambda: state['detector'], messages=[],
+                     lease_frame=ring.lease_latest,
+                     health_payload=lambda: {'ready': state['ready'], 'phase': 'ready' if state['ready'] else 'loading'},
+                     status_payload=lambda: {'camera_running': True, 'frame_available': ring.has_frame})
+    with TestClient(app) as client:
+        yield client, state
+
+
+def test_health_and_status_before_and_after_ready(server):
+    client, state = server
+    r = client.get('/health')
+    assert r.status_code == 503 and r.json()['phase'] == 'loading'
+    assert client.get('/status').status_code == 503
+
+    state.update(ready=True, detector=FakeDetector({}))
+    r = client.get('/health')
+    assert r.status_code == 200 and r.json()['ready']
+    r = client.get('/status')
+    assert r.status_code == 200
+    assert r.json() == {'camera_running': True, 'frame_available': True, 'stream_viewers': 0}
+
+
+def test_detect_routes_await_detector_result(server):
+    client, state = server
+    assert client.post('/detect_sale').status_code == 503
+
+    detector = FakeDetector({'sale': {'success': True, 'detections': [{'class': 'sale'}]},
+                             'impossibility': {'success': False, 'message': '탐지 없음'}})
+    state['detector'] = detector
+    r = client.post('/detect_sale')
+    assert r.status_code == 200 and r.json()['detections'] == [{'class': 'sale'}]
+    r = client.post('/detect_impossibility')
+    assert r.status_code == 400 and not r.json()['success']
+    assert [name for name, _ in detector.calls] == ['sale', 'impossibility']
+
+
+def test_jpeg_hub_encodes_once_for_all_viewers(monkeypatch):
+    encoded = []
+    real = asgi_server.encode_jpeg
+    monkeypatch.setattr(asgi_server, 'encode_jpeg', lambda frame, profile: encoded.append(1) or real(frame, profile))
+    ring = _ring(value=128)
+
+    async def scenario():
+        hub = JpegHub(ring.lease_latest, fps=200)
+        viewers = [hub.stream() for _ in range(3)]
+        pending = [asyncio.ensure_future(v.__anext__()) for v in viewers]
+        await asyncio.sleep(0)
+        assert hub.viewers == 3
+
+        runner = asyncio.create_task(hub.run())
+        chunks = await asyncio.wait_for(asyncio.gather(*pending), 5)
+        runner.cancel()
+        for v in viewers:
+            await v.aclose()
+        return hub, chunks
+
+    hub, chunks = asyncio.run(scenario())
+    # 같은 bytes 객체를 공유 - viewer마다 인코딩/복사하지 않음
+    assert chunks[0].startswith(b'--frame\r\n') and b'\xff\xd8' in chunks[0]
+    assert all(c is chunks[0] for c in chunks)
+    assert len(encoded) == 1
+    assert hub.viewers == 0
+
+
+def test_trace_route_requires_admin_token(server, monkeypatch):
+    import model_manager
+
+    client, _ = server
+    monkeypatch.setattr(model_manager, 'ADMIN_TOKEN', 's3cret')
+    assert client.post('/admin/trace?seconds=5').status_code == 401
+    assert client.get('/admin/trace', headers={'X-Admin-Token': 'wrong'}).status_code == 401
+    r = client.get('/admin/trace?seconds=0.1', headers={'X-Admin-Token': 's3cret'})
+    assert r.status_code == 200 and 'traceEvents' in r.json()
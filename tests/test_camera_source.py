@@ -0,0 +1,145 @@
+import queue
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+from camera_source import CaptureSource, ReplaySource, parse_source
+
+
+def _frames(n, shape=(4, 6, 3)):
+    return [np.full(shape, i, np.uint8) for i in range(n)]
+
+
+def _value(frame):
+    return int(frame[0, 0, 0])
+
+
+def test_replay_is_deterministic_and_loops():
+    source = ReplaySource(_frames(4), fps=0)
+    assert [_value(source.read()) for _ in range(10)] == [0, 1, 2, 3, 0, 1, 2, 3, 0, 1]
+    assert source.stats.frames == 10 and source.stats.dropped == 0
+
+    # 같은 프레임으로 다시 만들면 같은 순서
+    again = ReplaySource(_frames(4), fps=0)
+    assert [_value(again.read()) for _ in range(10)] == [0, 1, 2, 3, 0, 1, 2, 3, 0, 1]
+
+
+def test_replay_without_loop_ends_and_resizes_into_buffer():
+    source = ReplaySource(_frames(3), fps=0, loop=False)
+    out = np.empty((8, 12, 3), np.uint8)
+    values = []
+    while (frame := source.read(out)) is not None:
+        assert frame is out
+        values.append(_value(frame))
+    assert values == [0, 1, 2]
+    assert source.ended and source.status()['state'] == 'ended'
+
+
+class RecordingStop:
+    """_stop 대신 - 기다리지 않고 대기 시간만 기록"""
+
+    def __init__(self):
+        self.waits = []
+        self.stopped = False
+
+    def wait(self, timeout=None):
+        self.waits.append(timeout)
+        return self.stopped
+
+    def is_set(self):
+        return self.stopped
+
+    def set(self):
+        self.stopped = True
+
+
+class ScriptedCap:
+    """read 결과를 미리 정해 둔 VideoCapture (True = 프레임, False = 끊김)"""
+
+    def __init__(self, script, stop):
+        self.script = script
+        self.stop = stop
+        self.released = False
+
+    def read(self, buf=None):
+        ok = self.script.pop(0)
+        if ok and not self.script:
+            self.stop.set()
+        return ok, (np.zeros((2, 2, 3), np.uint8) if ok else None)
+
+    def release(self):
+        self.released = True
+
+
+def test_reconnect_backoff_doubles_up_to_max():
+    source = CaptureSource('rtsp://camera', 'stream', backoff=0.5, max_backoff=2.0)
+    stop = source._stop = RecordingStop()
+    # 연결 실패 4번 -> 연결 -> 프레임 2장 -> 끊김 -> 재연결 -> 프레임 1장
+    caps = [None, None, None, None,
+            ScriptedCap([True, True, False], stop), ScriptedCap([True], stop)]
+    opened = []
+    source._open = lambda: opened.append(caps[len(opened)]) or opened[-1]
+
+    source._grab_loop()
+
+    assert stop.waits == [0.5, 1.0, 2.0, 2.0, 0.5]
+    assert len(opened) == 6 and opened[4].released
+    assert source.stats.frames == 3 and source.stats.reconnects == 1
+    assert source.state == 'streaming' and source.last_error == "프레임 읽기 실패"
+
+
+class QueueCap:
+    """테스트가 넣어 준 프레임만 돌려주는 VideoCapture"""
+
+    def __init__(self, frames, stop):
+        self.frames = frames
+        self.stop = stop
+
+    def read(self, buf=None):
+        while not self.stop.is_set():
+            try:
+                return True, self.frames.get(timeout=0.01)
+            except queue.Empty:
+                pass
+        return False, None
+
+    def release(self):
+        pass
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while not predicate() and time.perf_counter() < deadline:
+        time.sleep(0.005)
+    assert predicate()
+
+
+def test_consumer_gets_newest_frame_not_a_stale_one():
+    frames = queue.Queue()
+    source = CaptureSource('rtsp://camera', 'stream')
+    source._open = lambda: QueueCap(frames, source._stop)
+    with source:
+        for i in (1, 2, 3):
+            frames.put(np.full((2, 2, 3), i, np.uint8))
+        _wait_for(lambda: source.stats.frames == 3)
+        assert _value(source.read(timeout=1)) == 3
+
+        # 받기 전에 덮인 프레임은 dropped, 같은 프레임을 다시 주지 않음
+        for i in (4, 5, 6):
+            frames.put(np.full((2, 2, 3), i, np.uint8))
+        _wait_for(lambda: source.stats.frames == 6)
+        out = np.empty((2, 2, 3), np.uint8)
+        assert _value(source.read(out, timeout=1)) == 6
+        assert source.stats.dropped == 2
+        assert source.read(timeout=0.05) is None
+    assert source.state == 'closed'
+
+
+def test_parse_source():
+    assert parse_source('0') == ('webcam', 0)
+    assert parse_source('rtsp://10.0.0.2/stream') == ('stream', 'rtsp://10.0.0.2/stream')
+    assert parse_source('replay:synthetic') == ('replay', 'synthetic')
+    assert parse_source('clip.mp4') == ('file', 'clip.mp4')
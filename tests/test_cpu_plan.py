@@ -0,0 +1,45 @@
+import pytest
+
+from cpu_plan import CpuPlan
+
+# 물리 코어 4개, SMT 2-way
+SMT4 = [[0, 4], [1, 5], [2, 6], [3, 7]]
+
+
+def test_latency_profile_uses_one_thread_per_physical_core():
+    plan = CpuPlan('latency', topology=SMT4)
+    assert plan.stages == {'inference': [2, 3], 'capture': [0, 4], 'encode': [1, 5], 'io': [0, 4]}
+    assert (plan.torch_threads, plan.interop_threads, plan.cv2_threads) == (2, 1, 1)
+
+
+def test_fps_profile_uses_smt_siblings_and_more_encode_cores():
+    topology = [[i, i + 6] for i in range(6)]
+    plan = CpuPlan('fps', topology=topology)
+    assert plan.stages['encode'] == [1, 2, 7, 8]
+    assert plan.stages['inference'] == [3, 4, 5, 9, 10, 11]
+    assert plan.torch_threads == 6 and plan.cv2_threads == 4
+
+
+@pytest.mark.parametrize('topology, inference', [
+    ([[0], [1]], [1]),
+    ([[0]], [0]),
+])
+def test_small_machines_share_cores(topology, inference):
+    plan = CpuPlan('latency', topology=topology)
+    assert plan.stages['inference'] == inference
+    assert plan.stages['io'] == plan.stages['encode'] == [0]
+
+
+def test_off_profile_plans_nothing():
+    plan = CpuPlan('off', pin=True, topology=SMT4)
+    assert plan.stages == {} and plan.torch_threads is None and not plan.pin
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        CpuPlan('turbo', topology=SMT4)
+
+
+def test_to_dict_counts_cpus():
+    stats = CpuPlan('latency', topology=SMT4).to_dict()
+    assert (stats['physical_cores'], stats['logical_cpus']) == (4, 8)
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+np = pytest.importorskip('numpy')
+cv2 = pytest.importorskip('cv2')
+
+from dataset_cache import PAD_VALUE, letterbox_into, load_label_index, prepare_split_cache, read_labels
+
+
+def _split(tmp_path, images=2):
+    (tmp_path / 'images').mkdir()
+    (tmp_path / 'labels').mkdir()
+    for i in range(images):
+        cv2.imwrite(str(tmp_path / 'images' / f'{i}.png'), np.full((48, 64, 3), i * 50, np.uint8))
+    return tmp_path
+
+
+def test_letterbox_into_pads_bottom_right():
+    out = np.zeros((32, 32, 3), np.uint8)
+    hw0, hw = letterbox_into(np.full((48, 64, 3), 7, np.uint8), 32, out)
+    assert hw0 == (48, 64) and hw == (24, 32)
+    assert (out[:24] == 7).all()
+    assert (out[24:] == PAD_VALUE).all()
+
+
+def test_read_labels_skips_short_rows(tmp_path):
+    path = tmp_path / 'a.txt'
+    path.write_text('1 0.5 0.5 0.2 0.2\n\n3 0.1\n')
+    assert read_labels(path) == [[1, 0.5, 0.5, 0.2, 0.2]]
+    assert read_labels(tmp_path / 'missing.txt') == []
+
+
+def test_label_change_rebuilds_index_without_redecoding(tmp_path):
+    split = _split(tmp_path)
+    (split / 'labels' / '0.txt').write_text('0 0.5 0.5 0.1 0.1\n')
+    cache_dir = prepare_split_cache(split, imgsz=32, workers=1)
+    assert load_label_index(split / 'images', 32)['classes'] == {'0': 1}
+    index_mtime = (cache_dir / 'index.json').stat().st_mtime_ns
+
+    # 이미지는 그대로, 라벨만 바뀜
+    (split / 'labels' / '1.txt').write_text('2 0.5 0.5 0.1 0.1\n2 0.2 0.2 0.1 0.1\n')
+    prepare_split_cache(split, imgsz=32, workers=1)
+    labels = load_label_index(split / 'images', 32)
+    assert labels['classes'] == {'0': 1, '2': 2}
+    assert len(labels['images']['1.png']) == 2
+    assert (cache_dir / 'index.json').stat().st_mtime_ns == index_mtime
+
+
+def test_changed_image_is_redecoded(tmp_path):
+    split = _split(tmp_path)
+    cache_dir = prepare_split_cache(split, imgsz=32, workers=1)
+    cv2.imwrite(str(split / 'images' / '1.png'), np.full((48, 64, 3), 200, np.uint8))
+    prepare_split_cache(split, imgsz=32, workers=1)
+
+    with open(cache_dir / 'index.json') as f:
+        files = json.load(f)['files']
+    mm = np.memmap(cache_dir / 'images.u8', np.uint8, mode='r', shape=(len(files), 32, 32, 3))
+    assert [f['name'] for f in files] == ['0.png', '1.png']
+    assert mm[0, 0, 0, 0] == 0 and mm[1, 0, 0, 0] == 200
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+np = pytest.importorskip('numpy')
+cv2 = pytest.importorskip('cv2')
+pytest.importorskip('yaml')
+
+from dataset_dedup import REPORT_NAME, analyze, dedup_dataset, write_dedup
+
+
+def _scene(seed, shift=0):
+    rng = np.random.default_rng(seed)
+    frame = cv2.resize(rng.integers(0, 255, (12, 16, 3), dtype=np.uint8), (320, 240),
+                       interpolation=cv2.INTER_CUBIC)
+    return cv2.add(frame, np.full_like(frame, shift))
+
+
+def _image(dataset, split, name, frame, labels=0):
+    for sub in ('images', 'labels'):
+        (dataset / split / sub).mkdir(parents=True, exist_ok=True)
+    cv2.imwrite(str(dataset / split / 'images' / f'{name}.jpg'), frame)
+    if labels:
+        (dataset / split / 'labels' / f'{name}.txt').write_text('0 0.5 0.5 0.1 0.1\n' * labels)
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    dataset = tmp_path / 'ds'
+    # train: 장면 0 세 장 (라벨 가장 많은 b가 대표), 장면 1 한 장
+    _image(dataset, 'train', 'a', _scene(0), labels=1)
+    _image(dataset, 'train', 'b', _scene(0, 6), labels=2)
+    _image(dataset, 'train', 'c', _scene(0, 12))
+    _image(dataset, 'train', 'd', _scene(1), labels=1)
+    # valid: 장면 1과 같은 장면 (누수) + 새 장면
+    _image(dataset, 'valid', 'e', _scene(1, 8), labels=1)
+    _image(dataset, 'valid', 'f', _scene(2), labels=1)
+    (dataset / 'data.yaml').write_text('names:\n  0: sale\ntest: test/images\n')
+    return dataset
+
+
+def test_analyze_clusters_and_leaks(dataset):
+    report, keep = analyze(dataset, workers=1)
+    train, valid = report['splits']['train'], report['splits']['valid']
+    assert train['clusters'] == 2 and train['redundant_images'] == 2
+    assert sorted(train['largest_clusters'][0]) == ['a.jpg', 'b.jpg', 'c.jpg']
+    assert sorted(keep['train']) == ['b.jpg', 'd.jpg']
+    assert valid['leaked_images'] == 1 and valid['leaks']['e.jpg']['image'] == 'd.jpg'
+    assert keep['valid'] == ['f.jpg']
+    # 해시 캐시 재사용
+    assert (dataset / 'train' / '.phash.json').exists()
+    assert analyze(dataset, workers=1)[1] == keep
+
+
+def test_dedup_dataset_writes_links_yaml_and_marker(dataset, tmp_path):
+    out, data_yaml, report = dedup_dataset(dataset, workers=1)
+    assert out == tmp_path / 'ds-dedup'
+    assert sorted(p.name for p in (out / 'train' / 'images').iterdir()) == ['b.jpg', 'd.jpg']
+    assert (out / 'train' / 'labels' / 'b.txt').read_text().count('\n') == 2
+    text = data_yaml.read_text()
+    assert 'names' in text and 'test:' not in text
+    assert json.loads((out / REPORT_NAME).read_text())['splits']['valid']['leaked_images'] == 1
+    # 이전 dedup 결과는 다시 덮어씀
+    dedup_dataset(dataset, workers=1)
+
+
+@pytest.mark.parametrize('out', ['.', 'ds', 'ds/train/out'])
+def test_write_refuses_dataset_overlap(dataset, tmp_path, out):
+    with pytest.raises(ValueError):
+        write_dedup(dataset, tmp_path / out, {'train': []})
+    assert (dataset / 'train' / 'images' / 'a.jpg').exists()
+
+
+def test_write_refuses_unrelated_folder(dataset, tmp_path):
+    other = tmp_path / 'other'
+    other.mkdir()
+    (other / 'keep.txt').write_text('x')
+    with pytest.raises(ValueError):
+        write_dedup(dataset, other, {'train': []})
+    assert (other / 'keep.txt').exists()
+    write_dedup(dataset, tmp_path / 'empty', {'train': []})
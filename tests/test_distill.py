@@ -0,0 +1,56 @@
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from distill import DistillationLoss, student_cfg
+
+
+def _loss(nc=3, reg_max=16, temperature=2.0):
+    # v8DetectionLoss(ultralytics) 없이 증류 항만
+    loss = DistillationLoss.__new__(DistillationLoss)
+    loss.nc, loss.reg_max, loss.temperature = nc, reg_max, temperature
+    return loss
+
+
+def _levels(b=2, nc=3, reg_max=16):
+    torch.manual_seed(0)
+    return [torch.randn(b, reg_max * 4 + nc, s, s) for s in (8, 4, 2)]
+
+
+def _as_dict(levels, nc=3, reg_max=16):
+    b = levels[0].shape[0]
+    x = torch.cat([p.view(b, reg_max * 4 + nc, -1) for p in levels], 2)
+    boxes, scores = x.split((reg_max * 4, nc), 1)
+    return {'boxes': boxes, 'scores': scores, 'feats': []}
+
+
+def test_list_and_dict_outputs_give_same_loss():
+    loss = _loss()
+    s, t = _levels(), [p * 0.5 for p in _levels()]
+    from_list = loss.distill_loss(s, (None, t))
+    from_dict = loss.distill_loss(_as_dict(s), (None, _as_dict(t)))
+    assert from_list.item() == pytest.approx(from_dict.item(), rel=1e-6)
+
+
+def test_box_term_vanishes_when_student_matches_teacher():
+    import torch.nn.functional as F
+
+    loss = _loss()
+    s = _as_dict(_levels())
+    cls_only = F.binary_cross_entropy_with_logits(s['scores'], s['scores'].sigmoid())
+    assert loss.distill_loss(s, s).item() == pytest.approx(cls_only.item(), abs=1e-5)
+
+
+def test_end_to_end_head_uses_one2many_branch():
+    loss = _loss()
+    s = _as_dict(_levels())
+    e2e = {'one2many': s, 'one2one': _as_dict([p * 3 for p in _levels()])}
+    assert loss.distill_loss(e2e, s).item() == pytest.approx(loss.distill_loss(s, s).item())
+
+
+def test_student_cfg_only_changes_scale():
+    cfg = {'nc': 3, 'scales': {'n': [0.33, 0.25, 1024]}, 'backbone': [], 'head': []}
+    out = student_cfg(cfg, depth=0.33, width=0.125)
+    assert out['scales'] == {'student': [0.33, 0.125, 1024]}
+    assert out['scale'] == 'student'
+    assert cfg['scales'] == {'n': [0.33, 0.25, 1024]}
@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+import frame_broker
+from frame_broker import BrokerClient, SharedFrameRing, resolve_authkey
+from frame_ring import FrameRing
+from inference_worker import Detections
+
+
+@pytest.fixture
+def shm_name(monkeypatch):
+    # 테스트는 쓰는 쪽과 읽는 쪽이 같은 프로세스 - 읽는 쪽이 resource_tracker 등록을 지우면 안 됨
+    monkeypatch.setattr(frame_broker, '_untrack', lambda shm: None)
+    return f'yolo_test_{os.getpid()}'
+
+
+def _dets(n):
+    return Detections(np.arange(n * 4, dtype=np.float32).reshape(n, 4),
+                      np.full(n, 0.5, np.float32), np.arange(n))
+
+
+def _publish(ring, value, n=1):
+    slot, frame = ring.begin_write()
+    frame[:] = value
+    return ring.commit(slot, _dets(n))
+
+
+def test_consumer_reads_latest_frame_and_detections(shm_name):
+    writer = SharedFrameRing(shm_name, (4, 6, 3), slots=3, create=True)
+    try:
+        reader = SharedFrameRing(shm_name)
+        out = np.empty(reader.shape, np.uint8)
+        assert reader.read_latest(out) is None
+
+        _publish(writer, 1)
+        seq = _publish(writer, 2, n=3)
+        got_seq, dets = reader.read_latest(out)
+        assert got_seq == seq == reader.latest_seq
+        assert (out == 2).all()
+        assert len(dets) == 3 and dets.cls.tolist() == [0, 1, 2]
+        assert reader.read_latest(out, after_seq=seq) is None
+        reader.close()
+    finally:
+        writer.close()
+
+
+def test_torn_read_is_rejected(shm_name, monkeypatch):
+    # 슬롯 하나 -> 다음 쓰기가 읽는 중인 슬롯을 덮어씀
+    writer = SharedFrameRing(shm_name, (2, 2, 3), slots=1, create=True)
+    try:
+        _publish(writer, 1)
+        copyto = np.copyto
+
+        def copy_then_overwrite(dst, src):
+            copyto(dst, src)
+            writer.begin_write()
+
+        monkeypatch.setattr(frame_broker.np, 'copyto', copy_then_overwrite)
+        assert writer.read_latest(np.empty(writer.shape, np.uint8)) is None
+    finally:
+        writer.close()
+
+
+def test_stale_segment_is_replaced(shm_name):
+    stale = SharedFrameRing(shm_name, (2, 2, 3), slots=2, create=True)
+    stale.create = False  # 비정상 종료 - unlink 없이 닫힘
+    stale.close()
+    ring = SharedFrameRing(shm_name, (4, 4, 3), slots=2, create=True)
+    try:
+        assert SharedFrameRing(shm_name).shape == (4, 4, 3)
+    finally:
+        ring.close()
+
+
+def test_detections_are_capped(shm_name):
+    ring = SharedFrameRing(shm_name, (2, 2, 3), slots=2, create=True)
+    try:
+        _publish(ring, 0, n=frame_broker.MAX_DETS + 5)
+        _, dets = ring.read_latest(np.empty(ring.shape, np.uint8))
+        assert len(dets) == frame_broker.MAX_DETS
+    finally:
+        ring.close()
+
+
+def test_default_authkey_only_on_loopback():
+    assert resolve_authkey(('127.0.0.1', 6001)) == frame_broker.DEFAULT_AUTHKEY
+    assert resolve_authkey(('localhost', 6001)) == frame_broker.DEFAULT_AUTHKEY
+    for host in ('0.0.0.0', '192.168.0.10'):
+        with pytest.raises(RuntimeError):
+            resolve_authkey((host, 6001))
+        assert resolve_authkey((host, 6001), 's3cret') == b's3cret'
+
+
+class CountingShared:
+    """매번 새 프레임이 있는 공유 링 (seq만 늘어남)"""
+
+    def __init__(self):
+        self.latest_seq = 0
+
+    def read_latest(self, out, after_seq=0):
+        self.latest_seq += 1
+        out[:] = self.latest_seq % 255
+        return self.latest_seq, Detections.empty()
+
+
+class TinyRing(FrameRing):
+    def acquire_write(self, timeout=1.0):
+        return super().acquire_write(timeout=0.02)
+
+
+def test_pump_skips_frames_while_all_slots_are_leased():
+    client = BrokerClient.__new__(BrokerClient)
+    client.shared = CountingShared()
+    client.ring = TinyRing((2, 2, 3), slots=2)
+    client.poll_interval = 0
+    client.torn_reads = 0
+    client.alive = True
+    slot, _ = client.ring.acquire_write()
+    client.ring.commit(slot)
+    lease = client.ring.lease_latest()
+
+    pump = threading.Thread(target=client._pump, daemon=True)
+    pump.start()
+    try:
+        deadline = time.perf_counter() + 5
+        while client.ring.write_drops < 2 and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        assert client.ring.write_drops >= 2 and pump.is_alive()
+
+        # 임대가 반납되면 다시 프레임을 받음
+        seq = client.ring.seq
+        lease.release()
+        while client.ring.seq <= seq and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        assert client.ring.seq > seq
+    finally:
+        client.alive = False
+        pump.join(timeout=2)
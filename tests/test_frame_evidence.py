@@ -0,0 +1,45 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from inference_worker import Detections, frame_evidence
+
+NAMES = {0: 'sale', 1: 'impossibility'}
+
+
+def _frame(*boxes):
+    """(cls, conf) ... -> Detections"""
+    if not boxes:
+        return Detections.empty()
+    cls, conf = zip(*boxes)
+    return Detections(np.zeros((len(boxes), 4), np.float32), np.array(conf, np.float32), np.array(cls))
+
+
+FRAMES = [_frame((0, 0.9)), _frame((0, 0.3), (1, 0.95)), _frame(), _frame((0, 0.7), (0, 0.8))]
+
+
+def test_per_frame_takes_best_box_of_class():
+    evidence = frame_evidence(FRAMES, NAMES, 'sale', 0.6)
+    assert evidence['per_frame'] == pytest.approx([0.9, 0.3, 0.0, 0.8])
+    assert evidence['frames'] == 4 and evidence['votes'] == 2
+    assert evidence['max'] == pytest.approx(0.9)
+    assert evidence['mean'] == pytest.approx(0.5)
+
+
+def test_vote_needs_half_the_frames():
+    evidence = frame_evidence(FRAMES, NAMES, 'sale', 0.6)
+    assert evidence['detected']
+    assert evidence['confidence'] == pytest.approx(0.85)  # 통과한 프레임 평균
+    assert not frame_evidence(FRAMES, NAMES, 'sale', 0.6, min_votes=3)['detected']
+    assert not frame_evidence(FRAMES, NAMES, 'impossibility', 0.6)['detected']
+
+
+def test_max_and_mean_modes():
+    assert frame_evidence(FRAMES, NAMES, 'impossibility', 0.6, mode='max')['detected']
+    mean = frame_evidence(FRAMES, NAMES, 'sale', 0.6, mode='mean')
+    assert not mean['detected'] and mean['confidence'] == pytest.approx(0.5)
+
+
+def test_no_frames():
+    evidence = frame_evidence([], NAMES, 'sale', 0.6)
+    assert not evidence['detected'] and evidence['frames'] == 0 and evidence['confidence'] == 0.0
@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from frame_ring import FrameRing
+
+
+def _write(ring, value):
+    slot, buf = ring.acquire_write()
+    buf[:] = value
+    return ring.commit(slot)
+
+
+def test_lease_latest_waits_for_newer_frame():
+    ring = FrameRing((2, 2), slots=3)
+    assert ring.lease_latest(0, timeout=0) is None
+    seq = _write(ring, 1)
+    with ring.lease_latest(0, timeout=0) as lease:
+        assert lease.seq == seq and (lease.frame == 1).all()
+        assert not lease.frame.flags.writeable
+    assert ring.lease_latest(seq, timeout=0) is None
+
+    threading.Timer(0.05, _write, (ring, 2)).start()
+    with ring.lease_latest(seq, timeout=2) as lease:
+        assert (lease.frame == 2).all()
+
+
+def test_leased_and_latest_slots_are_not_overwritten():
+    ring = FrameRing((1,), slots=3)
+    _write(ring, 1)
+    lease = ring.lease_latest()
+    # 임대 중인 슬롯과 최신 슬롯을 피해서 씀
+    for value in range(2, 8):
+        _write(ring, value)
+        assert lease.frame[0] == 1
+    lease.release()
+    assert ring.stats()['leased'] == 0
+
+
+def test_writer_times_out_when_every_other_slot_is_leased():
+    ring = FrameRing((1,), slots=2)
+    _write(ring, 1)
+    old = ring.lease_latest()
+    _write(ring, 2)
+    with pytest.raises(TimeoutError):
+        ring.acquire_write(timeout=0.05)
+    old.release()
+    assert ring.acquire_write(timeout=0.05)[0] == old.slot
+
+
+def test_lease_recent_is_oldest_first():
+    ring = FrameRing((1,), slots=4)
+    for value in range(1, 7):
+        _write(ring, value)
+    leases = ring.lease_recent(3)
+    assert [int(lease.frame[0]) for lease in leases] == [4, 5, 6]
+    for lease in leases:
+        lease.release()
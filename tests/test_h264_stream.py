@@ -0,0 +1,118 @@
+import asyncio
+import io
+import os
+import struct
+import threading
+
+from h264_stream import H264Stream, ViewerMeter, read_box
+
+
+def _box(box_type, body=b'xxxx'):
+    return struct.pack('>I4s', 8 + len(body), box_type) + body
+
+
+def test_read_box():
+    large = struct.pack('>I4sQ', 1, b'mdat', 16 + 3) + b'abc'
+    stream = io.BytesIO(_box(b'ftyp') + large + _box(b'moof')[:6])
+    assert read_box(stream) == ('ftyp', _box(b'ftyp'))
+    assert read_box(stream) == ('mdat', large)
+    assert read_box(stream) is None  # 잘린 박스
+
+
+def test_viewer_meter_keeps_closed_connections():
+    meter = ViewerMeter()
+    viewer = meter.connect()
+    meter.add(viewer, 1000)
+    meter.open[viewer][0] -= 2  # 2초 전에 연결
+    assert meter.stats()['viewers'] == 1
+    meter.disconnect(viewer)
+    stats = meter.stats()
+    assert stats['viewers'] == 0 and stats['mean_kbit_s'] == 4.0
+
+
+class FakeEncoder:
+    """ffmpeg 대신 파이프 - 쓰는 쪽이 fMP4 박스를 넣음"""
+
+    def __init__(self):
+        read, write = os.pipe()
+        self.stdout = os.fdopen(read, 'rb')
+        self.stdin = open(os.devnull, 'wb')
+        self.writer = os.fdopen(write, 'wb', buffering=0)
+        self.returncode = 0
+
+    def poll(self):
+        return 0
+
+    def wait(self, timeout=None):
+        return 0
+
+    def kill(self):
+        pass
+
+
+def _stream(max_backlog=2):
+    stream = H264Stream(lambda after_seq, timeout: None, max_backlog=max_backlog, meter=ViewerMeter())
+    proc = FakeEncoder()
+
+    def ensure_running():
+        with stream._cond:
+            stream.proc, stream.running = proc, True
+        threading.Thread(target=stream._read, args=(proc,), daemon=True).start()
+        return True
+
+    stream.ensure_running = ensure_running
+    return stream, proc
+
+
+def test_astream_sends_init_then_fragments():
+    stream, proc = _stream()
+
+    async def main():
+        received = []
+
+        async def viewer():
+            async for chunk in stream.astream():
+                received.append(chunk[4:8])
+
+        task = asyncio.create_task(viewer())
+        await asyncio.sleep(0.05)
+        proc.writer.write(_box(b'ftyp') + _box(b'moov'))
+        for _ in range(2):
+            proc.writer.write(_box(b'moof') + _box(b'mdat'))
+            await asyncio.sleep(0.02)
+        proc.writer.close()
+        await asyncio.wait_for(task, 2)
+        return received
+
+    assert asyncio.run(main()) == [b'ftyp', b'moof', b'moof']
+    assert stream._subscribers == {} and stream.meter.viewers == 0
+
+
+def test_slow_async_viewer_skips_to_latest():
+    stream, proc = _stream(max_backlog=2)
+
+    async def main():
+        received = []
+
+        async def viewer():
+            async for chunk in stream.astream():
+                received.append(chunk)
+                if len(received) == 2:
+                    await asyncio.sleep(0.3)  # 느린 client
+
+        task = asyncio.create_task(viewer())
+        await asyncio.sleep(0.05)
+        proc.writer.write(_box(b'ftyp') + _box(b'moov'))
+        for i in range(8):
+            proc.writer.write(_box(b'moof', bytes([i]) * 4) + _box(b'mdat'))
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(0.4)
+        proc.writer.close()
+        await asyncio.wait_for(task, 2)
+        return received
+
+    received = asyncio.run(main())
+    assert stream.skipped > 0
+    # 마지막 fragment는 반드시 받음
+    assert received[-1][8:12] == bytes([7]) * 4
+    assert len(received) < 9
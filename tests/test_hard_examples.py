@@ -0,0 +1,134 @@
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+cv2 = pytest.importorskip('cv2')
+
+from hard_examples import HardExampleHarvester, class_map, uncertain, yolo_labels
+from image_hash import HashIndex, hamming, phash
+from inference_worker import Detections
+
+NAMES = {0: 'mounting', 1: 'sale', 2: 'impossibility'}
+
+
+def _scene(seed, size=(240, 320)):
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 255, (12, 16, 3), dtype=np.uint8)
+    return cv2.resize(small, size[::-1], interpolation=cv2.INTER_CUBIC)
+
+
+def _dets(*boxes):
+    """(cls, conf, (x1, y1, x2, y2)) ..."""
+    cls, conf, xyxy = zip(*boxes)
+    return Detections(np.array(xyxy, np.float32), np.array(conf, np.float32), np.array(cls))
+
+
+# ===== pHash / HashIndex =====
+
+def test_phash_is_stable_under_small_changes():
+    frame = _scene(0)
+    noisy = cv2.add(frame, np.full_like(frame, 12))
+    noisy = cv2.imdecode(cv2.imencode('.jpg', noisy, [cv2.IMWRITE_JPEG_QUALITY, 60])[1], cv2.IMREAD_COLOR)
+    assert hamming(phash(frame), phash(noisy)) <= 6
+    assert phash(frame) == phash(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    assert hamming(phash(frame), phash(_scene(1))) > 12
+
+
+def test_hash_index_matches_brute_force():
+    rng = random.Random(0)
+    base = [rng.getrandbits(64) for _ in range(50)]
+    hashes = base + [h ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)) for h in base]
+    index = HashIndex(max_dist=6)
+    for key, h in enumerate(hashes):
+        index.add(key, h)
+    for h in hashes[:20] + [rng.getrandbits(64) for _ in range(20)]:
+        expected = sorted((hamming(h, other), key) for key, other in enumerate(hashes) if hamming(h, other) <= 6)
+        assert sorted(index.query(h)) == expected
+        assert sorted(index.query(h, max_dist=1)) == [e for e in expected if e[0] <= 1]
+
+
+def test_hash_index_add_replace_remove():
+    index = HashIndex(max_dist=2)
+    index.add('a', 0b1111)
+    index.add('a', 0)  # 같은 key -> 교체
+    assert len(index) == 1 and index.nearest(0b1) == (1, 'a')
+    index.remove('a')
+    index.remove('missing')
+    assert 'a' not in index and index.nearest(0) is None
+    assert all(not table for table in index._tables)
+
+
+# ===== 라벨 =====
+
+def test_uncertain_uses_margin_around_threshold():
+    dets = _dets((1, 0.55, (0, 0, 1, 1)), (1, 0.62, (0, 0, 1, 1)), (0, 0.95, (0, 0, 1, 1)))
+    assert uncertain(dets, NAMES, {'sale': 0.6}, margin=0.1) == pytest.approx(0.62)
+    assert uncertain(dets, NAMES, {'mounting': 0.6}, margin=0.1) is None
+
+
+def test_class_map_by_name():
+    realtime = {0: 'mounting'}
+    ondemand = {0: 'impossibility', 1: 'sale', 2: 'mounting'}
+    assert class_map(realtime, ondemand) == {0: 2}
+    assert class_map(ondemand, realtime) == {2: 0}
+    assert class_map(realtime, {}) == {0: 0}
+
+
+def test_yolo_labels_normalizes_and_remaps():
+    dets = _dets((0, 0.9, (0, 0, 160, 120)), (1, 0.1, (0, 0, 10, 10)))
+    assert yolo_labels(dets, (240, 320), min_conf=0.25) == ['0 0.250000 0.250000 0.500000 0.500000']
+    assert yolo_labels(dets, (240, 320), ids={0: 5})[0].startswith('5 ')
+    # 라벨 공간에 없는 클래스가 확실하게 보이면 반쪽 라벨 대신 None
+    assert yolo_labels(dets, (240, 320), min_conf=0.05, ids={0: 5}) is None
+
+
+# ===== harvester =====
+
+@pytest.fixture
+def harvester(tmp_path):
+    harvester = HardExampleHarvester(tmp_path, names=NAMES, min_interval_s=0, margin=0.1)
+    yield harvester
+    harvester.close()
+
+
+def test_harvester_saves_uncertain_frames_once_per_scene(harvester, tmp_path):
+    near = _dets((1, 0.58, (10, 10, 50, 50)))
+    assert not harvester.offer(_scene(0), _dets((1, 0.95, (0, 0, 5, 5))), NAMES, {'sale': 0.6}, 'ondemand')
+    assert harvester.offer(_scene(0), near, NAMES, {'sale': 0.6}, 'ondemand')
+    assert harvester.offer(_scene(0), near, NAMES, {'sale': 0.6}, 'ondemand')
+    assert harvester.offer(_scene(1), near, NAMES, {'sale': 0.6}, 'ondemand')
+    harvester.close()  # 큐를 다 저장할 때까지 기다림
+    assert harvester.counts['written'] == 2 and harvester.counts['duplicates'] == 1
+    labels = sorted((tmp_path / 'labels').iterdir())
+    assert [p.read_text().split()[0] for p in labels] == ['1', '1']
+    assert 'names:' in (tmp_path / 'data.yaml').read_text()
+
+
+def test_harvester_remaps_other_model_and_drops_unmappable(harvester, tmp_path):
+    realtime = {0: 'mounting', 1: 'shelf'}
+    assert harvester.offer(_scene(2), _dets((0, 0.55, (10, 10, 50, 50))), realtime, {'mounting': 0.6}, 'realtime')
+    assert harvester.offer(_scene(3), _dets((0, 0.55, (0, 0, 9, 9)), (1, 0.9, (0, 0, 9, 9))),
+                           realtime, {'mounting': 0.6}, 'realtime')
+    harvester.close()  # 큐를 다 저장할 때까지 기다림
+    assert harvester.counts['written'] == 1 and harvester.counts['unmapped'] == 1
+    (label,) = (tmp_path / 'labels').iterdir()
+    assert label.read_text().startswith('0 ')
+
+
+def test_harvester_quota_and_restart(tmp_path):
+    harvester = HardExampleHarvester(tmp_path, names=NAMES, min_interval_s=0)
+    near = _dets((1, 0.6, (10, 10, 50, 50)))
+    for seed in range(4):
+        harvester.offer(_scene(seed), near, NAMES, {'sale': 0.6}, 'ondemand')
+    harvester.close()
+    assert harvester.counts['written'] == 4
+    one = harvester.bytes / 4
+    oldest = harvester._files[0][0]
+
+    restarted = HardExampleHarvester(tmp_path, names=NAMES, quota_bytes=int(one * 2.5), min_interval_s=0)
+    assert len(restarted.index) == 4
+    assert restarted.evict() == 2
+    assert oldest not in restarted.index
+    assert len(list((tmp_path / 'images').iterdir())) == 2
+    restarted.close()
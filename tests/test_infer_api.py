@@ -0,0 +1,138 @@
+import importlib.util
+import io
+from concurrent.futures import Future
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip('numpy')
+cv2 = pytest.importorskip('cv2')
+
+import infer_api
+from inference_worker import PRIORITY_BATCH, Detections
+
+SERVER = Path(__file__).resolve().parent.parent / 'detection streaming server.py'
+
+
+class FakeWorker:
+    """submit된 프레임 크기를 기록하고 프레임마다 박스 2개 (conf 0.9 / 0.1) 를 돌려줌"""
+
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, frame, priority, model=None, **opts):
+        self.calls.append((frame.shape, priority, model))
+        h, w = frame.shape[:2]
+        future = Future()
+        future.set_result(Detections(np.array([[1, 2, w - 1, h - 2], [0, 0, 5, 5]], np.float32),
+                                     np.array([0.9, 0.1], np.float32), np.array([0, 1])))
+        return future
+
+
+class FakeDetector:
+    def __init__(self):
+        self.worker = FakeWorker()
+        names = {0: 'sale', 1: 'impossibility'}
+        self.managers = {'ondemand': SimpleNamespace(names=names), 'realtime': SimpleNamespace(names=names)}
+
+    def submit_images(self, blobs, model):
+        return infer_api.submit_images(self.worker, blobs, model, {})
+
+
+def _jpeg(h, w):
+    ok, data = cv2.imencode('.jpg', np.full((h, w, 3), 90, np.uint8))
+    return data.tobytes()
+
+
+@pytest.fixture(params=['flask', 'asgi'])
+def client(request, monkeypatch):
+    """같은 시나리오를 두 서버 모드에 -> (post(path, **kwargs) -> (status, json), detector)"""
+    detector = FakeDetector()
+    if request.param == 'flask':
+        pytest.importorskip('flask')
+        spec = importlib.util.spec_from_file_location('streaming_server_infer', SERVER)
+        server = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(server)
+        monkeypatch.setattr(server, 'detector', detector)
+        flask_client = server.app.test_client()
+
+        def post(path, files=None, body=None, content_type='image/jpeg'):
+            if files is not None:
+                data = {'images': [(io.BytesIO(blob), name) for name, blob in files]}
+                r = flask_client.post(path, data=data, content_type='multipart/form-data')
+            else:
+                r = flask_client.post(path, data=body, content_type=content_type)
+            return r.status_code, r.json
+        yield post, detector
+        return
+
+    pytest.importorskip('starlette')
+    pytest.importorskip('httpx')
+    pytest.importorskip('multipart')
+    from starlette.testclient import TestClient
+
+    from asgi_server import create_app
+    app = create_app(get_detector=lambda: detector, messages=[], lease_frame=lambda timeout=0: None,
+                     health_payload=lambda: {'ready': True}, status_payload=lambda: {})
+    with TestClient(app) as test_client:
+        def post(path, files=None, body=None, content_type='image/jpeg'):
+            if files is not None:
+                r = test_client.post(path, files=[('images', (name, blob, 'image/jpeg')) for name, blob in files])
+            else:
+                r = test_client.post(path, content=body, headers={'Content-Type': content_type})
+            return r.status_code, r.json()
+        yield post, detector
+
+
+def test_multipart_images_with_decode_error(client):
+    post, detector = client
+    status, body = post('/infer?conf=0.5', files=[('a.jpg', _jpeg(48, 64)), ('broken.jpg', b'not a jpeg'),
+                                                  ('b.jpg', _jpeg(30, 20))])
+    assert status == 200 and body['success']
+    assert body['fields'] == infer_api.FIELDS
+    assert body['names'] == {'0': 'sale', '1': 'impossibility'}
+    a, broken, b = body['images']
+    # conf 0.5 미만 박스는 빠지고, 디코딩 못 한 이미지만 error
+    assert a == {'name': 'a.jpg', 'size': [64, 48], 'boxes': [[1.0, 2.0, 63.0, 46.0, 0.9, 0]]}
+    assert broken == {'name': 'broken.jpg', 'error': '이미지를 디코딩할 수 없습니다'}
+    assert b['size'] == [20, 30] and len(b['boxes']) == 1
+    assert [call[1:] for call in detector.worker.calls] == [(PRIORITY_BATCH, 'ondemand')] * 2
+
+
+def test_raw_body_image(client):
+    post, detector = client
+    status, body = post('/infer?model=realtime', body=_jpeg(16, 24))
+    assert status == 200
+    assert [image['name'] for image in body['images']] == ['body']
+    assert len(body['images'][0]['boxes']) == 1  # 기본 conf 0.25 -> 0.1 박스는 빠짐
+    assert detector.worker.calls == [((16, 24, 3), PRIORITY_BATCH, 'realtime')]
+
+
+@pytest.mark.parametrize('path, status', [('/infer?model=nope', 400), ('/infer?conf=abc', 400)])
+def test_bad_options(client, path, status):
+    post, _ = client
+    code, body = post(path, body=_jpeg(8, 8))
+    assert code == status and not body['success']
+
+
+def test_empty_request(client):
+    post, _ = client
+    code, body = post('/infer', body=b'')
+    assert code == 400 and '이미지가 없습니다' in body['message']
+
+
+def test_too_many_images_is_413(client, monkeypatch):
+    post, detector = client
+    monkeypatch.setattr(infer_api, 'MAX_IMAGES', 2)
+    code, body = post('/infer', files=[(f'{i}.jpg', _jpeg(8, 8)) for i in range(3)])
+    assert code == 413 and '최대 2장' in body['message']
+    assert detector.worker.calls == []
+
+
+def test_too_large_body_is_413(client, monkeypatch):
+    post, detector = client
+    monkeypatch.setattr(infer_api, 'MAX_BYTES', 1024)
+    code, body = post('/infer', body=b'\xff' * 2048)
+    assert code == 413 and not body['success']
+    assert detector.worker.calls == []
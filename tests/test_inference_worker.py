@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from inference_worker import MAX_WAIT_S, PRIORITY_BATCH, PRIORITY_ONDEMAND, PRIORITY_REALTIME, InferenceWorker
+
+
+class GatedModel:
+    """detect()가 gate가 열릴 때까지 막힘 - 그동안 요청을 쌓아서 배치를 만듦"""
+
+    def __init__(self, fail=False):
+        self.gate = threading.Event()
+        self.entered = threading.Event()
+        self.calls = []
+        self.fail = fail
+
+    def detect(self, frames, **kwargs):
+        self.entered.set()
+        self.gate.wait(5)
+        self.calls.append((list(frames), kwargs))
+        if self.fail:
+            raise ValueError('boom')
+        return [frame * 10 for frame in frames]
+
+
+@pytest.fixture
+def model():
+    return GatedModel()
+
+
+@pytest.fixture
+def worker(model):
+    worker = InferenceWorker(model, batch_window_ms=0, max_batch=8)
+    yield worker
+    model.gate.set()
+    worker.stop()
+
+
+def _block(worker, model):
+    """첫 요청으로 추론 스레드를 detect()에 묶어 둠"""
+    first = worker.submit(0)
+    assert model.entered.wait(2)
+    return first
+
+
+def test_queued_requests_are_batched_by_priority(worker, model):
+    first = _block(worker, model)
+    realtime = worker.submit(1, PRIORITY_REALTIME)
+    ondemand = worker.submit(2, PRIORITY_ONDEMAND)
+    model.gate.set()
+    assert first.result(2) == 0
+    assert (ondemand.result(2), realtime.result(2)) == (20, 10)
+    # 쌓여 있던 두 요청은 한 번에, 온디맨드가 먼저
+    assert model.calls[1][0] == [2, 1]
+
+
+def test_realtime_is_not_starved_by_later_batch_requests(worker, model):
+    first = _block(worker, model)
+    realtime = worker.submit(1, PRIORITY_REALTIME, imgsz=320)
+    time.sleep(MAX_WAIT_S[PRIORITY_REALTIME] - MAX_WAIT_S[PRIORITY_BATCH] + 0.02)
+    batch = [worker.submit(i, PRIORITY_BATCH, imgsz=640) for i in range(2, 4)]
+    model.gate.set()
+    assert realtime.result(2) == 10 and [f.result(2) for f in batch] == [20, 30]
+    # 마감이 지난 실시간 프레임이 나중에 온 외부 요청보다 먼저
+    assert model.calls[1][1] == {'imgsz': 320}
+
+
+def test_different_options_are_not_mixed(worker, model):
+    first = _block(worker, model)
+    a = worker.submit(1, imgsz=320)
+    b = worker.submit(2, imgsz=640)
+    model.gate.set()
+    assert (first.result(2), a.result(2), b.result(2)) == (0, 10, 20)
+    assert sorted(call[1].get('imgsz', 0) for call in model.calls) == [0, 320, 640]
+
+
+def test_cancelled_request_does_not_fail_batch(worker, model):
+    first = _block(worker, model)
+    futures = [worker.submit(i) for i in range(1, 4)]
+    assert futures[1].cancel()
+    model.gate.set()
+    assert first.result(2) == 0
+    assert futures[0].result(2) == 10 and futures[2].result(2) == 30
+    # 취소된 프레임은 추론하지 않음
+    assert model.calls[1][0] == [1, 3]
+
+
+def test_exception_reaches_every_caller():
+    model = GatedModel(fail=True)
+    worker = InferenceWorker(model, batch_window_ms=0)
+    first = _block(worker, model)
+    second = worker.submit(1)
+    model.gate.set()
+    for future in (first, second):
+        with pytest.raises(ValueError):
+            future.result(2)
+    worker.stop()
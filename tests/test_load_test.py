@@ -0,0 +1,32 @@
+import time
+
+import pytest
+
+from load_test import CLIENT_TIMEOUT, Recorder, _failure, percentile
+
+
+def test_percentile():
+    assert percentile([], 0.5) is None
+    assert percentile([3, 1, 2], 0.5) == 2
+    assert percentile(list(range(100)), 0.99) == 99
+
+
+def test_failures_count_in_latency():
+    recorder = Recorder()
+    for _ in range(8):
+        recorder.record('/health', 10.0, 200)
+    recorder.record('/health', *_failure(TimeoutError(), time.perf_counter()))
+    recorder.record('/health', *_failure(ConnectionRefusedError(), time.perf_counter() - 0.05))
+
+    row = recorder.summary(duration=10)['/health']
+    assert row['requests'] == 10 and row['rps'] == 1.0 and row['errors'] == 2
+    assert row['codes'] == {'200': 8, 'timeout': 1, 'ConnectionRefusedError': 1}
+    assert row['p90_ms'] == CLIENT_TIMEOUT * 1000
+    assert row['max_ms'] == CLIENT_TIMEOUT * 1000
+    assert row['p50_ms'] == 10.0
+
+
+def test_failure_keeps_longer_elapsed_time():
+    ms, code, error = _failure(TimeoutError(), time.perf_counter() - CLIENT_TIMEOUT - 1)
+    assert error == 'timeout' and code is None
+    assert ms == pytest.approx((CLIENT_TIMEOUT + 1) * 1000, rel=0.01)
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+import model_manager
+from model_manager import ModelManager, admin_authorized, check_reload_path
+
+
+class FakeModel:
+    """ultralytics YOLO 대신 - 호출하면 실패하거나 빈 결과"""
+
+    def __init__(self, path, names=None, fail=False):
+        self.path = path
+        self.names = names or {0: 'sale'}
+        self.fail = fail
+
+    def __call__(self, frame, **kwargs):
+        if self.fail:
+            raise RuntimeError('candidate failed')
+        return []
+
+
+@pytest.fixture
+def manager(monkeypatch, tmp_path):
+    monkeypatch.setattr(model_manager, 'direct_predictor', lambda model: None)
+    return ModelManager(str(tmp_path / 'live.pt'), loader=FakeModel)
+
+
+def test_admin_token(monkeypatch):
+    monkeypatch.setattr(model_manager, 'ADMIN_TOKEN', None)
+    assert not admin_authorized({'X-Admin-Token': ''})
+    monkeypatch.setattr(model_manager, 'ADMIN_TOKEN', 's3cret')
+    assert admin_authorized({'Authorization': 'Bearer s3cret'})
+    assert admin_authorized({'X-Admin-Token': 's3cret'})
+    assert not admin_authorized({'Authorization': 'Bearer wrong'})
+    assert not admin_authorized({})
+
+
+def test_reload_path_must_be_under_root(monkeypatch, tmp_path):
+    monkeypatch.setattr(model_manager, 'RELOAD_ROOT', tmp_path / 'runs')
+    inside = tmp_path / 'runs' / 'detect' / 'exp' / 'weights' / 'best.pt'
+    assert check_reload_path(str(inside)) == str(inside)
+    assert check_reload_path(None) is None
+    for path in ('/etc/passwd', str(tmp_path / 'runs' / '..' / 'x.pt'), str(tmp_path / 'runs')):
+        with pytest.raises(PermissionError):
+            check_reload_path(path)
+
+
+def test_reload_swaps_and_rejects_other_classes(manager, tmp_path):
+    new = tmp_path / 'new.pt'
+    new.write_bytes(b'')
+    state = manager.reload(str(new), wait=True)
+    assert state['state'] == 'ready' and manager.model.path == str(new) and manager.version == 2
+
+    manager.loader = lambda path: FakeModel(path, names={0: 'other'})
+    assert manager.reload(str(new), wait=True)['state'] == 'failed'
+    assert manager.version == 2
+    with pytest.raises(FileNotFoundError):
+        manager.reload(str(tmp_path / 'missing.pt'))
+
+
+def test_shadow_errors_are_counted(manager):
+    manager.start_shadow(FakeModel('cand.pt', fail=True), 'cand.pt', sample_rate=1.0)
+    for _ in range(2):
+        manager._shadow_queue.put((np.zeros((4, 4, 3), np.uint8), None, 1.0, {}), timeout=2)
+    deadline = time.time() + 2
+    while manager.shadow_stats.errors < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    shadow = manager.status()['shadow']
+    assert shadow['errors'] == 2 and 'candidate failed' in shadow['last_error']
+    assert manager._shadow_thread.is_alive()
+    assert manager.promote() and manager.shadow is None and manager.model_path == 'cand.pt'
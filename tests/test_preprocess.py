@@ -0,0 +1,120 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+from preprocess import CanvasPreprocessor, DirectPredictor, Preprocessor, letterbox_geometry
+
+SHAPES = [(720, 1280, 3), (1080, 1920, 3), (480, 640, 3), (640, 480, 3), (1000, 1001, 3), (333, 777, 3)]
+
+
+@pytest.mark.parametrize('shape, imgsz, expected', [
+    ((720, 1280, 3), 640, (0.5, (360, 640), (12, 0), (384, 640))),
+    ((480, 640, 3), 640, (1.0, (480, 640), (0, 0), (480, 640))),
+    ((1080, 1920, 3), 320, (1 / 6, (180, 320), (6, 0), (192, 320))),
+    ((640, 480, 3), 640, (1.0, (640, 480), (0, 0), (640, 480))),
+])
+def test_known_geometry(shape, imgsz, expected):
+    r, *rest = letterbox_geometry(shape, imgsz)
+    assert r == pytest.approx(expected[0])
+    assert tuple(rest) == expected[1:]
+
+
+@pytest.mark.parametrize('shape', SHAPES)
+@pytest.mark.parametrize('imgsz', [320, 480, 640])
+def test_output_is_stride_aligned(shape, imgsz):
+    r, (new_h, new_w), (top, left), (out_h, out_w) = letterbox_geometry(shape, imgsz)
+    assert max(out_h, out_w) == imgsz
+    assert out_h % 32 == 0 and out_w % 32 == 0
+    assert 0 <= top <= out_h - new_h and 0 <= left <= out_w - new_w
+
+
+@pytest.mark.parametrize('shape', SHAPES)
+@pytest.mark.parametrize('imgsz', [320, 640])
+def test_matches_ultralytics_letterbox(shape, imgsz):
+    augment = pytest.importorskip('ultralytics.data.augment')
+    image = np.random.default_rng(0).integers(0, 255, shape, dtype=np.uint8)
+    out = augment.LetterBox((imgsz, imgsz), auto=True, stride=32)(image=image)
+    _, (new_h, new_w), (top, left), out_shape = letterbox_geometry(shape, imgsz)
+    assert out.shape[:2] == out_shape
+    # 패딩 경계 - 위/왼쪽 패딩은 114, 그 안쪽부터 이미지
+    if top:
+        assert (out[top - 1, left:left + new_w] == 114).all()
+    if left:
+        assert (out[top:top + new_h, left - 1] == 114).all()
+
+
+def test_canvas_matches_per_shape_preprocessing_and_maps_boxes_back():
+    torch = pytest.importorskip('torch')
+    rng = np.random.default_rng(1)
+    frames = [rng.integers(0, 255, shape, dtype=np.uint8) for shape in SHAPES[:4]]
+    canvas = CanvasPreprocessor(320, max_batch=2)
+    x = canvas(frames)
+    # 가로 사진 (192x320) 과 세로 사진 (320x256) -> 둘 다 들어가는 320x320
+    assert x.shape == (4, 3, 320, 320) and x.is_contiguous()
+
+    for i, frame in enumerate(frames):
+        rect = Preprocessor(frame.shape, 320, max_batch=1)
+        image = rect([frame])[0, :, rect.top:rect.top + rect.new_h, rect.left:rect.left + rect.new_w]
+        top, left = (320 - rect.new_h) // 2, (320 - rect.new_w) // 2
+        # 같은 리사이즈 결과, 놓이는 위치만 다름
+        assert torch.allclose(x[i, :, top:top + rect.new_h, left:left + rect.new_w], image, atol=1e-6)
+        assert float(x[i].min()) >= 0 and (top == 0 or float(x[i, 0, top - 1, left]) == pytest.approx(114 / 255))
+        # 캔버스 위 이미지 모서리 -> 원본 프레임 모서리
+        h, w = frame.shape[:2]
+        box = np.array([[left, top, left + rect.new_w, top + rect.new_h]], np.float32)
+        assert canvas.scale_back(box, i) == pytest.approx(np.array([[0, 0, w, h]]), abs=1)
+
+
+def test_canvas_keeps_rect_shape_when_aspect_ratios_match():
+    pytest.importorskip('torch')
+    frames = [np.zeros((720, 1280, 3), np.uint8), np.zeros((360, 640, 3), np.uint8),
+              np.zeros((1080, 1920, 3), np.uint8)]
+    assert CanvasPreprocessor(320)(frames).shape == (3, 3, 192, 320)
+
+
+def test_canvas_repaints_slots_when_layout_changes():
+    pytest.importorskip('torch')
+    canvas = CanvasPreprocessor(64, max_batch=2)
+    white = np.full((64, 64, 3), 255, np.uint8)
+    canvas([white, white])
+    x = canvas([np.full((32, 64, 3), 255, np.uint8)])
+    assert x.shape == (1, 3, 32, 64) and float(x.min()) == pytest.approx(1.0)
+    # 모양이 다른 캔버스에서 썼던 슬롯도 패딩이 남아 있지 않아야 함
+    x = canvas([np.full((32, 64, 3), 255, np.uint8), np.full((16, 64, 3), 255, np.uint8)])
+    assert x.shape == (2, 3, 32, 64)
+    assert float(x[1, 0, 7, 0]) == pytest.approx(114 / 255) and float(x[1, 0, 8:24].min()) == pytest.approx(1.0)
+    assert float(x[1, 0, 24, 0]) == pytest.approx(114 / 255)
+    assert float(x[0].min()) == pytest.approx(1.0)
+
+
+@pytest.fixture(scope='module')
+def direct():
+    ultralytics = pytest.importorskip('ultralytics')
+    yolo = ultralytics.YOLO('yolov8n.yaml')
+    return DirectPredictor(yolo, device='cpu', max_batch=4, cache_size=3)
+
+
+def test_preprocessor_cache_stays_bounded(direct):
+    direct._pre.clear()
+    for i in range(10):
+        direct(np.zeros((40 + 8 * i, 64, 3), np.uint8), imgsz=64)
+    assert len(direct._pre) == 3
+    # 가장 최근 크기만 남음 (LRU)
+    assert [shape for _, shape in direct._pre] == [(96, 64), (104, 64), (112, 64)]
+
+    # 다시 쓴 크기는 뒤로 가서 살아남음
+    direct(np.zeros((96, 64, 3), np.uint8), imgsz=64)
+    direct(np.zeros((200, 64, 3), np.uint8), imgsz=64)
+    assert [shape for _, shape in direct._pre] == [(112, 64), (96, 64), (200, 64)]
+
+
+def test_mixed_sizes_run_as_one_forward(direct, monkeypatch):
+    calls = []
+    net = direct.net
+    monkeypatch.setattr(direct, 'net', lambda x: calls.append(tuple(x.shape)) or net(x))
+    frames = [np.zeros(shape, np.uint8) for shape in [(720, 1280, 3), (480, 640, 3), (640, 480, 3)]]
+    detections = direct(frames, imgsz=64)
+    assert len(detections) == 3
+    assert calls == [(3, 3, 64, 64)]
+    assert direct.stats()['buffers'][-1]['frame'] == 'mixed'
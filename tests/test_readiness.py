@@ -0,0 +1,40 @@
+import time
+
+import pytest
+
+from readiness import Readiness
+
+
+def test_phases_and_timings():
+    readiness = Readiness(t0=time.perf_counter())
+    assert readiness.phase == 'starting' and not readiness.ready
+
+    readiness.set_phase('loading')
+    time.sleep(0.01)
+    readiness.mark('model_load')
+    readiness.set_phase('warming')
+    readiness.mark('warmup')
+    readiness.set_phase('ready')
+    assert readiness.ready
+
+    state = readiness.to_dict()
+    assert state['phase'] == 'ready' and state['error'] is None
+    assert list(state['startup_ms']) == ['model_load', 'warmup']
+    assert state['startup_ms']['model_load'] >= 10
+    since = state['since_start_ms']
+    assert since['loading'] <= since['warming'] <= since['ready']
+
+
+def test_failed_phase_keeps_error_and_first_milestone():
+    readiness = Readiness()
+    readiness.set_phase('loading')
+    first = readiness.milestones['loading']
+    readiness.set_phase('failed', 'weights not found')
+    readiness.set_phase('loading')
+    assert readiness.milestones['loading'] == first
+
+    readiness.set_phase('failed', 'weights not found')
+    state = readiness.to_dict()
+    assert state['phase'] == 'failed' and not state['ready'] and state['error'] == 'weights not found'
+    with pytest.raises(AssertionError):
+        readiness.set_phase('unknown')
@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip('yaml')
+
+from run_index import RunIndex
+
+
+def _run(name, best, latency=None, weights=True, final=None):
+    return {'name': name, 'best_map50_95': best, 'best_map50': best, 'final_map50_95': final,
+            'cpu_latency_ms': latency, 'weights': f'{name}/best.pt' if weights else None}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = RunIndex(tmp_path)
+    index.runs = {r['name']: r for r in [
+        _run('small', 0.50, latency=20.0),
+        _run('medium', 0.60, latency=45.0),
+        _run('large', 0.70, latency=None),
+        _run('no_weights', 0.90, latency=5.0, weights=False),
+        _run('unfinished', None, latency=1.0),
+    ]}
+    return index
+
+
+def test_select_best_map(index):
+    assert index.select()['name'] == 'large'
+
+
+def test_select_under_latency_ignores_unmeasured(index):
+    assert index.select(max_latency_ms=50)['name'] == 'medium'
+    assert index.select(max_latency_ms=30)['name'] == 'small'
+    assert index.select(max_latency_ms=10) is None
+
+
+def test_select_without_weights(index):
+    assert index.select(require_weights=False)['name'] == 'no_weights'
+
+
+def test_select_policy_key(index):
+    index.runs['small']['final_map50_95'] = 0.4
+    assert index.select('final-map50-95')['name'] == 'small'
+    with pytest.raises(KeyError):
+        index.select('unknown')
+
+
+def test_save_and_reload(index, tmp_path):
+    index.save()
+    assert RunIndex(tmp_path).runs == index.runs
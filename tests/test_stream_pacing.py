@@ -0,0 +1,81 @@
+import pytest
+
+pytest.importorskip('cv2')
+
+from stream_pacing import PROFILES, UPGRADE_AFTER_S, ClientPacer, StreamClients, mjpeg_part
+
+
+def _send(pacer, now, write_s, lag_s=None):
+    """now에 쓰기 시작해서 write_s 동안 막힘"""
+    start = now
+    done = now + write_s
+    pacer.record(done - (lag_s if lag_s is not None else write_s), start, done, 1000)
+    return done
+
+
+def test_single_slow_frame_is_ignored():
+    pacer = ClientPacer(1, 'mjpeg', max_lag_ms=500)
+    _send(pacer, 0.0, 0.001)
+    _send(pacer, 1.0, 0.2)
+    assert pacer.level == 0
+
+
+def test_sustained_backpressure_downgrades_one_level_at_a_time():
+    pacer = ClientPacer(1, 'mjpeg', max_lag_ms=500)
+    now = 0.0
+    for _ in range(4):
+        now = _send(pacer, now, 0.2)
+    assert pacer.level == 2 and pacer.downgrades == 2
+    assert pacer.profile == PROFILES[2]
+
+
+def test_lag_alone_downgrades():
+    pacer = ClientPacer(1, 'mjpeg', max_lag_ms=100)
+    _send(pacer, 0.0, 0.001, lag_s=0.3)
+    _send(pacer, 0.1, 0.001, lag_s=0.3)
+    assert pacer.level == 1
+
+
+def test_upgrade_after_quiet_period():
+    pacer = ClientPacer(1, 'mjpeg', level=2)
+    pacer._changed = 0.0
+    _send(pacer, 1.0, 0.001)
+    assert pacer.level == 2
+    _send(pacer, UPGRADE_AFTER_S + 1, 0.001)
+    assert pacer.level == 1 and pacer.upgrades == 1
+    # 바로 또 올리지 않음
+    _send(pacer, UPGRADE_AFTER_S + 1.1, 0.001)
+    assert pacer.level == 1
+
+
+def test_delay_subtracts_write_time():
+    pacer = ClientPacer(1, 'mjpeg')
+    assert pacer.delay(0.0) == 0.0
+    _send(pacer, 10.0, 0.01)
+    assert pacer.delay(10.01) == pytest.approx(1 / 30 - 0.01)
+    assert pacer.delay(11.0) == 0.0
+
+
+def test_skipped_frames_and_stats():
+    pacer = ClientPacer(1, 'mjpeg')
+    pacer.record(0.0, 0.0, 0.01, 500, skipped=3)
+    pacer.record(0.1, 0.1, 0.11, 500, skipped=-1)
+    stats = pacer.to_dict()
+    assert stats['skipped'] == 3 and stats['frames'] == 2 and stats['fps'] == 30
+
+
+def test_clients_levels_by_kind():
+    clients = StreamClients()
+    a = clients.connect('mjpeg')
+    b = clients.connect('mjpeg-asgi')
+    b.level = 3
+    assert clients.levels() == {0, 3}
+    assert clients.levels('mjpeg-asgi') == {3}
+    clients.disconnect(b)
+    assert clients.levels() == {0} and len(clients.stats()['clients']) == 1
+    assert a.sock is None
+
+
+def test_mjpeg_part_has_length():
+    part = mjpeg_part(b'abc')
+    assert part.startswith(b'--frame\r\n') and b'Content-Length: 3\r\n\r\nabc\r\n' in part
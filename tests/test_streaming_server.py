@@ -0,0 +1,146 @@
+import importlib.util
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+pytest.importorskip('flask')
+
+from camera_source import ReplaySource
+from frame_ring import FrameRing
+from readiness import Readiness
+
+SERVER = Path(__file__).resolve().parent.parent / 'detection streaming server.py'
+
+
+@pytest.fixture(scope='module')
+def server():
+    # 파일 이름에 공백이 있어서 import 문으로는 못 읽음 (import만으로는 서버/카메라가 시작되지 않음)
+    spec = importlib.util.spec_from_file_location('streaming_server', SERVER)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TinyRing(FrameRing):
+    """슬롯 2개 + 짧은 쓰기 timeout - 임대가 하나만 남아 있어도 쓰기가 밀림"""
+
+    def __init__(self, shape):
+        super().__init__(shape, slots=2)
+
+    def acquire_write(self, timeout=1.0):
+        return super().acquire_write(timeout=0.02)
+
+
+def test_capture_loop_drops_frame_when_all_slots_are_leased(server, monkeypatch):
+    frames = [np.full((8, 8, 3), i, np.uint8) for i in range(10)]
+    monkeypatch.setattr(server, 'open_source', lambda: ReplaySource(frames, fps=0, loop=False))
+    monkeypatch.setattr(server, 'FrameRing', TinyRing)
+    monkeypatch.setattr(server, 'HEADLESS', True)
+    monkeypatch.setattr(server, 'frame_ring', None)
+
+    seen, held = [], []
+
+    def detect_realtime(frame):
+        seen.append(int(frame[0, 0, 0]))
+        if len(seen) == 3:
+            # 느린 viewer처럼 최신 슬롯을 잡고 있다가 나중에 반납
+            held.append(server.frame_ring.lease_latest(timeout=0))
+            threading.Timer(0.2, held[0].release).start()
+
+    detector = server.YOLODetectorWithStreaming.__new__(server.YOLODetectorWithStreaming)
+    detector.camera_running = True
+    detector.detect_realtime = detect_realtime
+    thread = threading.Thread(target=detector.run_camera, daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+
+    # 캡처 스레드가 죽지 않고 소스 끝까지 진행
+    assert not thread.is_alive()
+    assert seen == list(range(10))
+    assert server.frame_ring.write_drops >= 1
+    assert server.frame_ring.stats()['write_drops'] == server.frame_ring.write_drops
+
+
+def test_stream_lease_waits_for_the_ring_to_appear(server, monkeypatch):
+    monkeypatch.setattr(server, 'frame_ring', None)
+    assert server.lease_stream_frame(0, timeout=0.05) is None
+
+    ring = FrameRing((4, 4, 3), slots=3)
+    slot, buf = ring.acquire_write()
+    buf[:] = 7
+    ring.commit(slot)
+    # 카메라 스레드가 첫 프레임을 읽고 링을 만드는 시점
+    threading.Timer(0.1, lambda: setattr(server, 'frame_ring', ring)).start()
+    started = time.perf_counter()
+    lease = server.lease_stream_frame(0, timeout=2.0)
+    assert lease is not None and time.perf_counter() - started < 1.5
+    with lease:
+        assert int(lease.frame[0, 0, 0]) == 7
+
+
+class FakeManager:
+    def __init__(self, seen, readiness):
+        self.seen = seen
+        self.readiness = readiness
+
+    def warmup(self):
+        self.seen.append(('warmup', self.readiness.phase))
+
+
+def _fake_detector(seen, readiness, fail=False):
+    class FakeDetector:
+        camera_running = True
+
+        def __init__(self, model_path):
+            seen.append(('load', readiness.phase))
+            if fail:
+                raise FileNotFoundError(model_path)
+            self.managers = {'realtime': FakeManager(seen, readiness)}
+
+        def run_camera(self):
+            seen.append(('camera', readiness.phase))
+
+    return FakeDetector
+
+
+@pytest.fixture
+def boot(server, monkeypatch):
+    readiness = Readiness()
+    monkeypatch.setattr(server, 'readiness', readiness)
+    monkeypatch.setattr(server, 'detector', None)
+    monkeypatch.setattr(server, 'apply_torch', lambda: None)
+    return readiness, server.app.test_client()
+
+
+def test_health_reports_each_phase_until_ready(server, monkeypatch, boot):
+    readiness, client = boot
+    r = client.get('/health')
+    assert r.status_code == 503 and r.json['phase'] == 'starting' and r.json['status'] == 'starting'
+
+    seen = []
+    monkeypatch.setattr(server, 'YOLODetectorWithStreaming', _fake_detector(seen, readiness))
+    server.bootstrap('weights.pt')
+    time.sleep(0.05)  # 카메라 스레드
+    assert seen[:2] == [('load', 'loading'), ('warmup', 'warming')]
+    assert [step for step, _ in seen[2:]] == ['camera']
+
+    r = client.get('/health')
+    assert r.status_code == 200 and r.json['ready'] and r.json['status'] == 'running'
+    assert set(r.json['startup_ms']) >= {'model_load', 'warmup'}
+    assert set(r.json['since_start_ms']) >= {'loading', 'warming', 'ready'}
+
+
+def test_health_reports_failed_bootstrap(server, monkeypatch, boot):
+    readiness, client = boot
+    monkeypatch.setattr(server, 'YOLODetectorWithStreaming', _fake_detector([], readiness, fail=True))
+    server.bootstrap('missing.pt')
+
+    r = client.get('/health')
+    assert r.status_code == 503
+    assert r.json['phase'] == 'failed' and 'missing.pt' in r.json['error']
+    assert server.detector is None
+    assert client.post('/detect_sale').status_code == 503
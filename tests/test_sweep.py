@@ -0,0 +1,54 @@
+import math
+
+import pytest
+
+pytest.importorskip('yaml')
+
+from sweep import DEFAULT_SPACE, rung_stopper, rungs, sample_configs
+
+
+@pytest.mark.parametrize('min_epochs, max_epochs, eta, expected', [
+    (5, 45, 3, [5, 15, 45]),
+    (5, 50, 3, [5, 15, 45, 50]),
+    (10, 10, 2, [10]),
+    (20, 10, 2, [10]),
+])
+def test_rungs(min_epochs, max_epochs, eta, expected):
+    assert rungs(min_epochs, max_epochs, eta) == expected
+
+
+def test_grid_space_samples_without_repeats():
+    space = {'batch': [8, 16], 'mosaic': [0.5, 1.0], 'flipud': [0.0, 0.5]}
+    configs = sample_configs(space, 5, seed=1)
+    assert len(configs) == 5
+    assert len({tuple(sorted(c.items())) for c in configs}) == 5
+    # 격자보다 많이 요청하면 격자 전체
+    assert len(sample_configs(space, 100)) == 8
+
+
+def test_ranges_stay_in_bounds_and_are_reproducible():
+    configs = sample_configs(DEFAULT_SPACE, 50, seed=3)
+    assert configs == sample_configs(DEFAULT_SPACE, 50, seed=3)
+    assert configs != sample_configs(DEFAULT_SPACE, 50, seed=4)
+    lr = [c['lr0'] for c in configs]
+    assert all(0.001 <= v <= 0.02 for v in lr)
+    # log 범위 -> 로그 중앙값 아래쪽에도 충분히 뽑힘
+    assert sum(v < math.sqrt(0.001 * 0.02) for v in lr) >= 10
+    assert {c['batch'] for c in configs} <= {8, 16}
+
+
+def test_rung_stopper_keeps_checkpoint_only_at_rung(tmp_path):
+    from types import SimpleNamespace
+
+    last, rung = tmp_path / 'last.pt', tmp_path / 'rung.pt'
+    trainer = SimpleNamespace(epoch=0, last=last, stop=False)
+    stop = rung_stopper(2, rung)
+
+    last.write_bytes(b'epoch1')
+    stop(trainer)
+    assert not rung.exists() and not trainer.stop
+
+    trainer.epoch = 1
+    last.write_bytes(b'epoch2')
+    stop(trainer)
+    assert rung.read_bytes() == b'epoch2' and trainer.stop
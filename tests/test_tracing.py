@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+import tracing
+from tracing import SAMPLE_PID, SPAN_PID, Tracer
+
+
+def _capture_in_thread(tracer, seconds, sample_hz=0):
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(trace=tracer.capture(seconds, sample_hz)))
+    thread.start()
+    deadline = time.perf_counter() + 2
+    while not tracer.enabled and time.perf_counter() < deadline:
+        time.sleep(0.001)
+    assert tracer.enabled
+    return thread, result
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    assert tracer.span('work') is tracer.span('other', 'cat', x=1)  # 공용 no-op 객체
+    with tracer.span('work'):
+        pass
+    tracer.complete('work', 'app', 0, 10)
+    tracer.complete_async('req', 'http', 0, 10, 1)
+    assert tracer._events == []
+
+
+def test_capture_records_spans_from_other_threads():
+    tracer = Tracer()
+    thread, result = _capture_in_thread(tracer, 0.3)
+    with tracer.span('infer', 'model', batch=2):
+        time.sleep(0.01)
+    tracer.complete_async('GET /status', 'http', time.perf_counter_ns(), time.perf_counter_ns(), 'http-1')
+    with pytest.raises(RuntimeError):
+        tracer.capture(0.1)  # 동시에 하나만
+    thread.join()
+
+    trace = result['trace']
+    events = [e for e in trace['traceEvents'] if e['ph'] != 'M']
+    infer = [e for e in events if e['name'] == 'infer']
+    assert len(infer) == 1 and infer[0]['pid'] == SPAN_PID and infer[0]['args'] == {'batch': 2}
+    assert infer[0]['dur'] >= 10_000  # us
+    assert [e['ph'] for e in events if e['name'] == 'GET /status'] == ['b', 'e']
+    assert any(e['name'] == 'thread_name' for e in trace['traceEvents'])
+    assert trace['otherData']['dropped_events'] == 0
+
+    # 끝나면 다시 꺼짐
+    assert not tracer.enabled and tracer.span('x') is tracing._NULL_SPAN
+
+
+def test_capture_with_sampling_adds_stack_track():
+    tracer = Tracer()
+    busy = threading.Event()
+
+    def spin():
+        while not busy.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=spin, daemon=True)
+    worker.start()
+    trace = tracer.capture(0.2, sample_hz=200)
+    busy.set()
+    samples = [e for e in trace['traceEvents'] if e['pid'] == SAMPLE_PID and e['ph'] == 'X']
+    assert any(e['name'].startswith('spin (') for e in samples)
+
+
+def test_flask_trace_route_requires_admin_token(monkeypatch):
+    flask = pytest.importorskip('flask')
+    pytest.importorskip('numpy')
+    import model_manager
+
+    app = flask.Flask(__name__)
+    tracing.register_trace_routes(app)
+    client = app.test_client()
+
+    monkeypatch.setattr(model_manager, 'ADMIN_TOKEN', 's3cret')
+    started = time.perf_counter()
+    r = client.post('/admin/trace?seconds=5')
+    assert r.status_code == 401 and time.perf_counter() - started < 1
+    assert client.get('/admin/trace', headers={'X-Admin-Token': 'wrong'}).status_code == 401
+
+    r = client.get('/admin/trace?seconds=0.1', headers={'Authorization': 'Bearer s3cret'})
+    assert r.status_code == 200 and 'traceEvents' in r.json
+    assert r.headers['Content-Disposition'].startswith('attachment; filename=trace_')
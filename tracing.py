@@ -0,0 +1,257 @@
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Chrome trace의 프로세스 번호 (계측 span / 샘플링 스택을 다른 트랙으로)
+SPAN_PID = 1
+SAMPLE_PID = 2
+MAX_SECONDS = 60
+
+
+class _NullSpan:
+    """추적이 꺼져 있을 때 쓰는 아무것도 안 하는 span (객체 생성도 없음)"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ('tracer', 'name', 'cat', 'args', 'start')
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.complete(self.name, self.cat, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class Tracer:
+    """N초 동안만 켜는 span 기록기 (Chrome trace / Perfetto JSON)
+
+    꺼져 있으면 span()은 공용 no-op 객체를 돌려주므로 비용은 속성 확인 한 번뿐.
+    켜져 있는 동안 모든 스레드의 span을 한 리스트에 모은다 (append는 GIL로 원자적).
+    """
+
+    def __init__(self, max_events=500_000):
+        self.enabled = False
+        self.max_events = max_events
+        self.dropped = 0
+        self._events = []
+        self._t0 = 0
+        self._lock = threading.Lock()
+
+    def span(self, name, cat='app', **args):
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, cat, args or None)
+
+    def complete(self, name, cat, start_ns, end_ns, args=None, tid=None):
+        """끝난 span 하나 기록 (ph=X)"""
+        if not self.enabled:
+            return
+        if len(self._events) >= self.max_events:
+            self.dropped += 1
+            return
+        event = {'name': name, 'cat': cat, 'ph': 'X', 'pid': SPAN_PID,
+                 'tid': tid or threading.get_native_id(),
+                 'ts': (start_ns - self._t0) / 1000, 'dur': (end_ns - start_ns) / 1000}
+        if args:
+            event['args'] = args
+        self._events.append(event)
+
+    def complete_async(self, name, cat, start_ns, end_ns, span_id, args=None):
+        """겹칠 수 있는 span (asyncio 요청처럼 한 스레드에서 동시에 진행되는 것)"""
+        if not self.enabled:
+            return
+        tid = threading.get_native_id()
+        base = {'name': name, 'cat': cat, 'id': span_id, 'pid': SPAN_PID, 'tid': tid}
+        begin = {**base, 'ph': 'b', 'ts': (start_ns - self._t0) / 1000}
+        if args:
+            begin['args'] = args
+        self._events.append(begin)
+        self._events.append({**base, 'ph': 'e', 'ts': (end_ns - self._t0) / 1000})
+
+    def capture(self, seconds, sample_hz=0):
+        """seconds 동안 추적 -> trace 문서 (동시에 하나만, 이미 진행 중이면 RuntimeError)"""
+        seconds = max(0.1, min(float(seconds), MAX_SECONDS))
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("이미 추적 중입니다")
+        try:
+            self._events = []
+            self.dropped = 0
+            self._t0 = time.perf_counter_ns()
+            started = datetime.now().isoformat()
+            sampler = StackSampler(self._t0, sample_hz) if sample_hz else None
+
+            self.enabled = True
+            if sampler is not None:
+                sampler.start()
+            time.sleep(seconds)
+            self.enabled = False
+
+            events = self._events
+            self._events = []
+            if sampler is not None:
+                events += sampler.stop()
+            return {
+                'traceEvents': events + _metadata(sampler is not None),
+                'displayTimeUnit': 'ms',
+                'otherData': {'started': started, 'seconds': seconds, 'sample_hz': sample_hz,
+                              'dropped_events': self.dropped},
+            }
+        finally:
+            self.enabled = False
+            self._lock.release()
+
+
+class StackSampler:
+    """모든 스레드의 파이썬 스택을 hz로 샘플 -> 스레드별 flame chart (ph=X)
+
+    연속된 샘플에서 같은 프레임은 하나의 span으로 이어 붙인다.
+    sys._current_frames() 기반이라 대기 중인 스레드도 보인다 (wall-clock 샘플).
+    """
+
+    def __init__(self, t0, hz=100, max_depth=48):
+        self.t0 = t0
+        self.interval = 1 / max(1, min(int(hz), 1000))
+        self.max_depth = max_depth
+        self.events = []
+        self._open = {}  # tid -> [(label, start_ns)]
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name='trace-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _stack(self, frame):
+        labels = []
+        while frame is not None and len(labels) < self.max_depth:
+            code = frame.f_code
+            labels.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        labels.reverse()
+        return labels
+
+    def _close(self, tid, depth, now):
+        stack = self._open.get(tid, [])
+        while len(stack) > depth:
+            label, start = stack.pop()
+            self.events.append({'name': label, 'cat': 'sample', 'ph': 'X', 'pid': SAMPLE_PID, 'tid': tid,
+                                'ts': (start - self.t0) / 1000, 'dur': (now - start) / 1000})
+
+    def _sample(self):
+        now = time.perf_counter_ns()
+        me = threading.get_ident()
+        native = {t.ident: t.native_id for t in threading.enumerate()}
+        seen = set()
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            tid = native.get(ident, ident)
+            seen.add(tid)
+            labels = self._stack(frame)
+            stack = self._open.setdefault(tid, [])
+            common = 0
+            while common < len(stack) and common < len(labels) and stack[common][0] == labels[common]:
+                common += 1
+            self._close(tid, common, now)
+            stack.extend((label, now) for label in labels[common:])
+        for tid in list(self._open):
+            if tid not in seen:
+                self._close(tid, 0, now)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        now = time.perf_counter_ns()
+        for tid in list(self._open):
+            self._close(tid, 0, now)
+        return self.events
+
+
+def _metadata(sampled):
+    """프로세스 / 스레드 이름 (Perfetto 트랙 이름)"""
+    meta = [{'name': 'process_name', 'ph': 'M', 'pid': SPAN_PID, 'args': {'name': 'spans'}}]
+    pids = [SPAN_PID]
+    if sampled:
+        meta.append({'name': 'process_name', 'ph': 'M', 'pid': SAMPLE_PID, 'args': {'name': 'sampled stacks'}})
+        pids.append(SAMPLE_PID)
+    for thread in threading.enumerate():
+        for pid in pids:
+            meta.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread.native_id,
+                         'args': {'name': thread.name}})
+    return meta
+
+
+# 프로세스 공용 tracer
+TRACER = Tracer()
+span = TRACER.span
+
+
+def trace_filename():
+    return datetime.now().strftime('trace_%Y%m%d_%H%M%S.json')
+
+
+def register_trace_routes(app):
+    """Flask: /admin/trace 엔드포인트 + HTTP 핸들러 span
+
+    GET|POST /admin/trace?seconds=5&sample_hz=100 -> N초 동안 추적한 trace JSON 다운로드
+    (chrome://tracing 또는 ui.perfetto.dev에서 열기)
+    /admin/model과 같은 ADMIN_TOKEN이 필요 (스택 샘플에 내부 정보가 있고, 요청 하나가 최대 60초 걸림)
+    """
+    import json
+
+    from flask import Response, g, jsonify, request
+
+    # model_manager가 tracing을 import하므로 여기서
+    from model_manager import ADMIN_DENIED, admin_authorized
+
+    @app.before_request
+    def _trace_request_start():
+        if TRACER.enabled:
+            g.trace_start = time.perf_counter_ns()
+
+    @app.teardown_request
+    def _trace_request_end(exc):
+        start = g.pop('trace_start', None)
+        if start is not None:
+            TRACER.complete(f"{request.method} {request.path}", 'http', start, time.perf_counter_ns())
+
+    @app.route('/admin/trace', methods=['GET', 'POST'])
+    def admin_trace():
+        """N초 동안 추적 (끝날 때까지 응답을 기다림)"""
+        if not admin_authorized(request.headers):
+            return jsonify({"success": False, "message": ADMIN_DENIED}), 401
+        try:
+            seconds = float(request.args.get('seconds', 5))
+            sample_hz = int(request.args.get('sample_hz', 0))
+        except ValueError:
+            return jsonify({"success": False, "message": "seconds / sample_hz는 숫자여야 합니다"}), 400
+        try:
+            trace = TRACER.capture(seconds, sample_hz)
+        except RuntimeError as e:
+            return jsonify({"success": False, "message": str(e)}), 409
+        return Response(json.dumps(trace), mimetype='application/json',
+                        headers={'Content-Disposition': f'attachment; filename={trace_filename()}'})
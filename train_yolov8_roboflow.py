@@ -1,7 +1,27 @@
 from ultralytics import YOLO
 from pathlib import Path
+import torch
 import yaml
 
+from dataset_cache import (count_files, default_workers, load_label_index, make_cached_trainer,
+                           mean_epoch_time, prepare_dataset_cache)
+from dataset_dedup import dedup_dataset
+from distill import STUDENT_WIDTH, make_distill_trainer, report
+
+# 연속 영상 프레임 중복을 뺀 복사본(<데이터셋>-dedup, 하드링크)으로 학습 + train/valid 누수 제거
+DEDUP_DATASET = False
+
+# 이미지를 미리 디코딩/리사이즈한 memmap 캐시로 학습 (False면 기존 방식)
+USE_DATASET_CACHE = True
+IMGSZ = 640
+
+# 학습 후 더 좁은 학생 모델로 증류 (노트북에서 매 프레임 돌릴 경량 모델)
+DISTILL = False
+DISTILL_EPOCHS = 100
+
+# 학습 후 서버용 파생 모델을 미리 빌드 (예: ['fused', 'onnx'], 서버는 MODEL_BACKEND로 선택)
+PREWARM_BACKENDS = []
+
 
 def train_model():
     # ===== 1️⃣ 데이터셋 경로 설정 =====
@@ -43,17 +63,33 @@ def train_model():
     else:
         print(f"✅ data.yaml 파일 발견: {data_yaml_path}")
 
+    # ===== 2️⃣-2 중복 / 누수 제거 =====
+    if DEDUP_DATASET:
+        dataset_folder, data_yaml_path, _ = dedup_dataset(dataset_folder)
+
     # ===== 3️⃣ 폴더 구조 확인 =====
     print("\n📁 폴더 구조 확인...")
     for folder in ['train', 'valid', 'test']:
         folder_path = dataset_folder / folder
         if folder_path.exists():
-            images_count = len(list((folder_path / 'images').glob('*')))
-            labels_count = len(list((folder_path / 'labels').glob('*')))
+            images_count = count_files(folder_path / 'images')
+            labels_count = count_files(folder_path / 'labels')
             print(f"   ✅ {folder}/: images={images_count}, labels={labels_count}")
         else:
             print(f"   ❌ {folder}/ 폴더 없음")
 
+    # ===== 3️⃣-2 전처리 캐시 준비 =====
+    trainer = None
+    if USE_DATASET_CACHE:
+        prepare_dataset_cache(dataset_folder, IMGSZ)
+        trainer = make_cached_trainer()
+
+        label_index = load_label_index(dataset_folder / 'train' / 'images', IMGSZ)
+        if label_index:
+            print(f"   🏷️  train 클래스별 박스 수: {label_index['classes']}")
+
+    workers = default_workers()
+
     # ===== 4️⃣ YOLOv8 모델 로드 =====
     print("\n🚀 YOLOv8 모델 로드 중...")
     model = YOLO('yolov8n.pt')  # nano 모델 (가장 빠름)
@@ -67,10 +103,11 @@ def train_model():
     print("\n📚 모델 학습 시작...\n")
 
     results = model.train(
+        trainer=trainer,  # memmap 캐시 사용 시 CachedDetectionTrainer
         data=str(data_yaml_path),  # 데이터셋 YAML 파일 경로
         epochs=200,  # 학습 반복 횟수
-        imgsz=640,  # 입력 이미지 크기
-        device=0,  # GPU 사용 (device='cpu'로 변경 가능)
+        imgsz=IMGSZ,  # 입력 이미지 크기
+        device=0 if torch.cuda.is_available() else 'cpu',  # GPU 없으면 CPU
         batch=16,  # 배치 크기 (메모리 부족하면 8로 줄이기)
         patience=20,  # Early stopping (20 epoch 개선 없으면 멈춤)
         save=True,  # 모델 저장
@@ -85,7 +122,7 @@ def train_model():
         flipud=0.5,  # 위아래 뒤집기 확률
         fliplr=0.5,  # 좌우 뒤집기 확률
         mosaic=1.0,  # Mosaic 증강
-        workers=0,  # Windows 호환성 - multiprocessing 비활성화
+        workers=workers,  # Windows는 0 (multiprocessing 비활성화), Linux는 CPU 수에 맞춤
     )
 
     # ===== 6️⃣ 학습 완료 =====
@@ -94,17 +131,58 @@ def train_model():
     print("=" * 60)
 
     # ===== 7️⃣ 저장된 모델 정보 =====
-    model_path = Path('runs/detect/mounting_detection/weights/best.pt')
+    save_dir = Path(model.trainer.save_dir)  # mounting_detection, mounting_detection2, ...
+    model_path = save_dir / 'weights' / 'best.pt'
     print(f"\n📊 저장된 모델:")
     print(f"   최고 성능 모델: {model_path}")
-    print(f"   마지막 모델: runs/detect/mounting_detection/weights/last.pt")
-    print(f"   학습 기록: runs/detect/mounting_detection/results.csv")
+    print(f"   마지막 모델: {save_dir / 'weights' / 'last.pt'}")
+    print(f"   학습 기록: {save_dir / 'results.csv'}")
+
+    epoch_time = mean_epoch_time(save_dir / 'results.csv')
+    if epoch_time is not None:
+        print(f"   ⏱️  epoch당 평균 시간: {epoch_time:.1f}초 "
+              f"(캐시 {'사용' if USE_DATASET_CACHE else '미사용'}, workers={workers})")
+
+    # ===== 8️⃣ (선택) 증류 =====
+    if DISTILL:
+        distill_model(model_path, data_yaml_path, trainer, workers)
+
+    # ===== 9️⃣ (선택) 파생 모델 캐시 =====
+    if PREWARM_BACKENDS:
+        from artifact_cache import ArtifactCache
+        cache = ArtifactCache()
+        for backend in PREWARM_BACKENDS:
+            cache.path_for(model_path, backend, IMGSZ)
 
     print("\n" + "=" * 60)
     print("🎉 다음 단계")
     print("=" * 60)
 
 
+def distill_model(teacher_path, data_yaml_path, cached_trainer=None, workers=0):
+    """학습된 교사(best.pt)를 채널 폭을 줄인 학생으로 증류 -> mAP / CPU 지연시간 비교"""
+    print("\n" + "=" * 60)
+    print(f"🧑‍🏫 증류 시작 (학생 width={STUDENT_WIDTH})")
+    print("=" * 60)
+
+    student = YOLO('yolov8n.yaml')  # 구조만 사용 (폭은 trainer가 줄임)
+    student.train(
+        trainer=make_distill_trainer(teacher_path, base=cached_trainer),
+        data=str(data_yaml_path),
+        epochs=DISTILL_EPOCHS,
+        imgsz=IMGSZ,
+        device=0 if torch.cuda.is_available() else 'cpu',
+        batch=16,
+        patience=20,
+        project='runs/detect',
+        name='mounting_detection_student',  # results.csv 형식은 일반 학습과 같음
+        workers=workers,
+    )
+
+    # 교사 / 학생 mAP와 CPU 지연시간을 나란히 (run_index.json에도 저장)
+    report([Path(teacher_path).parent.parent, Path(student.trainer.save_dir)], IMGSZ)
+
+
 # ===== ⭐️ 이것이 중요! Windows에서 필수 =====
 if __name__ == '__main__':
     train_model()